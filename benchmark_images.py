@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片存储格式对比基准
+对一组截图分别用各存储格式（含大小上限搜索）编码，统计总字节数与编码耗时
+
+用法:
+    python benchmark_images.py                 # 使用 images/ 目录中的截图
+    python benchmark_images.py --dir 样例目录
+    python benchmark_images.py --synthetic 20  # 生成20张模拟界面截图
+    python benchmark_images.py --decode        # 对比大图保存流程的延迟与峰值内存
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import multiprocessing
+from io import BytesIO
+
+try:
+    import resource
+except ImportError:  # Windows 无 resource 模块，仅统计耗时
+    resource = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from PIL import Image, ImageDraw
+
+from utils import ImageUtils
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp', '.avif')
+
+
+def make_synthetic_screenshot(width=1920, height=1080, seed=0):
+    """生成一张模拟界面截图：纯色面板、表格线与大量文字"""
+    rng = random.Random(seed)
+    image = Image.new('RGB', (width, height), (240, 240, 240))
+    draw = ImageDraw.Draw(image)
+
+    # 标题栏与侧边栏
+    draw.rectangle((0, 0, width, 40), fill=(45, 85, 160))
+    draw.rectangle((0, 40, 220, height), fill=(250, 250, 250))
+    for i in range(12):
+        draw.text((20, 60 + i * 30), f"Menu item {i}", fill=(30, 30, 30))
+
+    # 表格
+    row_height = 24
+    for row in range(40, height // row_height):
+        y = row * row_height - 900
+        if y < 60:
+            continue
+        fill = (255, 255, 255) if row % 2 else (235, 242, 250)
+        draw.rectangle((240, y, width - 20, y + row_height), fill=fill, outline=(200, 200, 200))
+        for col in range(6):
+            text = ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 ') for _ in range(14))
+            draw.text((250 + col * 270, y + 6), text, fill=(20, 20, 20))
+
+    # 状态徽标
+    for i in range(8):
+        x = rng.randint(260, width - 120)
+        y = rng.randint(60, height - 40)
+        color = rng.choice([(76, 175, 80), (244, 67, 54), (255, 152, 0), (33, 150, 243)])
+        draw.rounded_rectangle((x, y, x + 80, y + 24), radius=8, fill=color)
+        draw.text((x + 12, y + 6), "STATUS", fill=(255, 255, 255))
+    return image
+
+
+def load_samples(args):
+    """加载样例截图"""
+    if args.synthetic:
+        return [(f"synthetic_{i}", make_synthetic_screenshot(seed=i)) for i in range(args.synthetic)]
+
+    samples = []
+    for name in sorted(os.listdir(args.dir)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            path = os.path.join(args.dir, name)
+            with Image.open(path) as image:
+                image.load()
+                samples.append((name, image.copy()))
+    return samples
+
+
+def legacy_jpeg_size(image, max_size_kb):
+    """旧流程：compress_image 后以默认参数保存JPEG"""
+    output = BytesIO()
+    ImageUtils.compress_image(image, max_size_kb=max_size_kb).save(output, 'JPEG')
+    return len(output.getvalue())
+
+
+def _peak_rss_mb():
+    """当前进程峰值常驻内存（MB）"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 单位为字节，Linux 为KB
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_save_pipeline(mode, path, queue):
+    """在独立进程中执行一次保存流程，回传耗时与峰值内存增量"""
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    if mode == 'old':
+        # 旧流程：全尺寸解码后进入质量循环
+        image = Image.open(path)
+        image = ImageUtils.compress_image(image)
+        image.save(BytesIO(), 'JPEG')
+    else:
+        image = ImageUtils.open_for_storage(path)
+        ImageUtils.encode_image(image, 'jpeg')
+    queue.put((time.perf_counter() - start, _peak_rss_mb() - baseline))
+
+
+def benchmark_decode(args):
+    """对比大图（JPEG/PNG）保存流程改造前后的延迟与峰值内存"""
+    source = make_synthetic_screenshot(args.decode_width, args.decode_height)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = {
+            'JPEG': os.path.join(temp_dir, 'large.jpg'),
+            'PNG': os.path.join(temp_dir, 'large.png'),
+        }
+        source.save(files['JPEG'], quality=95)
+        source.save(files['PNG'])
+        del source
+
+        print(f"源图尺寸: {args.decode_width}x{args.decode_height}")
+        print(f"{'源格式':<8}{'流程':<8}{'耗时(ms)':>12}{'峰值内存增量(MB)':>20}")
+        for source_format, path in files.items():
+            for mode in ('old', 'new'):
+                queue = multiprocessing.Queue()
+                process = multiprocessing.Process(target=_run_save_pipeline, args=(mode, path, queue))
+                process.start()
+                elapsed, peak = queue.get()
+                process.join()
+                label = "改造前" if mode == 'old' else "改造后"
+                print(f"{source_format:<8}{label:<8}{elapsed * 1000:>12.1f}{peak:>20.1f}")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="图片存储格式对比基准")
+    parser.add_argument('--dir', default='images', help="样例截图目录")
+    parser.add_argument('--synthetic', type=int, default=0, help="生成指定数量的模拟截图代替样例目录")
+    parser.add_argument('--max-size-kb', type=int, default=1024, help="单张图片大小上限（KB）")
+    parser.add_argument('--decode', action='store_true', help="对比大图保存流程的延迟与峰值内存")
+    parser.add_argument('--decode-width', type=int, default=15360, help="--decode 源图宽度")
+    parser.add_argument('--decode-height', type=int, default=4320, help="--decode 源图高度")
+    args = parser.parse_args()
+
+    if args.decode:
+        benchmark_decode(args)
+        return
+
+    samples = load_samples(args)
+    if not samples:
+        print(f"没有找到样例截图: {args.dir}")
+        return
+    print(f"样例数量: {len(samples)}")
+
+    results = []
+
+    start = time.perf_counter()
+    legacy_total = sum(legacy_jpeg_size(image, args.max_size_kb) for _, image in samples)
+    results.append(("jpeg (旧流程)", legacy_total, time.perf_counter() - start))
+
+    for name in ImageUtils.available_storage_formats():
+        total = 0
+        start = time.perf_counter()
+        for _, image in samples:
+            data, _ = ImageUtils.encode_image(image, name, max_size_kb=args.max_size_kb)
+            total += len(data)
+        results.append((name, total, time.perf_counter() - start))
+
+    print(f"{'格式':<16}{'总大小(KB)':>12}{'相对旧流程':>12}{'平均编码(ms)':>14}")
+    for name, total, elapsed in results:
+        ratio = legacy_total / total if total else 0
+        print(f"{name:<16}{total / 1024:>12.1f}{ratio:>11.2f}x{elapsed / len(samples) * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
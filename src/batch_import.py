@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量导入用例：多个工作簿、多个工作表并行解析，每个工作表导入为一个案例集
+
+解析在进程池中进行，各工作进程把解析出的批次通过有界队列交给唯一的写入方；
+写入方先把批次暂存到临时表，工作表解析完成后按计划顺序合并到用例表（只写入新增和有变化的用例）。
+某个工作表出错（缺少列、重复用例ID等）只影响该工作表，其余工作表照常导入；
+同一用例ID出现在本次导入的多个工作表中时，归排在前面的工作表，后面的工作表报错、不写入。
+
+用法:
+    python src/batch_import.py 用例库/*.xlsx
+    python src/batch_import.py a.xlsx b.xlsx c.csv --workers 4
+"""
+
+import os
+import json
+import queue
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from database import Database
+from excel_parser import ExcelParser
+
+
+class ImportCancelled(Exception):
+    """用户取消了导入"""
+
+
+# 工作进程中的共享对象，由进程池初始化函数设置
+_sheet_queue = None
+_sheet_cancel = None
+
+
+def _init_sheet_worker(message_queue, cancel_event):
+    """进程池初始化：保存与主进程共享的消息队列与取消标志"""
+    global _sheet_queue, _sheet_cancel
+    _sheet_queue = message_queue
+    _sheet_cancel = cancel_event
+
+
+def _put_message(message):
+    """向写入方发送消息；队列已满时等待，期间检查取消标志"""
+    while True:
+        try:
+            _sheet_queue.put(message, timeout=0.5)
+            return
+        except queue.Full:
+            if _sheet_cancel.is_set():
+                raise ImportCancelled()
+
+
+def _parse_sheet(index, file_path, sheet_name, batch_size):
+    """
+    在工作进程中流式解析一个工作表，按批发送 ('batch', 序号, 批次)，
+    结束时发送 ('done', 序号, 行数) 或 ('error', 序号, 原因)
+    """
+    count = 0
+    try:
+        for batch in ExcelParser.iter_excel_batches(file_path, batch_size, sheet_name=sheet_name):
+            if _sheet_cancel.is_set():
+                return
+            _put_message(('batch', index, batch))
+            count += len(batch)
+        _put_message(('done', index, count))
+    except ImportCancelled:
+        return
+    except Exception as e:
+        _put_message(('error', index, str(e)))
+
+
+class BatchCaseImporter:
+    """多工作簿、多工作表的并行用例导入"""
+
+    # 每个工作进程最多积压在队列中的批次数，限制解析快于写入时的内存占用
+    QUEUE_BATCHES_PER_WORKER = 4
+
+    def __init__(self, db_path, file_paths, max_workers=None, progress_callback=None, cancel_check=None):
+        """
+        Args:
+            db_path: 数据库文件路径
+            file_paths: 工作簿路径列表
+            max_workers: 解析进程数，默认CPU核数
+            progress_callback: 可选，进度回调，参数为 (已解析行数, 总行数)，有工作表行数未知时总行数为 0
+            cancel_check: 可选，返回 True 时取消导入（整体回滚）
+        """
+        self.db_path = db_path
+        self.file_paths = list(file_paths)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.progress_callback = progress_callback
+        self.cancel_check = cancel_check
+
+    def plan_sheets(self):
+        """
+        列出要导入的工作表及其案例集名称
+
+        案例集名称默认取工作表名称；只有一个工作表的工作簿取文件名，
+        名称在本次导入中重复时改为“文件名_工作表名”。
+
+        Returns:
+            list: 字典列表，包含 file_path、sheet_name、collection_name、rows（未知时为 None）、error
+        """
+        sheets = []
+        for file_path in self.file_paths:
+            stem = os.path.splitext(os.path.basename(file_path))[0]
+            try:
+                file_sheets = ExcelParser.list_sheets(file_path)
+            except Exception as e:
+                sheets.append({'file_path': file_path, 'sheet_name': None, 'collection_name': stem,
+                               'rows': 0, 'error': f"读取工作簿失败: {e}"})
+                continue
+            for sheet_name, rows in file_sheets:
+                sheets.append({
+                    'file_path': file_path,
+                    'sheet_name': sheet_name,
+                    'collection_name': sheet_name if len(file_sheets) > 1 else stem,
+                    'rows': rows,
+                    'error': None,
+                })
+
+        names = [sheet['collection_name'] for sheet in sheets]
+        for sheet in sheets:
+            if names.count(sheet['collection_name']) > 1 and sheet['sheet_name'] is not None:
+                stem = os.path.splitext(os.path.basename(sheet['file_path']))[0]
+                sheet['collection_name'] = f"{stem}_{sheet['sheet_name']}"
+        return sheets
+
+    def run(self, sheets=None):
+        """
+        执行导入，所有工作表在同一个事务中写入，取消时整体回滚
+
+        Args:
+            sheets: 可选，plan_sheets 的结果（可修改 collection_name），默认重新生成
+
+        Returns:
+            list: 每个工作表的导入报告，在 plan_sheets 的字段上增加
+                  parsed、added、updated、unchanged；出错的工作表 error 为原因，不写入任何用例
+        """
+        sheets = sheets if sheets is not None else self.plan_sheets()
+        for sheet in sheets:
+            sheet.update(parsed=0, added=0, updated=0, unchanged=0)
+        pending = [index for index, sheet in enumerate(sheets) if not sheet['error']]
+        if not pending:
+            return sheets
+
+        db = Database(self.db_path)
+        try:
+            db.cursor.execute('BEGIN')
+            try:
+                self._create_stage(db)
+                self._parse_and_merge(db, sheets, pending)
+                db.cursor.execute('DROP TABLE temp.import_stage')
+                db.cursor.execute('DROP TABLE temp.import_merged')
+                db.conn.commit()
+            except BaseException:
+                db.conn.rollback()
+                raise
+        finally:
+            db.close()
+        return sheets
+
+    # 跨工作表重复时错误信息中列出的用例ID数
+    CONFLICT_PREVIEW_IDS = 5
+
+    @staticmethod
+    def _create_stage(db):
+        """
+        暂存已解析批次的临时表（位于临时文件，不占用进程内存），
+        以及记录本次导入中已合并的用例ID及其工作表的临时表
+        """
+        db.cursor.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS import_stage (
+            sheet_index INTEGER NOT NULL,
+            case_id TEXT NOT NULL,
+            data TEXT NOT NULL
+        )
+        ''')
+        db.cursor.execute('CREATE INDEX IF NOT EXISTS temp.idx_import_stage_sheet ON import_stage(sheet_index)')
+        db.cursor.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS import_merged (
+            case_id TEXT PRIMARY KEY,
+            sheet_index INTEGER NOT NULL
+        )
+        ''')
+
+    def _parse_and_merge(self, db, sheets, pending):
+        """并行解析各工作表，暂存批次，每个工作表解析完成后合并到用例表"""
+        # 有工作表缺少尺寸信息时总行数未知
+        rows = [sheets[index]['rows'] for index in pending]
+        total_rows = 0 if None in rows else sum(rows)
+        context = multiprocessing.get_context('spawn')
+        workers = min(self.max_workers, len(pending))
+        message_queue = context.Queue(maxsize=workers * self.QUEUE_BATCHES_PER_WORKER)
+        cancel_event = context.Event()
+        pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=context,
+            initializer=_init_sheet_worker, initargs=(message_queue, cancel_event)
+        )
+        futures = {}
+        try:
+            futures = {
+                pool.submit(_parse_sheet, index, sheets[index]['file_path'], sheets[index]['sheet_name'],
+                            ExcelParser.BATCH_SIZE): index
+                for index in pending
+            }
+            unfinished = set(pending)
+            not_done = set(futures)
+            parsed = 0
+            # 工作表按计划顺序合并（与解析完成的先后无关），跨工作表重复的用例ID总是归排在前面的工作表
+            merge_order = list(pending)
+            parsed_sheets = set()
+            while unfinished:
+                if self.cancel_check and self.cancel_check():
+                    raise ImportCancelled()
+                try:
+                    kind, index, value = message_queue.get(timeout=0.2)
+                except queue.Empty:
+                    # 工作进程异常退出时不会再发送消息
+                    done, not_done = wait(not_done, timeout=0, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = futures[future]
+                        if index in unfinished and future.exception() is not None:
+                            self._discard_sheet(db, index, sheets[index], f"解析进程异常退出: {future.exception()}")
+                            unfinished.discard(index)
+                    kind = None
+
+                if kind == 'batch':
+                    db.cursor.executemany(
+                        'INSERT INTO temp.import_stage (sheet_index, case_id, data) VALUES (?, ?, ?)',
+                        [(index, case.get('用例ID', ''), json.dumps(case, ensure_ascii=False)) for case in value]
+                    )
+                    sheets[index]['parsed'] += len(value)
+                    parsed += len(value)
+                    if self.progress_callback:
+                        self.progress_callback(parsed, total_rows)
+                elif kind == 'done':
+                    parsed_sheets.add(index)
+                    unfinished.discard(index)
+                elif kind == 'error':
+                    self._discard_sheet(db, index, sheets[index], value)
+                    unfinished.discard(index)
+
+                # 合并排在最前、且已解析结束的工作表
+                while merge_order and merge_order[0] not in unfinished:
+                    index = merge_order.pop(0)
+                    if index in parsed_sheets:
+                        self._merge_sheet(db, index, sheets[index], sheets)
+        except BaseException:
+            cancel_event.set()
+            for future in futures:
+                future.cancel()
+            # 继续读取队列直到工作进程退出：进程退出前要把已放入队列的消息写完，不读取会一直等待
+            running = {future for future in futures if not future.cancelled()}
+            while running:
+                _, running = wait(running, timeout=0.1)
+                self._drain(message_queue)
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+
+    @staticmethod
+    def _drain(message_queue):
+        """丢弃队列中已有的消息"""
+        while True:
+            try:
+                message_queue.get_nowait()
+            except queue.Empty:
+                return
+
+    @staticmethod
+    def _discard_sheet(db, index, sheet, error):
+        """工作表出错：丢弃已暂存的批次并记录原因"""
+        db.cursor.execute('DELETE FROM temp.import_stage WHERE sheet_index = ?', (index,))
+        sheet['error'] = error
+
+    @staticmethod
+    def _merge_sheet(db, index, sheet, sheets):
+        """
+        将一个工作表的暂存批次合并到用例表，合并失败时只回滚该工作表
+
+        工作表中有用例ID已由本次导入中前面的工作表写入时，该工作表报错、不写入，避免用例在案例集之间来回移动。
+        """
+        db.cursor.execute('''
+        SELECT s.case_id, m.sheet_index FROM temp.import_stage s
+        JOIN temp.import_merged m ON m.case_id = s.case_id
+        WHERE s.sheet_index = ?
+        ORDER BY s.rowid
+        ''', (index,))
+        conflicts = db.cursor.fetchall()
+        if conflicts:
+            owners = list(dict.fromkeys(sheets[row[1]]['collection_name'] for row in conflicts))
+            ids = [row[0] for row in conflicts[:BatchCaseImporter.CONFLICT_PREVIEW_IDS]]
+            more = '…' if len(conflicts) > len(ids) else ''
+            BatchCaseImporter._discard_sheet(
+                db, index, sheet,
+                f"有 {len(conflicts)} 个用例ID与本次导入的其他工作表（{'、'.join(owners)}）重复: {', '.join(ids)}{more}"
+            )
+            return
+
+        collection_name = sheet['collection_name']
+
+        def staged_batches():
+            cursor = db.conn.cursor()
+            cursor.execute('SELECT data FROM temp.import_stage WHERE sheet_index = ? ORDER BY rowid', (index,))
+            while True:
+                rows = cursor.fetchmany(ExcelParser.BATCH_SIZE)
+                if not rows:
+                    break
+                batch = [json.loads(row[0]) for row in rows]
+                # 每个工作表导入为一个案例集
+                for case in batch:
+                    case['案例集名称'] = collection_name
+                yield batch
+
+        db.cursor.execute('SAVEPOINT import_sheet')
+        try:
+            result = db.import_test_case_batches(staged_batches(), collection_name)
+            db.cursor.execute('RELEASE SAVEPOINT import_sheet')
+        except Exception as e:
+            db.cursor.execute('ROLLBACK TO SAVEPOINT import_sheet')
+            db.cursor.execute('RELEASE SAVEPOINT import_sheet')
+            sheet['error'] = f"写入失败: {e}"
+        else:
+            for key in ('added', 'updated', 'unchanged'):
+                sheet[key] = result[key]
+            db.cursor.execute('''
+            INSERT INTO temp.import_merged (case_id, sheet_index)
+            SELECT case_id, sheet_index FROM temp.import_stage WHERE sheet_index = ? AND case_id != ''
+            ''', (index,))
+        db.cursor.execute('DELETE FROM temp.import_stage WHERE sheet_index = ?', (index,))
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="并行导入多个工作簿、多个工作表中的测试用例")
+    parser.add_argument('files', nargs='+', help="Excel或CSV/TSV文件路径")
+    parser.add_argument('--db', default='data/qa_test_logger.db', help="数据库文件路径")
+    parser.add_argument('--workers', type=int, help="解析进程数，默认CPU核数")
+    args = parser.parse_args()
+
+    importer = BatchCaseImporter(
+        args.db, args.files, args.workers,
+        progress_callback=lambda done, total: print(f"\r已解析 {done}/{total or '?'} 行", end='', flush=True)
+    )
+    sheets = importer.run()
+    print()
+    for sheet in sheets:
+        name = f"{os.path.basename(sheet['file_path'])} / {sheet['sheet_name'] or '-'}"
+        if sheet['error']:
+            print(f"{name} -> {sheet['collection_name']}：失败，{sheet['error']}")
+        else:
+            print(f"{name} -> {sheet['collection_name']}：{sheet['parsed']} 行，新增 {sheet['added']}，"
+                  f"修改 {sheet['updated']}，未变化 {sheet['unchanged']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+证据包：将用例、测试记录与其引用的图片打包为一个zip文件，便于交给其他团队或在另一台电脑上恢复、合并
+
+包内结构:
+    manifest.jsonl   每行一个JSON对象：首行为包头，其后依次为用例（type=case）与记录（type=record）
+    images/...       记录引用的图片原文件
+    bundle.json      包描述信息（各类条目数量、缺失的图片），最后写入
+
+用法:
+    python src/bundle.py evidence.zip                         # 导出全部用例与记录
+    python src/bundle.py evidence.zip --collection 登录模块    # 只导出指定案例集的记录
+    python src/bundle.py evidence.zip --import                # 导入证据包，用例ID冲突时保留本地用例
+    python src/bundle.py evidence.zip --import --on-conflict rename
+"""
+
+import io
+import os
+import json
+import time
+import shutil
+import hashlib
+import zipfile
+import argparse
+
+from database import Database
+from utils import DateUtils, ImageUtils
+
+
+class EvidenceBundle:
+    """证据包的导出与导入"""
+
+    VERSION = 1
+
+    MANIFEST_NAME = 'manifest.jsonl'
+    INFO_NAME = 'bundle.json'
+    IMAGES_DIR = 'images'
+
+    # 本身已压缩的图片格式按存储方式写入，不再二次压缩
+    STORED_EXTENSIONS = ('.jpg', '.jpeg', '.webp', '.png', '.avif')
+
+    # 清单使用 deflate 压缩
+    MANIFEST_COMPRESS_LEVEL = 6
+
+    # 每写入多少条记录报告一次进度
+    PROGRESS_INTERVAL = 1000
+
+    # 导入时用例ID冲突的处理方式 -> 显示名称
+    CONFLICT_POLICIES = {
+        'skip': "保留本地用例",
+        'overwrite': "用包内用例覆盖",
+        'rename': "包内用例改名导入",
+    }
+
+    # 导入时每批写入的行数
+    IMPORT_BATCH_SIZE = 1000
+
+    # 写入包中的用例字段（除用例ID外的顺序与 Database.case_content_hash 一致）
+    CASE_FIELDS = ('case_id', 'scenario', 'test_steps', 'expected_result', 'priority',
+                   'case_collection_name', 'project_id')
+
+    @staticmethod
+    def _image_arcname(image_path, used_names):
+        """为图片分配包内路径，文件名重复时追加序号"""
+        stem, ext = os.path.splitext(os.path.basename(image_path))
+        name, suffix = f"{stem}{ext}", 2
+        while name in used_names:
+            name = f"{stem}_{suffix}{ext}"
+            suffix += 1
+        used_names.add(name)
+        return f"{EvidenceBundle.IMAGES_DIR}/{name}"
+
+    @staticmethod
+    def export(db, file_path, filters=None, progress_callback=None):
+        """
+        流式导出证据包
+
+        清单直接从数据库游标逐行写入zip条目，图片从原文件分块写入，不经过临时目录，
+        内存占用与记录数、图片大小无关（仅保留图片路径映射）。
+
+        Args:
+            db: Database 实例
+            file_path: 输出zip文件路径
+            filters: 筛选条件字典，见 Database._export_query_parts
+            progress_callback: 可选，进度回调，参数为百分比（0-100）
+
+        Returns:
+            dict: 包描述信息（各类条目数量、缺失的图片）
+        """
+        export_dir = os.path.dirname(file_path)
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+
+        # 在同一个读事务中读取用例与记录，保证两者彼此一致
+        cursor = db.conn.cursor()
+        own_transaction = not db.conn.in_transaction
+        if own_transaction:
+            cursor.execute('BEGIN')
+        try:
+            total = db.count_export_rows(filters)
+            with zipfile.ZipFile(file_path, 'w', zipfile.ZIP_DEFLATED,
+                                 compresslevel=EvidenceBundle.MANIFEST_COMPRESS_LEVEL) as zf:
+                counts, images = EvidenceBundle._write_manifest(zf, db, filters, total, progress_callback)
+                missing = EvidenceBundle._write_images(zf, images, progress_callback)
+                info = {
+                    'version': EvidenceBundle.VERSION,
+                    'created_at': int(time.time()),
+                    'filters': filters or {},
+                    'counts': dict(counts, images=len(images) - len(missing)),
+                    'missing_images': missing,
+                }
+                zf.writestr(EvidenceBundle.INFO_NAME, json.dumps(info, ensure_ascii=False, indent=2))
+        finally:
+            if own_transaction:
+                cursor.execute('COMMIT')
+
+        if progress_callback:
+            progress_callback(100)
+        return info
+
+    @staticmethod
+    def _write_manifest(zf, db, filters, total, progress_callback):
+        """
+        逐行写出清单（进度 0-50）
+
+        Returns:
+            tuple: ({'cases': 用例数, 'records': 记录数}, {图片路径: 包内路径})
+        """
+        images = {}
+        used_names = set()
+        counts = {'cases': 0, 'records': 0}
+
+        # 大小未知，强制使用 zip64 以支持超过 4GB 的清单
+        entry = zipfile.ZipInfo(EvidenceBundle.MANIFEST_NAME, time.localtime()[:6])
+        entry.compress_type = zipfile.ZIP_DEFLATED
+        with zf.open(entry, 'w', force_zip64=True) as raw:
+            manifest = io.TextIOWrapper(raw, encoding='utf-8', newline='\n')
+            header = {'type': 'bundle', 'version': EvidenceBundle.VERSION, 'created_at': int(time.time())}
+            manifest.write(json.dumps(header, ensure_ascii=False) + '\n')
+
+            for case in db.iter_bundle_cases(filters):
+                line = {'type': 'case'}
+                line.update((field, case[field]) for field in EvidenceBundle.CASE_FIELDS)
+                manifest.write(json.dumps(line, ensure_ascii=False) + '\n')
+                counts['cases'] += 1
+
+            for row in db.iter_export_rows(filters):
+                arcnames = []
+                for image_path in row['图片']:
+                    if image_path not in images:
+                        images[image_path] = EvidenceBundle._image_arcname(image_path, used_names)
+                    arcnames.append(images[image_path])
+                line = {
+                    'type': 'record',
+                    'record_id': row['记录ID'],
+                    'case_id': row['用例ID'],
+                    'status': row['执行状态'],
+                    'actual_result': row['实际结果'],
+                    'notes': row['备注'],
+                    'executor': row['执行人'],
+                    'timestamp': row['执行时间'],
+                    'images': arcnames,
+                }
+                manifest.write(json.dumps(line, ensure_ascii=False) + '\n')
+                counts['records'] += 1
+                if progress_callback and counts['records'] % EvidenceBundle.PROGRESS_INTERVAL == 0:
+                    progress_callback(int(min(counts['records'], total) / max(total, 1) * 50))
+            manifest.flush()
+            manifest.detach()
+        return counts, images
+
+    @staticmethod
+    def _write_images(zf, images, progress_callback):
+        """
+        写出记录引用的图片（进度 50-100）
+
+        Returns:
+            list: 原文件不存在的图片路径
+        """
+        missing = []
+        for index, (image_path, arcname) in enumerate(images.items(), 1):
+            if not os.path.isfile(image_path):
+                missing.append(image_path)
+                continue
+            ext = os.path.splitext(image_path)[1].lower()
+            compress_type = (zipfile.ZIP_STORED if ext in EvidenceBundle.STORED_EXTENSIONS
+                             else zipfile.ZIP_DEFLATED)
+            zf.write(image_path, arcname, compress_type=compress_type)
+            if progress_callback:
+                progress_callback(50 + int(index / len(images) * 49))
+        return missing
+
+    @staticmethod
+    def import_bundle(db, file_path, conflict_policy='skip', images_dir='images', progress_callback=None):
+        """
+        导入证据包
+
+        图片按内容哈希去重：包内内容相同的图片只保存一份，本地已有相同内容的同名图片直接复用。
+        清单逐行读取，用例与记录按批写入，全部数据在同一个事务中提交，失败时回滚并删除本次新写入的图片。
+        包内记录与本地记录的用例、执行时间、状态与执行人都相同时视为同一条记录，不重复导入。
+
+        Args:
+            db: Database 实例
+            file_path: 证据包路径
+            conflict_policy: 用例ID与本地冲突时的处理方式，见 CONFLICT_POLICIES
+                'skip' 保留本地用例，包内记录归入本地用例；
+                'overwrite' 用包内用例的内容覆盖本地用例；
+                'rename' 包内用例改用新ID（原ID加序号后缀）导入，内容与本地用例相同的直接对应到该用例
+            images_dir: 图片保存目录
+            progress_callback: 可选，进度回调，参数为百分比（0-100）
+
+        Returns:
+            dict: 导入结果统计
+        """
+        if conflict_policy not in EvidenceBundle.CONFLICT_POLICIES:
+            raise ValueError(f"不支持的冲突处理方式: {conflict_policy}")
+
+        result = {
+            'cases_added': 0, 'cases_updated': 0, 'cases_skipped': 0, 'cases_renamed': 0,
+            'records_added': 0, 'records_skipped': 0, 'images_added': 0, 'images_reused': 0,
+        }
+        written_images = []
+        with zipfile.ZipFile(file_path, 'r') as zf:
+            names = set(zf.namelist())
+            if EvidenceBundle.MANIFEST_NAME not in names:
+                raise ValueError("不是有效的证据包：缺少清单文件")
+            total_lines = 0
+            if EvidenceBundle.INFO_NAME in names:
+                counts = json.loads(zf.read(EvidenceBundle.INFO_NAME)).get('counts', {})
+                total_lines = counts.get('cases', 0) + counts.get('records', 0)
+
+            cursor = db.conn.cursor()
+            own_transaction = not db.conn.in_transaction
+            if own_transaction:
+                cursor.execute('BEGIN')
+            try:
+                image_paths = EvidenceBundle._import_images(zf, images_dir, result, written_images, progress_callback)
+                EvidenceBundle._import_manifest(zf, db, conflict_policy, image_paths, result,
+                                                total_lines, progress_callback)
+                if own_transaction:
+                    db.conn.commit()
+            except BaseException:
+                if own_transaction:
+                    db.conn.rollback()
+                for path in written_images:
+                    if os.path.exists(path):
+                        os.remove(path)
+                raise
+
+        if progress_callback:
+            progress_callback(100)
+        return result
+
+    @staticmethod
+    def _entry_hash(zf, entry):
+        """计算zip条目内容的SHA-1摘要（分块读取）"""
+        digest = hashlib.sha1()
+        with zf.open(entry) as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _import_images(zf, images_dir, result, written_images, progress_callback):
+        """
+        按内容哈希去重保存包内图片（进度 0-30）
+
+        Returns:
+            dict: 包内路径 -> 本地保存路径
+        """
+        entries = [entry for entry in zf.infolist()
+                   if entry.filename.startswith(EvidenceBundle.IMAGES_DIR + '/') and not entry.is_dir()]
+        os.makedirs(images_dir, exist_ok=True)
+
+        image_paths = {}
+        saved_by_hash = {}  # 内容哈希 -> 本地路径，包内重复的图片只保存一次
+        for index, entry in enumerate(entries, 1):
+            content_hash = EvidenceBundle._entry_hash(zf, entry)
+            local_path = saved_by_hash.get(content_hash)
+            if local_path is not None:
+                result['images_reused'] += 1
+            else:
+                # 同名文件内容相同则复用，否则在文件名后加上内容哈希
+                stem, ext = os.path.splitext(os.path.basename(entry.filename))
+                local_path = os.path.join(images_dir, stem + ext)
+                if os.path.exists(local_path) and not (
+                        os.path.getsize(local_path) == entry.file_size
+                        and ImageUtils.file_content_hash(local_path) == content_hash):
+                    local_path = os.path.join(images_dir, f"{stem}_{content_hash[:12]}{ext}")
+
+                if os.path.exists(local_path):
+                    result['images_reused'] += 1
+                else:
+                    temp_path = local_path + '.tmp'
+                    with zf.open(entry) as source, open(temp_path, 'wb') as target:
+                        shutil.copyfileobj(source, target, 1024 * 1024)
+                    os.replace(temp_path, local_path)
+                    written_images.append(local_path)
+                    result['images_added'] += 1
+                saved_by_hash[content_hash] = local_path
+            image_paths[entry.filename] = local_path
+            if progress_callback:
+                progress_callback(int(index / len(entries) * 30))
+        return image_paths
+
+    @staticmethod
+    def _import_manifest(zf, db, conflict_policy, image_paths, result, total_lines, progress_callback):
+        """逐行读取清单，按批写入用例与记录（进度 30-99）"""
+        cursor = db.conn.cursor()
+        case_ids = {}      # 包内用例ID -> 本地用例ID（改名导入时不同）
+        case_batch = []
+        record_batch = []
+        processed = 0
+
+        with zf.open(EvidenceBundle.MANIFEST_NAME) as raw:
+            for line in io.TextIOWrapper(raw, encoding='utf-8'):
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if item['type'] == 'case':
+                    case_batch.append(item)
+                    if len(case_batch) >= EvidenceBundle.IMPORT_BATCH_SIZE:
+                        EvidenceBundle._import_cases(cursor, case_batch, conflict_policy, case_ids, result)
+                        case_batch = []
+                elif item['type'] == 'record':
+                    # 清单中用例在记录之前，写入记录前先写完剩余的用例
+                    if case_batch:
+                        EvidenceBundle._import_cases(cursor, case_batch, conflict_policy, case_ids, result)
+                        case_batch = []
+                    record_batch.append(item)
+                    if len(record_batch) >= EvidenceBundle.IMPORT_BATCH_SIZE:
+                        EvidenceBundle._import_records(cursor, record_batch, case_ids, image_paths, result)
+                        record_batch = []
+                else:
+                    continue
+
+                processed += 1
+                if progress_callback and total_lines and processed % EvidenceBundle.PROGRESS_INTERVAL == 0:
+                    progress_callback(30 + int(min(processed, total_lines) / total_lines * 69))
+
+        if case_batch:
+            EvidenceBundle._import_cases(cursor, case_batch, conflict_policy, case_ids, result)
+        if record_batch:
+            EvidenceBundle._import_records(cursor, record_batch, case_ids, image_paths, result)
+
+    @staticmethod
+    def _local_cases(cursor, case_ids):
+        """
+        一次查询取出本地同ID的用例，以及此前改名导入产生的“原ID_序号”用例
+
+        Returns:
+            dict: 用例ID -> 除用例ID外各字段的取值
+        """
+        if not case_ids:
+            return {}
+        fields = EvidenceBundle.CASE_FIELDS
+        columns = ', '.join(f'c.{field}' for field in fields)
+        # '`' 是 '_' 之后的字符，范围条件可以使用主键索引
+        cursor.execute(f'''
+        SELECT {columns} FROM json_each(?) p JOIN test_cases c ON c.case_id = p.value
+        UNION ALL
+        SELECT {columns} FROM json_each(?) p JOIN test_cases c
+            ON c.case_id > p.value || '_' AND c.case_id < p.value || '`'
+        ''', (json.dumps(case_ids, ensure_ascii=False),) * 2)
+        return {row[0]: EvidenceBundle._case_values(row[1:]) for row in cursor.fetchall()}
+
+    @staticmethod
+    def _case_values(values):
+        """用于比较用例内容的字段取值（空值统一为空字符串）"""
+        return tuple(value or '' for value in values)
+
+    @staticmethod
+    def _import_cases(cursor, cases, conflict_policy, case_ids, result):
+        """
+        写入一批用例，并记录包内用例ID到本地用例ID的映射
+
+        改名导入时，内容与本地用例（或此前改名导入的“原ID_序号”用例）完全相同的包内用例直接对应到该用例，
+        不再生成新的序号，重复导入同一证据包不会产生新用例和重复记录。
+        """
+        local = EvidenceBundle._local_cases(cursor, [case['case_id'] for case in cases])
+        fields = EvidenceBundle.CASE_FIELDS
+        taken = {case['case_id'] for case in cases if case['case_id'] not in local}
+        inserts = []
+        updates = []
+        for case in cases:
+            case_id = case['case_id']
+            if case_id not in local:
+                inserts.append(case)
+                case_ids[case_id] = case_id
+                result['cases_added'] += 1
+            elif conflict_policy == 'skip':
+                case_ids[case_id] = case_id
+                result['cases_skipped'] += 1
+            elif conflict_policy == 'overwrite':
+                updates.append(case)
+                case_ids[case_id] = case_id
+                result['cases_updated'] += 1
+            else:
+                values = EvidenceBundle._case_values(case[field] for field in fields[1:])
+                suffixes = {}
+                for local_id in local:
+                    suffix = local_id[len(case_id) + 1:]
+                    if local_id.startswith(case_id + '_') and suffix.isdigit():
+                        suffixes[local_id] = int(suffix)
+                same = [local_id for local_id in [case_id] + sorted(suffixes, key=suffixes.get)
+                        if local[local_id] == values]
+                if same:
+                    case_ids[case_id] = same[0]
+                    result['cases_skipped'] += 1
+                    continue
+                # 改名导入：原ID加序号后缀，取已有序号之后的下一个
+                suffix = max(suffixes.values(), default=1) + 1
+                while f"{case_id}_{suffix}" in taken:
+                    suffix += 1
+                case_ids[case_id] = f"{case_id}_{suffix}"
+                taken.add(case_ids[case_id])
+                inserts.append(dict(case, case_id=case_ids[case_id]))
+                result['cases_renamed'] += 1
+
+        # 同时写入内容摘要，之后再从Excel导入相同内容时才能正确判断是否有变化
+        def row_values(case):
+            content = [case[field] for field in fields[1:]]
+            return content + [Database.case_content_hash(content)]
+
+        if inserts:
+            cursor.executemany(
+                f"INSERT INTO test_cases ({', '.join(fields)}, content_hash) VALUES ({', '.join('?' * (len(fields) + 1))})",
+                [[case['case_id']] + row_values(case) for case in inserts]
+            )
+        if updates:
+            cursor.executemany(
+                f"UPDATE test_cases SET {', '.join(f'{field} = ?' for field in fields[1:])}, content_hash = ? "
+                f"WHERE case_id = ?",
+                [row_values(case) + [case['case_id']] for case in updates]
+            )
+
+    @staticmethod
+    def _import_records(cursor, records, case_ids, image_paths, result):
+        """写入一批记录及其图片，跳过本地已有的相同记录"""
+        # 按执行时间范围一次查出本地可能重复的记录（执行时间有索引）
+        timestamps = [record['timestamp'] for record in records]
+        cursor.execute('''
+        SELECT case_id, timestamp, status, COALESCE(executor, '') FROM test_records
+        WHERE timestamp BETWEEN ? AND ?
+        ''', (min(timestamps), max(timestamps)))
+        existing = {tuple(row) for row in cursor.fetchall()}
+
+        # 记录ID在事务内预先分配（与自增规则一致：取历史最大值之后的连续编号），整批一次写入
+        cursor.execute('''
+        SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'test_records'), 0),
+                   COALESCE((SELECT MAX(record_id) FROM test_records), 0))
+        ''')
+        next_id = cursor.fetchone()[0] + 1
+
+        record_rows = []
+        image_rows = []
+        for record in records:
+            case_id = case_ids.get(record['case_id'], record['case_id'])
+            key = (case_id, record['timestamp'], record['status'], record['executor'] or '')
+            if key in existing:
+                result['records_skipped'] += 1
+                continue
+            existing.add(key)
+            record_rows.append((next_id, case_id, record['status'], record['actual_result'], record['notes'],
+                                record['executor'], record['timestamp']))
+            image_rows.extend(
+                (next_id, image_paths[arcname], order_index)
+                for order_index, arcname in enumerate(record['images'])
+                if arcname in image_paths
+            )
+            next_id += 1
+            result['records_added'] += 1
+
+        if record_rows:
+            cursor.executemany('''
+            INSERT INTO test_records (record_id, case_id, status, actual_result, notes, executor, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', record_rows)
+        if image_rows:
+            cursor.executemany('''
+            INSERT INTO record_images (record_id, image_path, order_index)
+            VALUES (?, ?, ?)
+            ''', image_rows)
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="导出或导入包含用例、记录与图片的证据包")
+    parser.add_argument('bundle', help="证据包zip文件路径")
+    parser.add_argument('--db', default='data/qa_test_logger.db', help="数据库文件路径")
+    parser.add_argument('--import', dest='import_bundle', action='store_true', help="导入证据包（默认为导出）")
+    parser.add_argument('--on-conflict', choices=list(EvidenceBundle.CONFLICT_POLICIES), default='skip',
+                        help="导入时用例ID冲突的处理方式：skip 保留本地用例，overwrite 覆盖，rename 改名导入")
+    parser.add_argument('--images-dir', default='images', help="导入时图片保存目录")
+    parser.add_argument('--start', help="开始日期 YYYY-MM-DD")
+    parser.add_argument('--end', help="结束日期 YYYY-MM-DD（包含当天）")
+    parser.add_argument('--status', help="执行状态")
+    parser.add_argument('--case-id', help="用例ID")
+    parser.add_argument('--project', help="项目ID")
+    parser.add_argument('--collection', help="案例集名称")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        if args.import_bundle:
+            result = EvidenceBundle.import_bundle(
+                db, args.bundle, args.on_conflict, args.images_dir,
+                progress_callback=lambda value: print(f"\r{value}%", end='', flush=True)
+            )
+            print(f"\n用例：新增 {result['cases_added']}，覆盖 {result['cases_updated']}，"
+                  f"保留本地 {result['cases_skipped']}，改名导入 {result['cases_renamed']}")
+            print(f"记录：新增 {result['records_added']}，跳过重复 {result['records_skipped']}")
+            print(f"图片：新增 {result['images_added']}，复用 {result['images_reused']}")
+            return
+
+        end_date = DateUtils.string_to_timestamp(args.end) if args.end else None
+        filters = {
+            'start_date': DateUtils.string_to_timestamp(args.start) if args.start else None,
+            # 与历史记录界面一致：结束日期包含当天
+            'end_date': end_date + 86400 if end_date else None,
+            'case_id': args.case_id,
+            'status': args.status,
+            'project_id': args.project,
+            'collection_name': args.collection,
+        }
+        info = EvidenceBundle.export(
+            db, args.bundle, filters,
+            progress_callback=lambda value: print(f"\r{value}%", end='', flush=True)
+        )
+    finally:
+        db.close()
+    counts = info['counts']
+    print(f"\n已导出 {counts['cases']} 个用例、{counts['records']} 条记录、{counts['images']} 张图片: {args.bundle}")
+    if info['missing_images']:
+        print(f"缺失图片 {len(info['missing_images'])} 张，详见包内 {EvidenceBundle.INFO_NAME}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import os
 import sqlite3
 import json
+import hashlib
 from datetime import datetime
 from typing import Optional
 
@@ -8,6 +9,28 @@ from typing import Optional
 class Database:
     """数据库操作类，封装所有与SQLite数据库相关的操作"""
     
+    # 64位感知哈希分为4段、每段16位
+    HASH_BANDS = 4
+    HASH_BAND_BITS = 16
+    
+    # 导入用例：用例ID已存在时原地更新各字段
+    CASE_UPSERT_SQL = '''
+    INSERT INTO test_cases 
+    (case_id, scenario, test_steps, expected_result, priority, case_collection_name, project_id, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(case_id) DO UPDATE SET
+        scenario = excluded.scenario,
+        test_steps = excluded.test_steps,
+        expected_result = excluded.expected_result,
+        priority = excluded.priority,
+        case_collection_name = excluded.case_collection_name,
+        project_id = excluded.project_id,
+        content_hash = excluded.content_hash
+    '''
+    
+    # 导入预览中列出的用例ID数量
+    IMPORT_PREVIEW_IDS = 20
+    
     def __init__(self, db_path='data/qa_test_logger.db'):
         """初始化数据库连接"""
         # 确保数据目录存在
@@ -42,7 +65,8 @@ class Database:
             expected_result TEXT NOT NULL,
             priority TEXT,
             case_collection_name TEXT,
-            project_id TEXT
+            project_id TEXT,
+            content_hash TEXT
         )
         ''')
         
@@ -71,6 +95,36 @@ class Database:
         )
         ''')
         
+        # 创建图片感知哈希表（按16位分段建立索引，用于近似重复检索）
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS image_hashes (
+            image_path TEXT PRIMARY KEY,
+            case_id TEXT,
+            dhash TEXT NOT NULL,
+            band0 INTEGER NOT NULL,
+            band1 INTEGER NOT NULL,
+            band2 INTEGER NOT NULL,
+            band3 INTEGER NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+        ''')
+        for band in range(self.HASH_BANDS):
+            self.cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_image_hashes_band{band} ON image_hashes(band{band})')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_image_hashes_case ON image_hashes(case_id)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_record_images_path ON record_images(image_path)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_record_images_record ON record_images(record_id)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_records_timestamp ON test_records(timestamp)')
+        
+        # 数据变更计数：用例、记录与图片表的任何增删改都会使计数加1（跨进程、重启后仍有效），
+        # 用于判断导出缓存与断点续传检查点是否过期
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            counter INTEGER NOT NULL
+        )
+        ''')
+        self.cursor.execute('INSERT OR IGNORE INTO data_version (id, counter) VALUES (1, 0)')
+        
         self.conn.commit()
         
         # 检查是否需要迁移旧数据
@@ -78,6 +132,60 @@ class Database:
         self._migrate_precondition_to_test_steps()
         self._migrate_add_case_collection_name()
         self._migrate_add_project_id()
+        self._migrate_add_content_hash()
+        self._migrate_add_change_seq()
+        self._create_version_triggers()
+    
+    def _migrate_add_change_seq(self):
+        """为 test_records 表增加 change_seq 列（如缺失）：记录最后一次新增或修改时的数据变更计数"""
+        try:
+            self.cursor.execute("PRAGMA table_info(test_records)")
+            columns = self.cursor.fetchall()
+            has_col = any(col['name'] == 'change_seq' for col in columns)
+            if not has_col:
+                self.cursor.execute("ALTER TABLE test_records ADD COLUMN change_seq INTEGER")
+            self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_test_records_change_seq ON test_records(change_seq)')
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"添加变更序号列失败: {e}")
+    
+    def _create_version_triggers(self):
+        """
+        创建维护数据变更计数的触发器
+        
+        用例、记录与图片表的任何增删改都使 data_version 计数加1；记录新增、修改或其图片变化时，
+        同时把记录的 change_seq 设为新的计数，增量导出据此找出上次导出后变化的记录。
+        """
+        bump = "UPDATE data_version SET counter = counter + 1 WHERE id = 1;"
+        mark_record = ("UPDATE test_records SET change_seq = (SELECT counter FROM data_version WHERE id = 1) "
+                       "WHERE record_id = {}.record_id;")
+        # 修改 change_seq 本身不触发记录的更新触发器
+        record_columns = "case_id, status, actual_result, notes, executor, timestamp"
+        triggers = {
+            'trg_test_cases_insert_version': f"AFTER INSERT ON test_cases BEGIN {bump} END",
+            'trg_test_cases_update_version': f"AFTER UPDATE ON test_cases BEGIN {bump} END",
+            'trg_test_cases_delete_version': f"AFTER DELETE ON test_cases BEGIN {bump} END",
+            'trg_test_records_insert_version': f"AFTER INSERT ON test_records BEGIN {bump} {mark_record.format('NEW')} END",
+            'trg_test_records_update_version': (f"AFTER UPDATE OF {record_columns} ON test_records "
+                                                f"BEGIN {bump} {mark_record.format('NEW')} END"),
+            'trg_test_records_delete_version': f"AFTER DELETE ON test_records BEGIN {bump} END",
+            'trg_record_images_insert_version': f"AFTER INSERT ON record_images BEGIN {bump} {mark_record.format('NEW')} END",
+            'trg_record_images_update_version': f"AFTER UPDATE ON record_images BEGIN {bump} {mark_record.format('NEW')} END",
+            'trg_record_images_delete_version': f"AFTER DELETE ON record_images BEGIN {bump} {mark_record.format('OLD')} END",
+        }
+        try:
+            # 触发器定义变化时重新创建（旧版本的触发器不维护 change_seq）
+            self.cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%_version'")
+            existing = {row['name']: row['sql'] for row in self.cursor.fetchall()}
+            for name, body in triggers.items():
+                sql = f"CREATE TRIGGER {name} {body}"
+                if existing.get(name) == sql:
+                    continue
+                self.cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+                self.cursor.execute(sql)
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"创建数据变更触发器失败: {e}")
     
     def _migrate_old_image_data(self):
         """迁移旧的图片数据到新表"""
@@ -151,6 +259,17 @@ class Database:
         except sqlite3.Error as e:
             print(f"添加项目ID列失败: {e}")
     
+    def _migrate_add_content_hash(self):
+        """为 test_cases 表增加 content_hash 列（如缺失），已有用例在下次导入时补写摘要"""
+        try:
+            self.cursor.execute("PRAGMA table_info(test_cases)")
+            columns = self.cursor.fetchall()
+            if not any(col['name'] == 'content_hash' for col in columns):
+                self.cursor.execute("ALTER TABLE test_cases ADD COLUMN content_hash TEXT")
+                self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"添加用例内容摘要列失败: {e}")
+    
     def import_test_cases(self, cases_data, case_collection_name: Optional[str] = None):
         """
         导入测试用例数据
@@ -162,52 +281,154 @@ class Database:
         Returns:
             tuple: (成功导入的数量, 总数量)
         """
-        success_count = 0
-        total_count = len(cases_data)
-        
-        # 首先检查是否有已存在的案例，并获取其案例集名称
-        existing_collection_name = None
-        for case in cases_data:
-            try:
-                case_id = case.get('用例ID', '')
-                self.cursor.execute('SELECT case_collection_name FROM test_cases WHERE case_id = ?', (case_id,))
-                row = self.cursor.fetchone()
-                if row and row['case_collection_name']:
-                    existing_collection_name = row['case_collection_name']
-                    break
-            except sqlite3.Error:
-                continue
-
-        # 如果没有在参数中指定案例集名称，但找到了已存在案例的集名称，就使用已存在的
-        final_collection_name = case_collection_name or existing_collection_name
+        result = self.import_test_case_batches([cases_data], case_collection_name)
+        return result['success_count'], result['total_count']
+    
+    def import_test_case_batches(self, batches, case_collection_name: Optional[str] = None, progress_callback=None):
+        """
+        按批导入测试用例数据（配合 ExcelParser.iter_excel_batches 流式导入）
         
-        for case in cases_data:
-            try:
-                # 如果案例中自带案例集名称，优先使用案例中的
-                case_specific_collection = case.get('案例集名称')
-                
-                case_id = case.get('用例ID', '')
-                project_id = case_id[:12] if case_id else ''  # 取案例ID的前12位作为项目ID
+        每批一次查询取出已存在用例的内容摘要，只写入新增和内容有变化的用例，未变化的用例不改写；
+        所有批次在同一个事务中写入，解析或写入过程中抛出异常时整体回滚。
+        未指定案例集名称时，从第一个含有已存在用例的批次起使用其案例集名称，之前的批次不回头改写；
+        需要按整个文件确定案例集名称时，先调用 plan_test_case_import，将其返回的 collection_name 传入。
+        
+        Args:
+            batches: 可迭代对象，每个元素是一批测试用例数据（字典列表）
+            case_collection_name: 可选的案例集名称
+            progress_callback: 可选，每批写入后调用，参数为已处理的用例数量
+        
+        Returns:
+            dict: success_count（成功数量，含未变化的用例）、total_count、added、updated、unchanged
+        """
+        result = {'success_count': 0, 'total_count': 0, 'added': 0, 'updated': 0, 'unchanged': 0}
+        final_collection_name = case_collection_name
+        
+        own_transaction = not self.conn.in_transaction
+        if own_transaction:
+            self.cursor.execute('BEGIN')
+        try:
+            for cases_data in batches:
+                if not final_collection_name:
+                    # 没有在参数中指定案例集名称时，使用已存在案例的集名称（取第一个有已存在案例的批次）
+                    final_collection_name = self._existing_collection_name(cases_data)
                 
-                self.cursor.execute('''
-                INSERT OR REPLACE INTO test_cases 
-                (case_id, scenario, test_steps, expected_result, priority, case_collection_name, project_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    case_id,
-                    case.get('测试场景', ''),
-                    (case.get('测试步骤') or case.get('前置条件') or ''),
-                    case.get('预期结果', ''),
-                    case.get('优先级', ''),
-                    case_specific_collection or final_collection_name,
-                    project_id
-                ))
-                success_count += 1
-            except sqlite3.Error as e:
-                print(f"导入用例失败: {e}, 用例: {case}")
+                result['total_count'] += len(cases_data)
+                changed = []
+                for case, row, kind in self._classify_case_batch(cases_data, final_collection_name):
+                    if kind == 'unchanged':
+                        result['unchanged'] += 1
+                        result['success_count'] += 1
+                    else:
+                        changed.append((case, row, kind))
+                try:
+                    self.cursor.executemany(self.CASE_UPSERT_SQL, [row for _, row, _ in changed])
+                    written = changed
+                except sqlite3.Error:
+                    # 整批写入失败时逐条写入，跳过有问题的用例
+                    written = []
+                    for case, row, kind in changed:
+                        try:
+                            self.cursor.execute(self.CASE_UPSERT_SQL, row)
+                            written.append((case, row, kind))
+                        except sqlite3.Error as e:
+                            print(f"导入用例失败: {e}, 用例: {case}")
+                for _, _, kind in written:
+                    result[kind] += 1
+                result['success_count'] += len(written)
+                if progress_callback:
+                    progress_callback(result['total_count'])
+            if own_transaction:
+                self.conn.commit()
+        except BaseException:
+            if own_transaction:
+                self.conn.rollback()
+            raise
+        return result
+    
+    def plan_test_case_import(self, batches, case_collection_name: Optional[str] = None, progress_callback=None):
+        """
+        导入预览：按与 import_test_case_batches 相同的规则比对内容摘要，不写入数据库
         
-        self.conn.commit()
-        return success_count, total_count
+        Returns:
+            dict: added、updated、unchanged 数量，added_ids、updated_ids（各最多 IMPORT_PREVIEW_IDS 个），
+                  以及 collection_name：指定的案例集名称，未指定时为全部批次中第一个已存在用例的案例集名称（没有时为 None）
+        """
+        plan = {'added': 0, 'updated': 0, 'unchanged': 0, 'added_ids': [], 'updated_ids': []}
+        final_collection_name = case_collection_name
+        processed = 0
+        for cases_data in batches:
+            if not final_collection_name:
+                final_collection_name = self._existing_collection_name(cases_data)
+            for _, row, kind in self._classify_case_batch(cases_data, final_collection_name):
+                plan[kind] += 1
+                if kind != 'unchanged' and len(plan[f'{kind}_ids']) < self.IMPORT_PREVIEW_IDS:
+                    plan[f'{kind}_ids'].append(row[0])
+            processed += len(cases_data)
+            if progress_callback:
+                progress_callback(processed)
+        plan['collection_name'] = final_collection_name or None
+        return plan
+    
+    def _classify_case_batch(self, cases_data, collection_name):
+        """
+        一次查询比对一批用例与数据库中的内容摘要
+        
+        Returns:
+            list: (用例字典, 写入参数, 'added' | 'updated' | 'unchanged')
+        """
+        rows = [self._case_row(case, collection_name) for case in cases_data]
+        self.cursor.execute('''
+        SELECT case_id, content_hash FROM test_cases
+        WHERE case_id IN (SELECT value FROM json_each(?))
+        ''', (json.dumps([row[0] for row in rows], ensure_ascii=False),))
+        stored = {row['case_id']: row['content_hash'] for row in self.cursor.fetchall()}
+        
+        classified = []
+        for case, row in zip(cases_data, rows):
+            if row[0] not in stored:
+                kind = 'added'
+            elif stored[row[0]] == row[-1]:
+                kind = 'unchanged'
+            else:
+                # 摘要不同或尚未记录摘要的旧数据
+                kind = 'updated'
+            classified.append((case, row, kind))
+        return classified
+    
+    @staticmethod
+    def _case_row(case, collection_name):
+        """用例字典转换为写入 test_cases 的参数，最后一项为除用例ID外各字段的内容摘要"""
+        case_id = case.get('用例ID', '')
+        values = (
+            case.get('测试场景', ''),
+            (case.get('测试步骤') or case.get('前置条件') or ''),
+            case.get('预期结果', ''),
+            case.get('优先级', ''),
+            # 如果案例中自带案例集名称，优先使用案例中的
+            case.get('案例集名称') or collection_name,
+            case_id[:12] if case_id else ''  # 取案例ID的前12位作为项目ID
+        )
+        return (case_id,) + values + (Database.case_content_hash(values),)
+    
+    @staticmethod
+    def case_content_hash(values):
+        """
+        用例内容摘要，写入 test_cases 的 content_hash 列
+        
+        Args:
+            values: scenario、test_steps、expected_result、priority、case_collection_name、project_id 的取值（按此顺序）
+        """
+        return hashlib.sha1(json.dumps(tuple(values), ensure_ascii=False).encode('utf-8')).hexdigest()
+    
+    def _existing_collection_name(self, cases_data):
+        """返回这批用例中已存在于数据库的用例的案例集名称，没有时返回 None"""
+        case_ids = [case.get('用例ID', '') for case in cases_data]
+        existing = self.get_existing_case_collections(case_ids)
+        for case_id in case_ids:
+            if existing.get(case_id):
+                return existing[case_id]
+        return None
     
     def get_all_test_cases(self):
         """获取所有测试用例，兼容旧数据，将 test_steps 标准化"""
@@ -231,6 +452,50 @@ class Database:
         row_dict['test_steps'] = row_dict.get('test_steps') or row_dict.get('precondition') or None
         return row_dict
     
+    def get_existing_case_collections(self, case_ids):
+        """
+        一次查询返回给定用例ID中已存在的用例及其案例集名称
+        
+        用例ID列表以JSON数组作为单个参数传入（json_each），不受SQL参数个数限制，
+        按主键逐个查找，不扫描整张用例表。
+        
+        Args:
+            case_ids: 用例ID列表
+        
+        Returns:
+            dict: 已存在的用例ID -> 案例集名称（未设置时为 None）
+        """
+        if not case_ids:
+            return {}
+        self.cursor.execute('''
+        SELECT case_id, case_collection_name FROM test_cases
+        WHERE case_id IN (SELECT value FROM json_each(?))
+        ''', (json.dumps(list(case_ids), ensure_ascii=False),))
+        return {row['case_id']: row['case_collection_name'] for row in self.cursor.fetchall()}
+    
+    def get_test_cases_by_ids(self, case_ids):
+        """
+        一次查询批量获取测试用例，按传入顺序返回已存在的用例，test_steps 标准化方式与 get_test_case 一致
+        
+        Args:
+            case_ids: 用例ID列表
+        
+        Returns:
+            list: 用例字典列表
+        """
+        if not case_ids:
+            return []
+        self.cursor.execute('''
+        SELECT * FROM test_cases
+        WHERE case_id IN (SELECT value FROM json_each(?))
+        ''', (json.dumps(list(case_ids), ensure_ascii=False),))
+        cases = {}
+        for row in self.cursor.fetchall():
+            row_dict = dict(row)
+            row_dict['test_steps'] = row_dict.get('test_steps') or row_dict.get('precondition') or None
+            cases[row_dict['case_id']] = row_dict
+        return [cases[case_id] for case_id in case_ids if case_id in cases]
+    
     def save_test_record(self, case_id, status, actual_result='', notes='', image_paths=None, executor=''):
         """
         保存测试执行记录，如果已存在则更新，否则创建新记录
@@ -358,6 +623,104 @@ class Database:
         
         return [row['image_path'] for row in self.cursor.fetchall()]
     
+    def _hash_bands(self, hash_value):
+        """将64位哈希拆分为各段的整数值"""
+        mask = (1 << self.HASH_BAND_BITS) - 1
+        return [(hash_value >> (band * self.HASH_BAND_BITS)) & mask for band in range(self.HASH_BANDS)]
+    
+    def save_image_hash(self, image_path, case_id, hash_value):
+        """
+        保存图片的感知哈希
+        
+        Args:
+            image_path: 图片路径
+            case_id: 图片所属测试用例ID
+            hash_value: 64位dHash值
+        """
+        bands = self._hash_bands(hash_value)
+        self.cursor.execute('''
+        INSERT OR REPLACE INTO image_hashes
+        (image_path, case_id, dhash, band0, band1, band2, band3, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (image_path, case_id, f"{hash_value:016x}", *bands, int(datetime.now().timestamp())))
+        self.conn.commit()
+    
+    def find_similar_images(self, hash_value, max_distance=4, case_id=None, pending_paths=None, exclude_path=None):
+        """
+        查找与给定哈希近似的图片
+        
+        采用多段索引：若两个64位哈希的汉明距离不超过d，则4段中至少有一段的距离不超过 d // 4，
+        因此只需按各段在该半径内的取值查询索引，再对少量候选计算精确距离。
+        
+        Args:
+            hash_value: 64位dHash值
+            max_distance: 最大汉明距离（0-15）
+            case_id: 可选，限定在该用例所属案例集范围内（无案例集时限定为该用例）
+            pending_paths: 可选，尚未保存到记录中的图片路径（如当前编辑中的图片），同样参与比较
+            exclude_path: 可选，排除的图片路径（通常为新图片自身）
+            
+        Returns:
+            list: 近似图片列表，每项包含 image_path、case_id、distance，按距离升序
+        """
+        max_distance = max(0, min(int(max_distance), 15))
+        radius = max_distance // self.HASH_BANDS
+        
+        # 枚举每段在半径内的所有取值（16位，半径3以内最多697个）
+        def neighbours(value):
+            result = {value}
+            frontier = {value}
+            for _ in range(radius):
+                frontier = {v ^ (1 << bit) for v in frontier for bit in range(self.HASH_BAND_BITS)}
+                result |= frontier
+            return result
+        
+        band_conditions = []
+        for band, value in enumerate(self._hash_bands(hash_value)):
+            values = ', '.join(str(v) for v in sorted(neighbours(value)))
+            band_conditions.append(f"h.band{band} IN ({values})")
+        
+        conditions = [f"({' OR '.join(band_conditions)})"]
+        params = []
+        
+        # 只比较仍被记录引用或正在编辑中的图片
+        pending_paths = [p for p in (pending_paths or []) if p]
+        if pending_paths:
+            placeholders = ', '.join('?' for _ in pending_paths)
+            conditions.append(f"(h.image_path IN ({placeholders}) OR EXISTS (SELECT 1 FROM record_images ri WHERE ri.image_path = h.image_path))")
+            params.extend(pending_paths)
+        else:
+            conditions.append("EXISTS (SELECT 1 FROM record_images ri WHERE ri.image_path = h.image_path)")
+        
+        if case_id:
+            self.cursor.execute('SELECT case_collection_name FROM test_cases WHERE case_id = ?', (case_id,))
+            row = self.cursor.fetchone()
+            collection_name = row['case_collection_name'] if row else None
+            if collection_name:
+                conditions.append("(h.case_id = ? OR c.case_collection_name = ?)")
+                params.extend([case_id, collection_name])
+            else:
+                conditions.append("h.case_id = ?")
+                params.append(case_id)
+        
+        if exclude_path:
+            conditions.append("h.image_path != ?")
+            params.append(exclude_path)
+        
+        self.cursor.execute(f'''
+        SELECT h.image_path, h.case_id, h.dhash
+        FROM image_hashes h
+        LEFT JOIN test_cases c ON c.case_id = h.case_id
+        WHERE {' AND '.join(conditions)}
+        ''', params)
+        
+        result = []
+        for row in self.cursor.fetchall():
+            distance = bin(int(row['dhash'], 16) ^ hash_value).count('1')
+            if distance <= max_distance:
+                result.append({'image_path': row['image_path'], 'case_id': row['case_id'], 'distance': distance})
+        result.sort(key=lambda item: item['distance'])
+        return result
+    
     def get_test_records(self, case_id=None, status=None, start_date=None, end_date=None):
         """
         获取测试记录，支持多种筛选条件
@@ -574,6 +937,9 @@ class Database:
             # 删除所有相关的测试记录
             self.cursor.execute('DELETE FROM test_records WHERE case_id = ?', (case_id,))
             
+            # 删除图片感知哈希
+            self.cursor.execute('DELETE FROM image_hashes WHERE case_id = ?', (case_id,))
+            
             # 删除测试用例
             self.cursor.execute('DELETE FROM test_cases WHERE case_id = ?', (case_id,))
             
@@ -603,7 +969,237 @@ class Database:
             self.conn.rollback()
             raise Exception(f"删除测试集失败: {str(e)}")
     
-    def export_test_records(self, start_date=None, end_date=None, case_id=None, status=None, project_id=None, collection_name=None, search_text=None):
+    def _export_query_parts(self, filters):
+        """
+        根据导出筛选条件生成 WHERE 子句与参数（与历史记录界面的筛选逻辑一致）
+        
+        Args:
+            filters: 筛选条件字典，支持 start_date、end_date、case_id、status、
+                     project_id、collection_name、search_text、since_change
+            
+        Returns:
+            tuple: (WHERE 子句（可能为空字符串）, 参数列表)
+        """
+        filters = filters or {}
+        conditions = []
+        params = []
+        
+        if filters.get('case_id'):
+            conditions.append("r.case_id = ?")
+            params.append(filters['case_id'])
+        
+        if filters.get('status'):
+            conditions.append("r.status = ?")
+            params.append(filters['status'])
+        
+        if filters.get('start_date'):
+            conditions.append("r.timestamp >= ?")
+            params.append(filters['start_date'])
+        
+        if filters.get('end_date'):
+            conditions.append("r.timestamp <= ?")
+            params.append(filters['end_date'])
+        
+        # 增量导出：只取数据变更计数大于该值（上次导出之后新增或修改）的记录
+        if filters.get('since_change') is not None:
+            conditions.append("r.change_seq > ?")
+            params.append(filters['since_change'])
+        
+        # 按项目ID筛选（用例ID前缀）
+        if filters.get('project_id'):
+            conditions.append("substr(r.case_id, 1, ?) = ?")
+            params.extend([len(filters['project_id']), filters['project_id']])
+        
+        # 按案例集筛选（空字符串表示未归入案例集的用例）
+        if filters.get('collection_name') is not None:
+            conditions.append("COALESCE(c.case_collection_name, '') = ?")
+            params.append(filters['collection_name'])
+        
+        # 按搜索关键字筛选：包含中文时匹配测试场景，否则匹配用例ID
+        search_text = filters.get('search_text')
+        if search_text:
+            has_chinese = any('\u4e00' <= char <= '\u9fff' for char in search_text)
+            if has_chinese:
+                conditions.append("instr(lower(COALESCE(c.scenario, '')), ?) > 0")
+            else:
+                conditions.append("instr(lower(r.case_id), ?) > 0")
+            params.append(search_text.lower())
+        
+        where_clause = " WHERE " + " AND ".join(conditions) if conditions else ""
+        return where_clause, params
+    
+    def count_export_rows(self, filters=None):
+        """统计符合导出筛选条件的记录数"""
+        where_clause, params = self._export_query_parts(filters)
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+        SELECT COUNT(*) AS total
+        FROM test_records r
+        JOIN test_cases c ON c.case_id = r.case_id{where_clause}
+        ''', params)
+        return cursor.fetchone()['total']
+    
+    def get_change_counter(self):
+        """数据变更计数：用例、记录或图片有任何增删改后都会变化"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT counter FROM data_version WHERE id = 1')
+        row = cursor.fetchone()
+        return row['counter'] if row else 0
+    
+    def get_export_fingerprint(self, filters=None):
+        """
+        导出数据指纹（记录数、最大记录ID与数据变更计数），用于判断断点续传的检查点是否仍然有效
+        
+        Returns:
+            dict: {'total': 记录数, 'max_record_id': 最大记录ID, 'change_counter': 数据变更计数}
+        """
+        where_clause, params = self._export_query_parts(filters)
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+        SELECT COUNT(*) AS total, MAX(r.record_id) AS max_record_id
+        FROM test_records r
+        JOIN test_cases c ON c.case_id = r.case_id{where_clause}
+        ''', params)
+        row = cursor.fetchone()
+        return {'total': row['total'], 'max_record_id': row['max_record_id'],
+                'change_counter': self.get_change_counter()}
+    
+    def get_export_collections(self, filters=None):
+        """
+        按案例集统计符合导出筛选条件的记录数
+        
+        Returns:
+            list: [(案例集名称（未归入案例集为空字符串）, 记录数)]，按名称排序
+        """
+        where_clause, params = self._export_query_parts(filters)
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+        SELECT COALESCE(c.case_collection_name, '') AS collection_name, COUNT(*) AS total
+        FROM test_records r
+        JOIN test_cases c ON c.case_id = r.case_id{where_clause}
+        GROUP BY COALESCE(c.case_collection_name, '')
+        ORDER BY collection_name
+        ''', params)
+        return [(row['collection_name'], row['total']) for row in cursor.fetchall()]
+    
+    def get_export_summary_counts(self, filters=None):
+        """
+        按案例集、优先级、执行人、执行日期与状态分组统计符合导出筛选条件的记录数
+        
+        一次分组查询得到最细粒度的计数，各维度的汇总再由调用方在这个（很小的）结果上聚合，
+        不需要逐条读取记录。
+        
+        Returns:
+            list: [(案例集, 优先级, 执行人, 日期 YYYY-MM-DD, 状态, 记录数)]
+        """
+        where_clause, params = self._export_query_parts(filters)
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+        SELECT
+            COALESCE(c.case_collection_name, '') AS collection_name,
+            COALESCE(c.priority, '') AS priority,
+            COALESCE(r.executor, '') AS executor,
+            strftime('%Y-%m-%d', r.timestamp, 'unixepoch', 'localtime') AS day,
+            r.status,
+            COUNT(*) AS total
+        FROM test_records r
+        JOIN test_cases c ON c.case_id = r.case_id{where_clause}
+        GROUP BY 1, 2, 3, 4, 5
+        ''', params)
+        return [tuple(row) for row in cursor.fetchall()]
+    
+    def iter_export_rows(self, filters=None, batch_size=1000, offset=0, limit=None):
+        """
+        以生成器方式逐行读取导出数据（记录与用例连接后的结果），内存占用与记录数无关
+        
+        Args:
+            filters: 筛选条件字典，见 _export_query_parts
+            batch_size: 每次从游标读取的行数
+            offset: 跳过前 offset 行（排序固定，可用于分段续传）
+            limit: 可选，最多读取的行数
+            
+        Yields:
+            dict: 单条导出数据，键与 export_test_records 的结果一致
+        """
+        where_clause, params = self._export_query_parts(filters)
+        
+        # 增量导出的记录很少：按 change_seq 索引查找后再排序，避免沿执行时间索引扫描全表
+        order_column = "+r.timestamp" if (filters or {}).get('since_change') is not None else "r.timestamp"
+        
+        # 使用独立游标，避免与其他查询互相覆盖结果集
+        cursor = self.conn.cursor()
+        cursor.execute(f'''
+        SELECT
+            c.case_id, c.scenario, c.test_steps, c.expected_result, c.priority,
+            c.case_collection_name, c.project_id,
+            r.record_id, r.status, r.actual_result, r.notes, r.executor, r.timestamp,
+            (SELECT group_concat(image_path, char(10)) FROM (
+                SELECT image_path FROM record_images
+                WHERE record_id = r.record_id
+                ORDER BY order_index
+            )) AS images
+        FROM test_records r
+        JOIN test_cases c ON c.case_id = r.case_id{where_clause}
+        ORDER BY {order_column} DESC, r.record_id DESC
+        LIMIT ? OFFSET ?
+        ''', params + [-1 if limit is None else limit, offset])
+        
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield {
+                    '记录ID': row['record_id'],
+                    '用例ID': row['case_id'],
+                    '测试场景': row['scenario'],
+                    '测试步骤': row['test_steps'],
+                    '预期结果': row['expected_result'],
+                    '优先级': row['priority'],
+                    '案例集名称': row['case_collection_name'],
+                    '项目ID': row['project_id'],
+                    '执行状态': row['status'],
+                    '实际结果': row['actual_result'],
+                    '备注': row['notes'],
+                    '执行人': row['executor'],
+                    '执行时间': row['timestamp'],
+                    '图片': row['images'].split('\n') if row['images'] else []
+                }
+    
+    def iter_bundle_cases(self, filters=None, batch_size=1000):
+        """
+        以生成器方式读取证据包中的用例：筛选条件为空时为全部用例，否则为符合条件的记录所属的用例
+        
+        Args:
+            filters: 筛选条件字典，见 _export_query_parts
+            batch_size: 每次从游标读取的行数
+            
+        Yields:
+            dict: 用例数据，键与 test_cases 表的列名一致
+        """
+        cursor = self.conn.cursor()
+        if any(value is not None for value in (filters or {}).values()):
+            where_clause, params = self._export_query_parts(filters)
+            cursor.execute(f'''
+            SELECT * FROM test_cases
+            WHERE case_id IN (
+                SELECT r.case_id
+                FROM test_records r
+                JOIN test_cases c ON c.case_id = r.case_id{where_clause}
+            )
+            ORDER BY case_id
+            ''', params)
+        else:
+            cursor.execute('SELECT * FROM test_cases ORDER BY case_id')
+        
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
+    
+    def export_test_records(self, start_date=None, end_date=None, case_id=None, status=None, project_id=None, collection_name=None, search_text=None, since_change=None):
         """
         导出测试记录数据
         
@@ -615,53 +1211,19 @@ class Database:
             project_id: 可选，按项目ID筛选
             collection_name: 可选，按案例集名称筛选
             search_text: 可选，和历史界面一致的搜索逻辑（中文匹配场景，否则匹配用例ID）
+            since_change: 可选，只导出数据变更计数大于该值（之后新增或修改）的记录，见 get_change_counter
             
         Returns:
             list: 包含完整测试记录数据的列表
         """
-        # 获取筛选后的记录
-        records = self.get_test_records(case_id, status, start_date, end_date)
-        
-        # 获取对应的测试用例详情
-        result = []
-        for record in records:
-            case = self.get_test_case(record['case_id'])
-            if not case:
-                continue
-
-            # 按项目ID筛选
-            if project_id:
-                if not record['case_id'].startswith(project_id):
-                    continue
-
-            # 按案例集筛选
-            if collection_name:
-                if (case.get('case_collection_name') or '') != collection_name:
-                    continue
-
-            # 按搜索关键字筛选（与历史记录界面逻辑一致）
-            if search_text:
-                has_chinese = any('\u4e00' <= char <= '\u9fff' for char in search_text)
-                if has_chinese:
-                    if not case.get('scenario') or search_text.lower() not in case['scenario'].lower():
-                        continue
-                else:
-                    if search_text.lower() not in record['case_id'].lower():
-                        continue
-
-            # 合并用例和记录数据
-            export_data = {
-                '用例ID': case['case_id'],
-                '测试场景': case['scenario'],
-                '测试步骤': case.get('test_steps'),
-                '预期结果': case['expected_result'],
-                '优先级': case['priority'],
-                '执行状态': record['status'],
-                '实际结果': record['actual_result'],
-                '备注': record['notes'],
-                '执行时间': record['timestamp'],
-                '图片': record['images']
-            }
-            result.append(export_data)
-        
-        return result
\ No newline at end of file
+        filters = {
+            'start_date': start_date,
+            'end_date': end_date,
+            'case_id': case_id,
+            'status': status,
+            'project_id': project_id,
+            'collection_name': collection_name,
+            'search_text': search_text,
+            'since_change': since_change
+        }
+        return list(self.iter_export_rows(filters))
@@ -1,40 +1,255 @@
+import io
+import os
+import csv
+import codecs
+
 import pandas as pd
+from openpyxl import load_workbook
 
 
 class ExcelParser:
-    """Excel文件解析器，用于导入测试用例"""
-    
+    """Excel与CSV/TSV文件解析器，用于导入测试用例"""
+
+    # 必须存在的列
+    REQUIRED_COLUMNS = ['用例ID', '测试场景', '预期结果']
+
+    # 每批交给数据库写入的行数
+    BATCH_SIZE = 1000
+
+    # 文件头标识：xlsx 为zip包，旧版 xls 为OLE复合文档，其余按分隔文本（CSV/TSV）处理
+    XLSX_SIGNATURE = b'PK\x03\x04'
+    XLS_SIGNATURE = b'\xd0\xcf\x11\xe0'
+
+    # 检测文本编码与分隔符时读取的字节数
+    TEXT_SAMPLE_BYTES = 64 * 1024
+
+    # 可识别的分隔符
+    TEXT_DELIMITERS = ',\t;|'
+
     @staticmethod
     def parse_excel(file_path):
         """
         解析Excel文件，提取测试用例数据
-        
+
         Args:
-            file_path: Excel文件路径
-            
+            file_path: Excel或CSV/TSV文件路径
+
         Returns:
             list: 包含测试用例数据的列表，每个元素是一个字典
         """
+        cases_data = []
+        for batch in ExcelParser.iter_excel_batches(file_path):
+            cases_data.extend(batch)
+        return cases_data
+
+    @staticmethod
+    def list_sheets(file_path):
+        """
+        列出工作簿中的工作表
+
+        Returns:
+            list: (工作表名称, 数据行数) 列表，行数取自工作表尺寸信息，未知时为 None
+        """
+        file_format = ExcelParser.detect_format(file_path)
+        if file_format == 'text':
+            # 分隔文本只有一张表，以文件名作为表名；行数需要读完整个文件才能得到，记为未知
+            stem = os.path.splitext(os.path.basename(file_path))[0]
+            return [(stem, None)]
+        if file_format == 'xls':
+            sheets = pd.read_excel(file_path, sheet_name=None, header=None)
+            return [(name, max(len(df) - 1, 0)) for name, df in sheets.items()]
+        workbook = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            return [(worksheet.title, worksheet.max_row - 1 if worksheet.max_row and worksheet.max_row > 1 else None)
+                    for worksheet in workbook.worksheets]
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def iter_excel_batches(file_path, batch_size=None, progress_callback=None, sheet_name=None):
+        """
+        流式解析Excel文件，按批返回测试用例数据
+
+        xlsx 文件以 openpyxl 只读模式逐行读取工作表（默认第一个），CSV/TSV 等分隔文本以 csv 模块逐行读取
+        （自动识别 UTF-8/GBK 编码与分隔符），表头只检查一次，内存占用只与批大小有关，与表格行数无关；
+        旧版 xls 文件仍通过 pandas 读取。
+        全空行会被跳过；重复的用例ID在读到时立即报错，调用方应在同一事务中写入以便回滚。
+
+        Args:
+            file_path: Excel文件路径
+            batch_size: 每批行数，默认 BATCH_SIZE
+            progress_callback: 可选，每批处理完后调用，参数为 (已读取行数, 总行数)，
+                总行数取自工作表的尺寸信息（分隔文本按已读取的字节估计），未知时为 None
+            sheet_name: 可选，工作表名称，默认第一个工作表（分隔文本忽略此参数）
+
+        Yields:
+            list: 一批测试用例数据，每个元素是一个字典
+        """
+        batch_size = batch_size or ExcelParser.BATCH_SIZE
+        rows = None
         try:
-            # 读取Excel文件
-            df = pd.read_excel(file_path)
-            
+            file_format = ExcelParser.detect_format(file_path)
+            if file_format == 'text':
+                rows, total = ExcelParser._read_text(file_path)
+            elif file_format == 'xls':
+                rows, total = ExcelParser._read_xls(file_path, sheet_name)
+            else:
+                workbook = load_workbook(file_path, read_only=True, data_only=True)
+                rows, total = ExcelParser._read_xlsx(workbook, sheet_name)
+
+            header = next(rows, None)
+            if header is None:
+                raise ValueError("Excel文件为空")
+            columns = ['' if name is None else str(name).strip() for name in header]
+
             # 检查必要的列是否存在
-            required_columns = ['用例ID', '测试场景', '预期结果']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
+            missing_columns = [col for col in ExcelParser.REQUIRED_COLUMNS if col not in columns]
             if missing_columns:
                 raise ValueError(f"Excel文件缺少必要的列: {', '.join(missing_columns)}")
-            
-            # 将DataFrame转换为字典列表
-            cases_data = df.fillna('').to_dict('records')
-            
+
+            # 无表头的列不导入
+            indexes = [(idx, name) for idx, name in enumerate(columns) if name]
+
             # 验证用例ID的唯一性
-            case_ids = [case.get('用例ID') for case in cases_data]
-            if len(case_ids) != len(set(case_ids)):
-                raise ValueError("Excel文件中存在重复的用例ID")
-            
-            return cases_data
-            
+            seen_ids = set()
+            batch = []
+            read_count = 0
+            for row in rows:
+                if all(value is None or value == '' for value in row):
+                    continue
+                case = {name: ExcelParser._cell_text(row[idx] if idx < len(row) else None)
+                        for idx, name in indexes}
+                case_id = case['用例ID']
+                if case_id:
+                    if case_id in seen_ids:
+                        raise ValueError(f"Excel文件中存在重复的用例ID: {case_id}")
+                    seen_ids.add(case_id)
+                batch.append(case)
+                if len(batch) >= batch_size:
+                    read_count += len(batch)
+                    yield batch
+                    batch = []
+                    if progress_callback:
+                        progress_callback(read_count, total(read_count) if callable(total) else total)
+            if batch:
+                read_count += len(batch)
+                yield batch
+            if progress_callback:
+                progress_callback(read_count, read_count)
+
         except Exception as e:
-            raise Exception(f"解析Excel文件失败: {str(e)}")
\ No newline at end of file
+            raise Exception(f"解析Excel文件失败: {str(e)}")
+        finally:
+            # 读取结束或调用方提前停止时关闭工作簿文件
+            if rows is not None:
+                rows.close()
+
+    @staticmethod
+    def _read_xlsx(workbook, sheet_name=None):
+        """只读模式逐行读取工作表，返回 (行迭代器, 数据行数或None)"""
+        if sheet_name is not None and sheet_name not in workbook.sheetnames:
+            workbook.close()
+            raise ValueError(f"工作表不存在: {sheet_name}")
+        worksheet = workbook[sheet_name] if sheet_name is not None else workbook.worksheets[0]
+        max_row = worksheet.max_row
+        total = max_row - 1 if max_row and max_row > 1 else None
+
+        def iter_rows():
+            try:
+                yield from worksheet.iter_rows(values_only=True)
+            finally:
+                workbook.close()
+
+        return iter_rows(), total
+
+    @staticmethod
+    def _read_xls(file_path, sheet_name=None):
+        """旧版xls格式（最多65536行）整表读取，返回 (行迭代器, 数据行数)"""
+        df = pd.read_excel(file_path, sheet_name=sheet_name if sheet_name is not None else 0,
+                           header=None, dtype=object)
+        df = df.astype(object).where(df.notna(), None)
+        rows = (row for row in df.itertuples(index=False, name=None))
+        return rows, max(len(df) - 1, 0)
+
+    @staticmethod
+    def detect_format(file_path):
+        """按文件头识别格式：'xlsx'、'xls' 或 'text'（CSV/TSV 等分隔文本）"""
+        with open(file_path, 'rb') as f:
+            head = f.read(4)
+        if head == ExcelParser.XLSX_SIGNATURE:
+            return 'xlsx'
+        if head == ExcelParser.XLS_SIGNATURE:
+            return 'xls'
+        return 'text'
+
+    @staticmethod
+    def _detect_encoding(sample):
+        """识别文本编码：带BOM的UTF-8/UTF-16，能按UTF-8解码的视为UTF-8，否则按GBK（GB18030）"""
+        if sample.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return 'utf-16'
+        try:
+            # 增量解码，样本末尾被截断的多字节字符不算错误
+            codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            return 'gb18030'
+
+    @staticmethod
+    def _detect_delimiter(file_path, text):
+        """识别分隔符：.tsv 文件固定为制表符，其余根据样本推断，无法推断时为逗号"""
+        if os.path.splitext(file_path)[1].lower() == '.tsv':
+            return '\t'
+        # 只用表头行推断，避免单元格内容中的标点干扰
+        header = text.splitlines()[0] if text else ''
+        try:
+            return csv.Sniffer().sniff(header, delimiters=ExcelParser.TEXT_DELIMITERS).delimiter
+        except csv.Error:
+            return ','
+
+    @staticmethod
+    def _text_dialect(file_path):
+        """识别分隔文本的编码与分隔符，返回 (encoding, delimiter)"""
+        with open(file_path, 'rb') as f:
+            sample = f.read(ExcelParser.TEXT_SAMPLE_BYTES)
+        encoding = ExcelParser._detect_encoding(sample)
+        return encoding, ExcelParser._detect_delimiter(file_path, sample.decode(encoding, errors='ignore'))
+
+    @staticmethod
+    def _read_text(file_path):
+        """
+        以 csv 模块逐行读取分隔文本，返回 (行迭代器, 总行数估计函数)
+
+        不预先统计行数（那需要把文件多读一遍），总行数按已读取字节占文件大小的比例估计，
+        估计函数的参数为已读取的行数。
+        """
+        encoding, delimiter = ExcelParser._text_dialect(file_path)
+        size = os.path.getsize(file_path)
+        opened = {}
+
+        def iter_rows():
+            with open(file_path, 'rb') as raw:
+                opened['raw'] = raw
+                with io.TextIOWrapper(raw, encoding=encoding, newline='') as f:
+                    yield from csv.reader(f, delimiter=delimiter)
+
+        def estimate_total(read_count):
+            raw = opened.get('raw')
+            position = size if raw is None or raw.closed else raw.tell()
+            if not position:
+                return None
+            return max(read_count, round(read_count * size / position))
+
+        return iter_rows(), estimate_total
+
+    @staticmethod
+    def _cell_text(value):
+        """单元格值转换为文本，空单元格为空字符串，整数值的浮点数去掉小数部分"""
+        if value is None:
+            return ''
+        if isinstance(value, str):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value)
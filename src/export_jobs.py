@@ -0,0 +1,309 @@
+import os
+import json
+import time
+import queue
+import multiprocessing
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from exporter import ExportCheckpoint, ExportWatermark, export_worker
+
+
+class ExportJob:
+    """导出任务"""
+
+    # 任务状态
+    QUEUED = '排队中'
+    RUNNING = '进行中'
+    CANCELLING = '正在取消'
+    COMPLETED = '已完成'
+    FAILED = '失败'
+    CANCELLED = '已取消'
+
+    FINISHED_STATUSES = (COMPLETED, FAILED, CANCELLED)
+
+    NO_CHANGES_MESSAGE = '自上次导出以来没有新增或修改的记录'
+
+    def __init__(self, job_id, export_type, file_path, filters=None, compress=False):
+        self.job_id = job_id
+        self.export_type = export_type
+        self.file_path = file_path
+        self.filters = filters or {}
+        self.compress = compress
+        self.status = ExportJob.QUEUED
+        self.progress = 0
+        self.message = ''          # 失败原因，或增量导出没有变化时的说明
+        self.result_path = None    # 导出结果路径
+        self.resumed_by = None     # 继续执行本任务的新任务ID
+        self.created_at = int(time.time())
+        self.started_at = None
+        self.finished_at = None
+        # 运行期对象，不写入历史
+        self.process = None
+        self.cancel_event = None
+        self.cancel_requested_at = None
+
+    @property
+    def is_finished(self):
+        return self.status in ExportJob.FINISHED_STATUSES
+
+    def to_dict(self):
+        """转换为可写入历史文件的字典"""
+        return {
+            'job_id': self.job_id,
+            'export_type': self.export_type,
+            'file_path': self.file_path,
+            'filters': self.filters,
+            'compress': self.compress,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'result_path': self.result_path,
+            'resumed_by': self.resumed_by,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+    @staticmethod
+    def from_dict(data):
+        """从历史文件的字典恢复（仅用于展示已结束的任务）"""
+        job = ExportJob(data['job_id'], data['export_type'], data['file_path'],
+                        data.get('filters'), data.get('compress', False))
+        for key in ('status', 'progress', 'message', 'result_path', 'resumed_by',
+                    'created_at', 'started_at', 'finished_at'):
+            setattr(job, key, data.get(key))
+        return job
+
+
+class ExportJobManager(QObject):
+    """
+    导出任务管理器
+
+    每个导出任务在独立的工作进程中执行（reportlab 排版等CPU密集操作不再与界面争用GIL），
+    同时运行的任务数受 max_workers 限制，其余任务排队。工作进程通过共享队列回传进度，
+    由界面线程的定时器轮询处理；已结束的任务写入历史文件。
+    """
+
+    # 信号，参数为任务ID
+    job_added = pyqtSignal(int)
+    job_updated = pyqtSignal(int)
+    job_finished = pyqtSignal(int)
+
+    HISTORY_PATH = os.path.join('data', 'export_history.json')
+    MAX_HISTORY = 100
+    POLL_INTERVAL_MS = 100
+    # 请求取消后等待工作进程自行退出的时间，超时则强制结束
+    CANCEL_TIMEOUT = 5
+    # 退出程序时等待工作进程自行取消的时间
+    SHUTDOWN_TIMEOUT = 2
+
+    def __init__(self, db_path, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        # 默认保留一个核心给界面
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        # 统一使用 spawn，Windows/macOS/Linux 行为一致，也避免 fork 复制Qt与SQLite状态
+        self._context = multiprocessing.get_context('spawn')
+        self._queue = self._context.Queue()
+        self.jobs = {}  # job_id -> ExportJob，按提交顺序
+        self._load_history()
+        self._next_id = max(self.jobs, default=0) + 1
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.POLL_INTERVAL_MS)
+        self._timer.timeout.connect(self._poll)
+
+    def submit(self, export_type, file_path, filters=None, compress=False):
+        """提交导出任务，返回任务ID"""
+        job = ExportJob(self._next_id, export_type, file_path, filters, compress)
+        self._next_id += 1
+        self.jobs[job.job_id] = job
+        self.job_added.emit(job.job_id)
+        self._start_queued_jobs()
+        if not self._timer.isActive():
+            self._timer.start()
+        return job.job_id
+
+    def cancel(self, job_id):
+        """
+        取消任务：排队中的直接取消，进行中的通知工作进程在下一次进度更新时停止
+
+        PDF/Excel 报告已完成的分段保留在检查点中，可通过 resume 继续
+        """
+        job = self.jobs.get(job_id)
+        if not job or job.is_finished:
+            return
+        if job.status == ExportJob.QUEUED:
+            self._finish(job, ExportJob.CANCELLED)
+        elif job.status == ExportJob.RUNNING:
+            job.cancel_event.set()
+            job.cancel_requested_at = time.time()
+            job.status = ExportJob.CANCELLING
+            self.job_updated.emit(job.job_id)
+
+    def resume(self, job_id):
+        """以相同参数重新提交已取消或失败的任务，导出从检查点继续，返回新任务ID"""
+        job = self.jobs.get(job_id)
+        if not self.can_resume(job_id):
+            return None
+        # 同一报告已有任务在执行时不再重复提交，避免共用检查点
+        for other in self.active_jobs():
+            if other.export_type == job.export_type and other.file_path == job.file_path:
+                return None
+        job.resumed_by = self.submit(job.export_type, job.file_path, job.filters, job.compress)
+        self._save_history()
+        return job.resumed_by
+
+    def can_resume(self, job_id):
+        """
+        已取消或失败、且留有检查点的任务可以继续
+
+        检查点按解析后的筛选条件保存，增量导出需按当前水位解析；任务失败或取消时水位不变，解析结果与原任务一致
+        """
+        job = self.jobs.get(job_id)
+        if not job or job.status not in (ExportJob.CANCELLED, ExportJob.FAILED) or job.resumed_by is not None:
+            return False
+        filters = ExportWatermark.resolve_filters(self.db_path, job.export_type, job.filters)
+        return ExportCheckpoint.exists(job.export_type, job.file_path, filters)
+
+    def active_jobs(self):
+        """排队中或进行中的任务"""
+        return [job for job in self.jobs.values() if not job.is_finished]
+
+    def clear_history(self):
+        """清除已结束的任务"""
+        for job_id in [job.job_id for job in self.jobs.values() if job.is_finished]:
+            del self.jobs[job_id]
+        self._save_history()
+
+    def shutdown(self):
+        """退出程序时结束所有工作进程"""
+        self._timer.stop()
+        running = [job for job in self.active_jobs() if job.process is not None]
+        # 先通知工作进程自行取消，由其结束分片进程并清理未完成的文件，超时后再强制结束
+        for job in running:
+            job.cancel_event.set()
+        deadline = time.time() + self.SHUTDOWN_TIMEOUT
+        for job in running:
+            job.process.join(max(0, deadline - time.time()))
+        for job in running:
+            if job.process.is_alive():
+                self._terminate(job)
+        for job in self.active_jobs():
+            job.status = ExportJob.CANCELLED
+            job.finished_at = int(time.time())
+        self._save_history()
+
+    def _start_queued_jobs(self):
+        """在并发上限内启动排队中的任务"""
+        running = sum(1 for job in self.jobs.values() if job.status in (ExportJob.RUNNING, ExportJob.CANCELLING))
+        for job in self.jobs.values():
+            if running >= self.max_workers:
+                break
+            if job.status != ExportJob.QUEUED:
+                continue
+            job.cancel_event = self._context.Event()
+            job.process = self._context.Process(
+                target=export_worker,
+                args=(job.job_id, job.export_type, job.file_path, self.db_path,
+                      job.filters, job.compress, self._queue, job.cancel_event)
+            )
+            job.process.start()
+            job.status = ExportJob.RUNNING
+            job.started_at = int(time.time())
+            running += 1
+            self.job_updated.emit(job.job_id)
+
+    def _poll(self):
+        """处理工作进程消息，检查异常退出与取消超时"""
+        # 先记录已退出的进程，再读取队列：进程退出前会把消息全部写入管道
+        exited = [
+            job for job in self.jobs.values()
+            if job.process is not None and not job.is_finished and not job.process.is_alive()
+        ]
+
+        while True:
+            try:
+                job_id, kind, value = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            job = self.jobs.get(job_id)
+            if not job or job.is_finished:
+                continue
+            if kind == 'progress':
+                job.progress = value
+                self.job_updated.emit(job_id)
+            elif kind == 'completed':
+                job.progress = 100
+                job.result_path = value
+                if value is None:
+                    # 增量导出没有变化，未生成文件
+                    job.message = ExportJob.NO_CHANGES_MESSAGE
+                self._finish(job, ExportJob.COMPLETED)
+            elif kind == 'cancelled':
+                self._finish(job, ExportJob.CANCELLED)
+            elif kind == 'failed':
+                job.message = value
+                self._finish(job, ExportJob.FAILED)
+
+        for job in exited:
+            if not job.is_finished:
+                job.message = f"导出进程异常退出（退出码 {job.process.exitcode}）"
+                self._finish(job, ExportJob.FAILED)
+
+        # 取消超时：强制结束工作进程
+        now = time.time()
+        for job in self.jobs.values():
+            if job.status == ExportJob.CANCELLING and now - job.cancel_requested_at > self.CANCEL_TIMEOUT:
+                self._terminate(job)
+                if os.path.isfile(job.file_path):
+                    os.remove(job.file_path)
+                self._finish(job, ExportJob.CANCELLED)
+
+        self._start_queued_jobs()
+        if not self.active_jobs():
+            self._timer.stop()
+
+    @staticmethod
+    def _terminate(job):
+        """强制结束工作进程：SIGTERM 使其取消导出并结束分片进程，仍未退出时直接杀死"""
+        job.process.terminate()
+        job.process.join(1)
+        if job.process.is_alive():
+            job.process.kill()
+            job.process.join(1)
+
+    def _finish(self, job, status):
+        """标记任务结束并写入历史"""
+        job.status = status
+        job.finished_at = int(time.time())
+        if job.process is not None:
+            job.process.join(0.1)
+            job.process = None
+        job.cancel_event = None
+        self._save_history()
+        self.job_updated.emit(job.job_id)
+        self.job_finished.emit(job.job_id)
+
+    def _load_history(self):
+        """读取历史任务"""
+        if not os.path.exists(self.HISTORY_PATH):
+            return
+        try:
+            with open(self.HISTORY_PATH, 'r', encoding='utf-8') as f:
+                for data in json.load(f) or []:
+                    job = ExportJob.from_dict(data)
+                    self.jobs[job.job_id] = job
+        except Exception as e:
+            print(f"读取导出历史失败: {e}")
+
+    def _save_history(self):
+        """保存最近的已结束任务"""
+        finished = [job.to_dict() for job in self.jobs.values() if job.is_finished][-self.MAX_HISTORY:]
+        try:
+            os.makedirs(os.path.dirname(self.HISTORY_PATH), exist_ok=True)
+            with open(self.HISTORY_PATH, 'w', encoding='utf-8') as f:
+                json.dump(finished, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存导出历史失败: {e}")
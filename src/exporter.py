@@ -0,0 +1,1773 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试记录导出（CSV / JSON Lines / PDF / Excel / HTML）
+逐行消费 Database.iter_export_rows，内存占用与记录数无关；CSV/JSON Lines 可选gzip压缩。
+不依赖界面，可在历史记录页面、导出工作进程或脚本中使用
+
+用法:
+    python src/exporter.py records.csv
+    python src/exporter.py records.jsonl.gz --start 2024-01-01 --status 失败
+    python src/exporter.py records.csv --gzip --project PRJ --collection 冒烟测试
+"""
+
+import os
+import csv
+import gzip
+import json
+import time
+import base64
+import zlib
+import queue
+import signal
+import shutil
+import hashlib
+import zipfile
+import argparse
+import itertools
+import collections
+import multiprocessing
+from html import escape
+from urllib.parse import quote
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import openpyxl
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles import PatternFill
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib import colors
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfbase.pdfdoc import PDFStream, PDFDictionary, PDFArray, PDFName
+from reportlab.pdfgen import canvas
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # 未安装 pypdf 时PDF不分段，无法断点续传，也不支持并行分片
+    PdfReader = PdfWriter = None
+
+from database import Database
+from bundle import EvidenceBundle
+from snapshot import AnalyticsSnapshot
+from summary import ReportSummary
+from utils import DateUtils, ImageUtils, SettingsUtils
+
+
+class ExportCancelled(Exception):
+    """导出被用户取消"""
+
+
+class RecordExporter:
+    """测试记录流式导出工具"""
+
+    # 导出字段（与 Database.iter_export_rows 的键一致）
+    FIELDS = [
+        '记录ID', '用例ID', '测试场景', '测试步骤', '预期结果', '优先级', '案例集名称',
+        '项目ID', '执行状态', '实际结果', '备注', '执行人', '执行时间', '图片'
+    ]
+
+    # 支持的导出格式
+    FORMATS = ('csv', 'jsonl')
+
+    # CSV中多张图片路径的分隔符
+    IMAGE_SEPARATOR = ';'
+
+    # 每写入多少行回调一次进度
+    PROGRESS_INTERVAL = 1000
+
+    # gzip压缩级别：6 与默认的 9 压缩率相近，速度约快一倍
+    GZIP_LEVEL = 6
+
+    @staticmethod
+    def detect_format(file_path):
+        """
+        根据文件扩展名判断导出格式（忽略 .gz 后缀）
+
+        Returns:
+            tuple: (格式名 'csv'/'jsonl'，无法识别时为 None, 是否gzip压缩)
+        """
+        name = file_path.lower()
+        compress = name.endswith('.gz')
+        if compress:
+            name = name[:-3]
+        if name.endswith('.csv'):
+            return 'csv', compress
+        if name.endswith('.jsonl') or name.endswith('.ndjson'):
+            return 'jsonl', compress
+        return None, compress
+
+    @staticmethod
+    def open_output(file_path, compress=False, encoding='utf-8'):
+        """以文本方式打开输出文件，compress 为真时写入gzip流"""
+        export_dir = os.path.dirname(file_path)
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+        if compress:
+            return gzip.open(file_path, 'wt', compresslevel=RecordExporter.GZIP_LEVEL,
+                             encoding=encoding, newline='')
+        return open(file_path, 'w', encoding=encoding, newline='', buffering=1024 * 1024)
+
+    @staticmethod
+    def _iter_with_progress(rows, progress_callback):
+        """透传数据行，每隔 PROGRESS_INTERVAL 行回调一次已处理行数"""
+        count = 0
+        for row in rows:
+            yield row
+            count += 1
+            if progress_callback and count % RecordExporter.PROGRESS_INTERVAL == 0:
+                progress_callback(count)
+        if progress_callback:
+            progress_callback(count)
+
+    @staticmethod
+    def write_csv(rows, file_path, compress=False, progress_callback=None):
+        """
+        将导出数据逐行写入CSV文件
+
+        文件使用带BOM的UTF-8编码，便于直接用Excel打开；执行时间转换为可读字符串，
+        多张图片路径以分号连接。
+
+        Args:
+            rows: 导出数据迭代器（Database.iter_export_rows）
+            file_path: 输出文件路径
+            compress: 是否gzip压缩
+            progress_callback: 可选，进度回调，参数为已写入行数
+
+        Returns:
+            int: 写入的记录数
+        """
+        fields = RecordExporter.FIELDS
+        time_idx = fields.index('执行时间')
+        image_idx = fields.index('图片')
+        separator = RecordExporter.IMAGE_SEPARATOR
+        count = 0
+
+        def to_values(record):
+            nonlocal count
+            count += 1
+            values = [record.get(field) for field in fields]
+            values[time_idx] = DateUtils.timestamp_to_string(values[time_idx])
+            values[image_idx] = separator.join(values[image_idx] or [])
+            return values
+
+        with RecordExporter.open_output(file_path, compress, encoding='utf-8-sig') as f:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            writer.writerows(map(to_values, RecordExporter._iter_with_progress(rows, progress_callback)))
+        return count
+
+    @staticmethod
+    def write_jsonl(rows, file_path, compress=False, progress_callback=None):
+        """
+        将导出数据逐行写入JSON Lines文件（每行一个JSON对象）
+
+        保留原始时间戳并额外写入可读的执行时间字符串，图片为路径数组。
+
+        Args:
+            rows: 导出数据迭代器（Database.iter_export_rows）
+            file_path: 输出文件路径
+            compress: 是否gzip压缩
+            progress_callback: 可选，进度回调，参数为已写入行数
+
+        Returns:
+            int: 写入的记录数
+        """
+        count = 0
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        with RecordExporter.open_output(file_path, compress) as f:
+            for record in RecordExporter._iter_with_progress(rows, progress_callback):
+                record = dict(record)
+                timestamp = record['执行时间']
+                record['执行时间'] = DateUtils.timestamp_to_string(timestamp)
+                record['时间戳'] = timestamp
+                f.write(dumps(record))
+                f.write('\n')
+                count += 1
+        return count
+
+    @staticmethod
+    def export(db, export_format, file_path, filters=None, compress=False, progress_callback=None):
+        """
+        按筛选条件从数据库流式导出记录
+
+        Args:
+            db: Database 实例
+            export_format: 'csv' 或 'jsonl'
+            file_path: 输出文件路径
+            filters: 筛选条件字典，见 Database._export_query_parts
+            compress: 是否gzip压缩
+            progress_callback: 可选，进度回调，参数为已写入行数
+
+        Returns:
+            int: 写入的记录数
+        """
+        if export_format == 'csv':
+            writer = RecordExporter.write_csv
+        elif export_format == 'jsonl':
+            writer = RecordExporter.write_jsonl
+        else:
+            raise ValueError(f"不支持的导出格式: {export_format}")
+        return writer(db.iter_export_rows(filters), file_path, compress, progress_callback)
+
+
+class LazyFlowables(list):
+    """
+    按需从迭代器补充内容的流式列表
+    
+    reportlab 的 doc.build 会反复检查列表长度并从头部取出流式内容，
+    这里在每次检查长度时从迭代器补充到缓冲区大小，已排版的内容随即释放。
+    """
+    
+    def __init__(self, iterator, buffer_size=200):
+        super().__init__()
+        self._iterator = iterator
+        self._buffer_size = buffer_size
+    
+    def _fill(self):
+        while self._iterator is not None and list.__len__(self) < self._buffer_size:
+            try:
+                self.append(next(self._iterator))
+            except StopIteration:
+                self._iterator = None
+    
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+    
+    def __bool__(self):
+        return len(self) > 0
+
+
+class CompactCanvas(canvas.Canvas):
+    """
+    逐页压缩内容流的画布
+    
+    reportlab 默认在保存时才压缩所有页面内容流，未压缩的页面会一直堆积在内存中；
+    这里在每页结束时立即压缩，内存占用只随压缩后的输出增长。
+    """
+    
+    def showPage(self):
+        super().showPage()
+        page = self._doc.Pages.pages[-1]
+        if page.compression and page.stream and not page.Contents:
+            stream = page.stream.encode('utf8') if isinstance(page.stream, str) else page.stream
+            page.Contents = PDFStream(
+                PDFDictionary({'Filter': PDFArray([PDFName('FlateDecode')])}),
+                zlib.compress(stream)
+            )
+            page.stream = None
+
+
+class ExportCheckpoint:
+    """
+    导出检查点：分段输出与已完成分段的清单保存在检查点目录中
+    
+    同一报告（导出类型、输出路径与筛选条件相同）再次导出时，如果数据指纹未变化，
+    就跳过已完成的分段继续；指纹变化（记录增删）时丢弃旧的检查点从头开始。
+    """
+    
+    CHECKPOINT_DIR = os.path.join('data', 'export_checkpoints')
+    MANIFEST_FILE = 'manifest.json'
+    
+    def __init__(self, export_type, file_path, filters, fingerprint, root=None):
+        self.path = ExportCheckpoint.checkpoint_path(export_type, file_path, filters, root)
+        self.fingerprint = fingerprint
+        self.completed = set()
+        
+        manifest = self._read_manifest()
+        if manifest and manifest.get('fingerprint') == fingerprint:
+            self.completed = set(manifest.get('completed', []))
+        elif os.path.exists(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path, exist_ok=True)
+    
+    @staticmethod
+    def checkpoint_path(export_type, file_path, filters, root=None):
+        """根据导出类型、输出路径与筛选条件确定检查点目录"""
+        key = json.dumps([
+            export_type,
+            os.path.abspath(file_path),
+            sorted((k, v) for k, v in (filters or {}).items() if v is not None)
+        ], ensure_ascii=False)
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(root or ExportCheckpoint.CHECKPOINT_DIR, name)
+    
+    @staticmethod
+    def exists(export_type, file_path, filters, root=None):
+        """是否存在可继续的检查点"""
+        path = ExportCheckpoint.checkpoint_path(export_type, file_path, filters, root)
+        return os.path.exists(os.path.join(path, ExportCheckpoint.MANIFEST_FILE))
+    
+    def _read_manifest(self):
+        manifest_path = os.path.join(self.path, self.MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+    
+    def part_path(self, index, extension):
+        """第 index 个分段的文件路径"""
+        return os.path.join(self.path, f"part_{index:05d}{extension}")
+    
+    def is_done(self, index):
+        return index in self.completed
+    
+    def mark_done(self, index):
+        """记录分段完成（先写临时文件再替换，清单不会写坏）"""
+        self.completed.add(index)
+        manifest_path = os.path.join(self.path, self.MANIFEST_FILE)
+        temp_path = manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'completed': sorted(self.completed)}, f)
+        os.replace(temp_path, manifest_path)
+    
+    def clear(self):
+        """导出完成后删除检查点"""
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class ExportCache:
+    """
+    导出结果缓存
+    
+    以规范化的筛选条件、导出类型、压缩选项与数据库变更计数为键保存已完成的导出文件，
+    数据未变化时再次导出同一报告直接复制缓存文件。缓存总大小超过上限时按最近使用时间淘汰。
+    
+    多个导出进程可能同时读写缓存，因此不维护共享的索引文件：每个缓存文件旁有一个 <键>.json 描述文件，
+    其修改时间即最近使用时间，淘汰时扫描目录重建索引，不会因并发写入丢失条目。
+    """
+    
+    CACHE_DIR = os.path.join('data', 'export_cache')
+    META_SUFFIX = '.json'
+    
+    # 可缓存的导出类型：输出为单个文件，且内容不含生成时间
+    # （单文件HTML报告页眉显示生成时间、证据包清单记录创建时间，命中缓存会带出旧时间，因此不缓存）
+    CACHEABLE_TYPES = ('pdf', 'excel', 'pdf_parallel', 'pdf_zip', 'csv', 'jsonl')
+    
+    def __init__(self, root=None, max_bytes=None):
+        """
+        Args:
+            root: 缓存目录，默认 data/export_cache
+            max_bytes: 缓存总大小上限（字节），默认取设置中的 export_cache_limit_mb
+        """
+        self.root = root or ExportCache.CACHE_DIR
+        self.max_bytes = (SettingsUtils.get_export_cache_limit_mb() * 1024 * 1024
+                          if max_bytes is None else max_bytes)
+    
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+    
+    @staticmethod
+    def normalize_filters(filters):
+        """规范化筛选条件：去掉未设置的条件，搜索关键字转为小写（查询时不区分大小写）"""
+        normalized = {}
+        for key, value in (filters or {}).items():
+            # 案例集为空字符串表示未归入案例集，其余条件为空等同于未设置
+            if value is None or (value == '' and key != 'collection_name'):
+                continue
+            if key == 'search_text':
+                value = value.lower()
+            normalized[key] = value
+        return sorted(normalized.items())
+    
+    @staticmethod
+    def make_key(db_path, export_type, filters, compress, change_counter):
+        """缓存键（变更计数只在同一数据库内有意义，键中包含数据库路径）"""
+        key = json.dumps([os.path.abspath(db_path), export_type, ExportCache.normalize_filters(filters),
+                          bool(compress), change_counter], ensure_ascii=False)
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+    
+    def _meta_path(self, key):
+        return os.path.join(self.root, key + self.META_SUFFIX)
+    
+    def _read_meta(self, key):
+        """读取缓存条目的描述：file、size，last_used 取描述文件的修改时间；不存在时返回 None"""
+        meta_path = self._meta_path(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            meta['last_used'] = os.path.getmtime(meta_path)
+            return meta
+        except (OSError, ValueError):
+            return None
+    
+    def _entries(self):
+        """扫描缓存目录重建索引：键 -> 条目描述"""
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return {}
+        entries = {}
+        for name in names:
+            if name.endswith(self.META_SUFFIX):
+                key = name[:-len(self.META_SUFFIX)]
+                meta = self._read_meta(key)
+                if meta is not None:
+                    entries[key] = meta
+        return entries
+    
+    def _remove(self, key, meta):
+        """删除缓存条目（其他进程可能已经删除，忽略不存在的文件）"""
+        for path in (self._meta_path(key), os.path.join(self.root, meta['file'])):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def get(self, key, file_path):
+        """
+        命中缓存时将缓存文件复制到 file_path
+        
+        Returns:
+            bool: 是否命中
+        """
+        if not self.enabled:
+            return False
+        meta = self._read_meta(key)
+        if meta is None:
+            return False
+        
+        export_dir = os.path.dirname(file_path)
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+        try:
+            shutil.copyfile(os.path.join(self.root, meta['file']), file_path)
+        except OSError:
+            # 缓存文件缺失或正被其他进程淘汰
+            self._remove(key, meta)
+            return False
+        try:
+            os.utime(self._meta_path(key))
+        except OSError:
+            pass
+        return True
+    
+    def put(self, key, file_path):
+        """保存导出结果，超出大小上限时淘汰最久未使用的缓存"""
+        if not self.enabled or not os.path.isfile(file_path):
+            return
+        size = os.path.getsize(file_path)
+        if size > self.max_bytes:
+            return
+        
+        os.makedirs(self.root, exist_ok=True)
+        name = key + os.path.splitext(file_path)[1]
+        temp_path = os.path.join(self.root, f"{name}.{os.getpid()}.tmp")
+        shutil.copyfile(file_path, temp_path)
+        # 先写描述文件再放入缓存文件：描述文件存在时条目就计入总大小，缓存文件缺失时按未命中处理
+        meta_temp = f"{self._meta_path(key)}.{os.getpid()}.tmp"
+        with open(meta_temp, 'w', encoding='utf-8') as f:
+            json.dump({'file': name, 'size': size}, f)
+        os.replace(meta_temp, self._meta_path(key))
+        os.replace(temp_path, os.path.join(self.root, name))
+        self._evict()
+    
+    def _evict(self):
+        """按最近使用时间从旧到新删除缓存，直到总大小不超过上限"""
+        entries = self._entries()
+        total = sum(meta['size'] for meta in entries.values())
+        for key, meta in sorted(entries.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_bytes:
+                break
+            self._remove(key, meta)
+            total -= meta['size']
+    
+    def clear(self):
+        """清空缓存"""
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+class ExportWatermark:
+    """
+    增量导出水位
+    
+    每个报告（导出类型与筛选条件相同）记录上次成功导出时的数据变更计数，
+    “仅导出上次导出后的变化”时只读取 change_seq 大于该计数的记录。
+    """
+    
+    WATERMARK_PATH = os.path.join('data', 'export_watermarks.json')
+    
+    # 筛选条件中表示增量导出的键
+    DELTA_KEY = 'since_last_export'
+    
+    # 不计入报告标识的筛选条件：增量导出相关的键，以及随日期推移变化的日期范围
+    IGNORED_KEYS = (DELTA_KEY, 'since_change', 'start_date', 'end_date')
+    
+    @staticmethod
+    def report_key(db_path, export_type, filters):
+        """报告标识：数据库路径、导出类型与规范化的筛选条件"""
+        filters = {k: v for k, v in (filters or {}).items() if k not in ExportWatermark.IGNORED_KEYS}
+        return json.dumps([os.path.abspath(db_path), export_type, ExportCache.normalize_filters(filters)],
+                          ensure_ascii=False)
+    
+    @staticmethod
+    def resolve_filters(db_path, export_type, filters):
+        """
+        把筛选条件解析为实际的查询条件
+        
+        增量导出去掉 since_last_export，加入该报告上次成功导出时的变更计数 since_change（首次导出为 None）；
+        分析快照总是完整导出，忽略增量条件；其他情况原样返回。导出与检查点都使用解析后的条件。
+        """
+        filters = filters or {}
+        if not filters.get(ExportWatermark.DELTA_KEY):
+            return filters
+        report_filters = {k: v for k, v in filters.items() if k != ExportWatermark.DELTA_KEY}
+        if export_type in AnalyticsSnapshot.FORMATS:
+            return report_filters
+        return dict(report_filters, since_change=ExportWatermark.get(db_path, export_type, report_filters))
+    
+    @staticmethod
+    def _read():
+        if not os.path.exists(ExportWatermark.WATERMARK_PATH):
+            return {}
+        try:
+            with open(ExportWatermark.WATERMARK_PATH, 'r', encoding='utf-8') as f:
+                return json.load(f) or {}
+        except Exception:
+            return {}
+    
+    @staticmethod
+    def get(db_path, export_type, filters):
+        """上次成功导出时的数据变更计数，从未导出过时返回 None"""
+        entry = ExportWatermark._read().get(ExportWatermark.report_key(db_path, export_type, filters))
+        return entry['change_counter'] if entry else None
+    
+    @staticmethod
+    def set(db_path, export_type, filters, change_counter):
+        """记录本次成功导出的水位"""
+        data = ExportWatermark._read()
+        data[ExportWatermark.report_key(db_path, export_type, filters)] = {
+            'change_counter': change_counter,
+            'exported_at': int(time.time()),
+        }
+        os.makedirs(os.path.dirname(ExportWatermark.WATERMARK_PATH), exist_ok=True)
+        temp_path = f"{ExportWatermark.WATERMARK_PATH}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, ExportWatermark.WATERMARK_PATH)
+
+
+class ReportExporter:
+    """PDF/Excel/HTML 报告导出"""
+    
+    # 断点续传的分段大小：PDF每段记录数、Excel每段行数
+    PDF_CHUNK_RECORDS = 200
+    EXCEL_CHUNK_ROWS = 20000
+    
+    # PDF每批生成图片副本的记录数
+    PDF_IMAGE_BATCH_RECORDS = 50
+    
+    def __init__(self, file_path, progress_callback=None, cancel_check=None):
+        """
+        Args:
+            file_path: 输出文件路径
+            progress_callback: 可选，进度回调，参数为百分比（0-100）
+            cancel_check: 可选，返回 True 表示用户已取消，在每次更新进度时检查
+        """
+        self.file_path = file_path
+        self.progress_callback = progress_callback
+        self.cancel_check = cancel_check
+    
+    def report_progress(self, value):
+        """更新进度，并在用户取消时抛出 ExportCancelled 中止导出"""
+        if self.cancel_check and self.cancel_check():
+            raise ExportCancelled()
+        if self.progress_callback:
+            self.progress_callback(value)
+    
+    def export_pdf(self, records, total=None, checkpoint=None, title="测试执行报告", summary=None):
+        """
+        导出为PDF
+        
+        records 可以是数据库游标迭代器（Database.iter_export_rows），由 doc.build 边排版边消费；
+        报告分辨率的图片副本按 PDF_IMAGE_BATCH_RECORDS 条记录一批生成，内存占用与记录数无关。
+        传入 checkpoint 且记录较多时，按 PDF_CHUNK_RECORDS 条记录分段排版，每段完成后记入检查点，
+        全部完成后合并为一个文件；中断后再次导出同一报告会跳过已完成的分段。
+        传入 summary（ReportSummary）时，总体统计取自汇总，并在统计表后附加各维度汇总表；
+        未传入时统计基于导出记录计算，records 会被读入列表。
+        
+        Args:
+            records: 导出数据迭代器或列表
+            total: 记录总数，records 为列表时可省略
+        """
+        # 创建导出目录
+        export_dir = os.path.dirname(self.file_path)
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+        
+        if summary is None:
+            records = list(records)
+            stats = self.status_stats(records)
+        else:
+            stats = summary.overall()
+        if total is None:
+            total = len(records)
+        records = iter(records)
+        
+        styles = self._pdf_styles()
+        elements = self._pdf_header_elements(stats, styles, title, summary)
+        
+        # 更新进度
+        self.report_progress(30)
+        
+        if checkpoint is not None and PdfWriter is not None and total > self.PDF_CHUNK_RECORDS:
+            self._export_pdf_chunks(records, total, styles, elements, checkpoint)
+        else:
+            # 构建PDF：详细记录按需生成，由 doc.build 边排版边消费，不在内存中保留全部流式内容
+            doc = SimpleDocTemplate(self.file_path, pagesize=A4)
+            record_elements = self._iter_pdf_record_elements(records, styles, total=total)
+            doc.build(LazyFlowables(itertools.chain(elements, record_elements)), canvasmaker=CompactCanvas)
+        self.report_progress(100)
+    
+    def _pdf_styles(self):
+        """PDF样式表"""
+        styles = getSampleStyleSheet()
+        # 确保中文可显示：注册支持中文的字体并应用到样式
+        try:
+            pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
+            for key in ["Title", "Heading2", "Heading3", "Normal"]:
+                if key in styles:
+                    styles[key].fontName = 'STSong-Light'
+        except Exception:
+            # 忽略字体注册失败，继续使用默认字体
+            pass
+        return styles
+    
+    def _pdf_header_elements(self, stats, styles, title="测试执行报告", summary=None):
+        """报告标题、统计表与汇总表"""
+        elements = []
+        
+        # 添加标题
+        title_style = styles["Title"]
+        elements.append(Paragraph(title, title_style))
+        elements.append(Spacer(1, 20))
+        
+        # 添加统计信息
+        elements.append(self._pdf_stats_table(stats))
+        elements.append(Spacer(1, 20))
+        if summary is not None:
+            elements.extend(self._pdf_summary_elements(summary, styles))
+        return elements
+    
+    def _pdf_summary_elements(self, summary, styles):
+        """各维度汇总表与按日趋势表"""
+        elements = []
+        for title, table in summary.tables():
+            data = [list(table.columns)] + [ReportSummary.format_row(row) for _, row in table.iterrows()]
+            data = [[Paragraph(str(value), styles["Normal"]) if i == 0 else str(value)
+                     for i, value in enumerate(row)] for row in data]
+            summary_table = Table(data, repeatRows=1)
+            summary_table.setStyle(TableStyle([
+                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+                ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('FONTNAME', (0, 0), (-1, -1), 'STSong-Light'),
+                ('FONTSIZE', (0, 0), (-1, -1), 8),
+                ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+            ]))
+            elements.append(Paragraph(title, styles["Heading3"]))
+            elements.append(summary_table)
+            elements.append(Spacer(1, 15))
+        return elements
+    
+    @staticmethod
+    def status_stats(records):
+        """按执行状态统计记录数与通过率"""
+        stats = {
+            'total': len(records),
+            '通过': 0,
+            '失败': 0,
+            '阻塞': 0,
+            '跳过': 0
+        }
+        for r in records:
+            status = r.get('执行状态')
+            if status in stats:
+                stats[status] += 1
+        stats['通过率'] = (stats['通过'] / stats['total'] * 100) if stats['total'] > 0 else 0
+        return stats
+    
+    def _pdf_stats_table(self, stats):
+        """按执行状态统计的表格"""
+        stats_data = [
+            ["总记录数", "通过", "失败", "阻塞", "跳过", "通过率"],
+            [
+                str(stats['total']),
+                str(stats['通过']),
+                str(stats['失败']),
+                str(stats['阻塞']),
+                str(stats['跳过']),
+                f"{stats['通过率']:.2f}%"
+            ]
+        ]
+        
+        stats_table = Table(stats_data)
+        stats_table.setStyle(TableStyle([
+            # 表头与内容区域背景/对齐
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            # 中文字体应用到整张表
+            ('FONTNAME', (0, 0), (-1, -1), 'STSong-Light'),
+            # 表头可加粗：使用默认粗体可能不支持中文，保持中文字体避免乱码
+            # ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        return stats_table
+    
+    def _export_pdf_chunks(self, records, total, styles, elements, checkpoint):
+        """分段排版并记入检查点，最后按顺序合并所有分段"""
+        chunk_size = self.PDF_CHUNK_RECORDS
+        part_paths = []
+        for index, start in enumerate(range(0, total, chunk_size)):
+            part_path = checkpoint.part_path(index, '.pdf')
+            part_paths.append(part_path)
+            chunk = itertools.islice(records, chunk_size)
+            if checkpoint.is_done(index):
+                # 已完成的分段只需跳过其记录
+                collections.deque(chunk, maxlen=0)
+                continue
+            
+            # 先写临时文件，完整生成后再改名，检查点中只会出现完整的分段
+            temp_path = part_path + '.tmp'
+            doc = SimpleDocTemplate(temp_path, pagesize=A4)
+            record_elements = self._iter_pdf_record_elements(chunk, styles, offset=start, total=total)
+            header = elements if index == 0 else []
+            doc.build(LazyFlowables(itertools.chain(header, record_elements)), canvasmaker=CompactCanvas)
+            os.replace(temp_path, part_path)
+            checkpoint.mark_done(index)
+        
+        # 合并分段
+        self.report_progress(90)
+        writer = PdfWriter()
+        for part_path in part_paths:
+            writer.append(part_path)
+        temp_path = self.file_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            writer.write(f)
+        writer.close()
+        os.replace(temp_path, self.file_path)
+    
+    def _iter_pdf_record_elements(self, records, styles, offset=0, total=None):
+        """
+        逐条生成记录的流式内容，并按排版进度更新进度条
+        
+        每读取 PDF_IMAGE_BATCH_RECORDS 条记录，并行生成这一批的报告分辨率图片副本（按内容哈希缓存，
+        重复导出直接复用），之后直接从原位置/缓存读取，不再复制。
+        分段排版时 offset 为本段第一条记录的序号，total 为全部记录数
+        """
+        last_progress = -1
+        done = offset
+        first = True
+        while True:
+            batch = list(itertools.islice(records, self.PDF_IMAGE_BATCH_RECORDS))
+            if not batch:
+                break
+            report_images = ImageUtils.prepare_report_images([
+                img_path
+                for record in batch
+                for img_path in (record.get('图片') or [])
+                if img_path and os.path.exists(img_path)
+            ])
+            for record in batch:
+                # 添加分隔线
+                if not first:
+                    yield Spacer(1, 20)
+                    yield Paragraph("_" * 70, styles["Normal"])
+                    yield Spacer(1, 20)
+                first = False
+                yield from self._pdf_record_elements(record, styles, report_images)
+                
+                # 更新进度（仅在百分比变化时发送信号）
+                done += 1
+                progress = 30 + int(min(done, total) / max(total, 1) * 60)
+                if progress != last_progress:
+                    last_progress = progress
+                    self.report_progress(progress)
+    
+    def _pdf_record_elements(self, record, styles, report_images):
+        """生成单条记录的流式内容"""
+        flowables = []
+        # 添加用例信息
+        flowables.append(Paragraph(f"用例ID: {record['用例ID']}", styles["Heading2"]))
+        flowables.append(Paragraph(f"测试场景: {record['测试场景']}", styles["Normal"]))
+        flowables.append(Paragraph(f"测试步骤: {record.get('测试步骤') or '无'}", styles["Normal"]))
+        flowables.append(Paragraph(f"预期结果: {record['预期结果']}", styles["Normal"]))
+        flowables.append(Paragraph(f"优先级: {record['优先级'] or '无'}", styles["Normal"]))
+        flowables.append(Spacer(1, 10))
+        
+        # 添加执行结果
+        flowables.append(Paragraph("执行结果", styles["Heading3"]))
+        # 根据执行状态设置颜色
+        status = record['执行状态']
+        status_color = colors.black
+        if status == "通过":
+            status_color = colors.green
+        elif status == "失败":
+            status_color = colors.red
+        elif status == "阻塞":
+            status_color = colors.orange
+        elif status == "跳过":
+            status_color = colors.blue
+        status_style = styles["Normal"].clone("StatusStyle")
+        status_style.textColor = status_color
+        flowables.append(Paragraph(f"状态: {status}", status_style))
+        flowables.append(Paragraph(f"实际结果: {record['实际结果'] or '无'}", styles["Normal"]))
+        flowables.append(Paragraph(f"备注: {record['备注'] or '无'}", styles["Normal"]))
+        # 不展示执行人
+        
+        # 添加执行时间
+        timestamp = record['执行时间']
+        date_str = DateUtils.timestamp_to_string(timestamp)
+        flowables.append(Paragraph(f"执行时间: {date_str}", styles["Normal"]))
+        
+        # 添加图片
+        if record.get('图片'):
+            flowables.append(Paragraph("图片:", styles["Normal"]))
+            for img_path in record['图片']:
+                report_path = report_images.get(img_path)
+                if report_path:
+                    img = Image(report_path)
+                    # 设置最大宽度
+                    max_width = 400
+                    if img.drawWidth > max_width:
+                        ratio = max_width / img.drawWidth
+                        img.drawWidth = max_width
+                        img.drawHeight *= ratio
+                    flowables.append(img)
+                    flowables.append(Spacer(1, 5))
+        
+        return flowables
+    
+    # HTML报告每批准备图片的记录数
+    HTML_BATCH_RECORDS = 500
+    
+    # HTML报告中图片的显示宽度（像素），点击查看报告分辨率副本
+    HTML_THUMBNAIL_WIDTH = 240
+    
+    HTML_HEAD = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: "Microsoft YaHei", "PingFang SC", sans-serif; margin: 20px; color: #222; }}
+h1 {{ text-align: center; }}
+.toolbar {{ position: sticky; top: 0; background: #fff; padding: 8px 0; border-bottom: 1px solid #ccc; z-index: 1; }}
+.toolbar select, .toolbar input {{ margin-right: 12px; padding: 3px; }}
+.stats {{ margin: 10px 0; }}
+.stats span {{ margin-right: 16px; }}
+table {{ border-collapse: collapse; width: 100%; table-layout: fixed; }}
+th, td {{ border: 1px solid #bbb; padding: 4px 6px; vertical-align: top; word-wrap: break-word; white-space: pre-wrap; }}
+th {{ background: #666; color: #fff; cursor: pointer; position: sticky; top: 46px; }}
+th.asc::after {{ content: " ▲"; }}
+th.desc::after {{ content: " ▼"; }}
+tbody tr {{ content-visibility: auto; contain-intrinsic-size: auto 60px; }}
+.s-通过 {{ color: #2e7d32; }} .s-失败 {{ color: #c62828; }} .s-阻塞 {{ color: #ef6c00; }} .s-跳过 {{ color: #1565c0; }}
+td img {{ display: block; width: {thumbnail_width}px; max-width: 100%; margin-bottom: 4px; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>生成时间：{generated_at}</p>
+<div class="toolbar">
+状态：<select id="status"><option value="">全部</option><option>通过</option><option>失败</option><option>阻塞</option><option>跳过</option></select>
+案例集：<select id="collection"><option value="">全部</option></select>
+搜索：<input id="keyword" placeholder="用例ID、场景、结果、备注">
+</div>
+<div class="stats" id="stats"></div>
+<table id="records">
+<colgroup><col style="width:10%"><col style="width:8%"><col style="width:12%"><col style="width:12%"><col style="width:10%"><col style="width:5%"><col style="width:5%"><col style="width:10%"><col style="width:8%"><col style="width:8%"><col style="width:{image_column}px"></colgroup>
+<thead><tr><th>用例ID</th><th>案例集</th><th>测试场景</th><th>测试步骤</th><th>预期结果</th><th>优先级</th><th>状态</th><th>实际结果</th><th>备注</th><th data-type="time">执行时间</th><th>图片</th></tr></thead>
+<tbody>
+"""
+    
+    # 客户端筛选、排序与统计
+    HTML_TAIL = """</tbody>
+</table>
+<script>
+(function () {
+  var tbody = document.querySelector('#records tbody');
+  var rows = Array.prototype.slice.call(tbody.rows);
+  var statusSelect = document.getElementById('status');
+  var collectionSelect = document.getElementById('collection');
+  var keywordInput = document.getElementById('keyword');
+  var texts = null;
+  var collections = {};
+  rows.forEach(function (row) { collections[row.cells[1].textContent] = true; });
+  Object.keys(collections).sort().forEach(function (name) {
+    var option = document.createElement('option');
+    option.value = option.textContent = name;
+    collectionSelect.appendChild(option);
+  });
+  function update() {
+    var status = statusSelect.value, collection = collectionSelect.value;
+    var keyword = keywordInput.value.trim().toLowerCase();
+    if (keyword && !texts) { texts = rows.map(function (row) { return row.textContent.toLowerCase(); }); }
+    var counts = {'通过': 0, '失败': 0, '阻塞': 0, '跳过': 0}, total = 0;
+    rows.forEach(function (row, i) {
+      var visible = (!status || row.dataset.status === status)
+        && (!collection || row.cells[1].textContent === collection)
+        && (!keyword || texts[i].indexOf(keyword) >= 0);
+      row.hidden = !visible;
+      if (visible) { total++; if (row.dataset.status in counts) { counts[row.dataset.status]++; } }
+    });
+    var rate = total ? (counts['通过'] / total * 100).toFixed(2) : '0.00';
+    document.getElementById('stats').innerHTML = '<span>总记录数：' + total + '</span>'
+      + Object.keys(counts).map(function (key) { return '<span class="s-' + key + '">' + key + '：' + counts[key] + '</span>'; }).join('')
+      + '<span>通过率：' + rate + '%</span>';
+  }
+  document.querySelectorAll('#records th').forEach(function (th, column) {
+    th.addEventListener('click', function () {
+      var ascending = !th.classList.contains('asc');
+      document.querySelectorAll('#records th').forEach(function (other) { other.classList.remove('asc', 'desc'); });
+      th.classList.add(ascending ? 'asc' : 'desc');
+      var key = th.dataset.type === 'time'
+        ? function (row) { return Number(row.dataset.time); }
+        : function (row) { return row.cells[column].textContent; };
+      var keys = new Map(rows.map(function (row) { return [row, key(row)]; }));
+      rows.sort(function (a, b) {
+        var x = keys.get(a), y = keys.get(b);
+        var result = typeof x === 'number' ? x - y : x.localeCompare(y, 'zh-CN');
+        return ascending ? result : -result;
+      });
+      var fragment = document.createDocumentFragment();
+      rows.forEach(function (row) { fragment.appendChild(row); });
+      tbody.appendChild(fragment);
+      texts = null;
+    });
+  });
+  statusSelect.addEventListener('change', update);
+  collectionSelect.addEventListener('change', update);
+  var timer = null;
+  keywordInput.addEventListener('input', function () { clearTimeout(timer); timer = setTimeout(update, 200); });
+  update();
+})();
+</script>
+</body>
+</html>
+"""
+    
+    def export_html(self, rows, total, embed_images=False, title="测试执行报告"):
+        """
+        导出为HTML报告：逐批从数据库游标写入，状态筛选、案例集筛选、关键字搜索、按列排序与统计在浏览器端完成
+        
+        图片使用报告分辨率副本并设置 loading="lazy"，只在滚动到可见区域时加载。
+        
+        Args:
+            rows: 导出数据迭代器（Database.iter_export_rows）
+            total: 记录总数，用于计算进度
+            embed_images: True 时图片以 data URI 内嵌，生成单个文件；
+                          否则图片副本保存在与报告同名的 _files 目录中
+            title: 报告标题
+        """
+        export_dir = os.path.dirname(self.file_path)
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+        assets_dir = None if embed_images else self.html_assets_dir(self.file_path)
+        
+        try:
+            with open(self.file_path, 'w', encoding='utf-8', newline='\n') as f:
+                f.write(self.HTML_HEAD.format(
+                    title=escape(title),
+                    generated_at=time.strftime('%Y-%m-%d %H:%M:%S'),
+                    thumbnail_width=self.HTML_THUMBNAIL_WIDTH,
+                    image_column=self.HTML_THUMBNAIL_WIDTH + 14,
+                ))
+                image_sources = {}  # 图片副本路径 -> 报告中的引用地址
+                written = 0
+                last_progress = -1
+                while True:
+                    batch = list(itertools.islice(rows, self.HTML_BATCH_RECORDS))
+                    if not batch:
+                        break
+                    # 每批并行生成报告分辨率的图片副本（按内容哈希缓存）
+                    report_images = ImageUtils.prepare_report_images(
+                        [path for record in batch for path in record['图片'] if os.path.exists(path)]
+                    )
+                    for record in batch:
+                        f.write(self._html_record_row(record, report_images, image_sources, assets_dir))
+                    written += len(batch)
+                    if embed_images:
+                        image_sources.clear()
+                    
+                    progress = 10 + int(min(written, total) / max(total, 1) * 80)
+                    if progress != last_progress:
+                        last_progress = progress
+                        self.report_progress(progress)
+                f.write(self.HTML_TAIL)
+        except BaseException:
+            # 失败或被取消时删除图片目录（报告文件由调用方删除）
+            if assets_dir:
+                shutil.rmtree(assets_dir, ignore_errors=True)
+            raise
+        
+        self.report_progress(100)
+    
+    @staticmethod
+    def html_assets_dir(file_path):
+        """HTML报告的图片目录：与报告同名，后缀为 _files"""
+        return os.path.splitext(file_path)[0] + '_files'
+    
+    def _html_image_source(self, report_path, image_sources, assets_dir):
+        """报告中图片的引用地址：复制到图片目录后使用相对路径，或以 data URI 内嵌"""
+        source = image_sources.get(report_path)
+        if source is not None:
+            return source
+        ext = os.path.splitext(report_path)[1].lower()
+        if assets_dir is None:
+            mime = 'image/jpeg' if ext in ('.jpg', '.jpeg') else f"image/{ext.lstrip('.')}"
+            with open(report_path, 'rb') as image_file:
+                source = f"data:{mime};base64,{base64.b64encode(image_file.read()).decode('ascii')}"
+        else:
+            # 以内容哈希命名，同一张图片只复制一次
+            name = ImageUtils.file_content_hash(report_path) + ext
+            os.makedirs(assets_dir, exist_ok=True)
+            target = os.path.join(assets_dir, name)
+            if not os.path.exists(target):
+                shutil.copyfile(report_path, target)
+            source = f"{quote(os.path.basename(assets_dir))}/{name}"
+        image_sources[report_path] = source
+        return source
+    
+    def _html_record_row(self, record, report_images, image_sources, assets_dir):
+        """生成单条记录的表格行"""
+        status = record['执行状态'] or ''
+        images = []
+        for img_path in record['图片']:
+            report_path = report_images.get(img_path)
+            if report_path:
+                source = self._html_image_source(report_path, image_sources, assets_dir)
+                images.append(f'<a href="{source}" target="_blank"><img loading="lazy" decoding="async" src="{source}" alt=""></a>')
+        cells = [
+            escape(record['用例ID'] or ''),
+            escape(record['案例集名称'] or ''),
+            escape(record['测试场景'] or ''),
+            escape(record.get('测试步骤') or ''),
+            escape(record['预期结果'] or ''),
+            escape(record['优先级'] or ''),
+            f'<span class="s-{escape(status)}">{escape(status)}</span>',
+            escape(record['实际结果'] or ''),
+            escape(record['备注'] or ''),
+            DateUtils.timestamp_to_string(record['执行时间']),
+            ''.join(images),
+        ]
+        return (f'<tr data-status="{escape(status)}" data-time="{record["执行时间"]}">'
+                + ''.join(f'<td>{cell}</td>' for cell in cells) + '</tr>\n')
+    
+    # Excel导出列及对应的取值函数
+    EXCEL_COLUMNS = [
+        ('用例ID', lambda r: r['用例ID']),
+        ('测试场景', lambda r: r['测试场景']),
+        ('测试步骤', lambda r: r.get('测试步骤') or ''),
+        ('预期结果', lambda r: r['预期结果']),
+        ('优先级', lambda r: r['优先级'] or ''),
+        ('执行状态', lambda r: r['执行状态']),
+        ('实际结果', lambda r: r['实际结果'] or ''),
+        ('备注', lambda r: r['备注'] or ''),
+        ('执行时间', lambda r: DateUtils.timestamp_to_string(r['执行时间'])),
+    ]
+    
+    # “执行状态”列的条件格式背景色
+    STATUS_COLORS = {
+        '通过': '#C8E6C9',
+        '失败': '#FFCDD2',
+        '阻塞': '#FFF9C4',
+        '跳过': '#BBDEFB',
+    }
+    
+    def export_excel(self, rows, total, summary=None):
+        """
+        导出为Excel：逐行从数据库游标写入，不在内存中保留整表数据
+        
+        Args:
+            rows: 导出数据迭代器（Database.iter_export_rows）
+            total: 记录总数，用于计算进度
+            summary: 可选，ReportSummary，各汇总表写为附加工作表
+        """
+        getters = [getter for _, getter in self.EXCEL_COLUMNS]
+        values = ([getter(record) for getter in getters] for record in rows)
+        self._write_excel(values, total, progress_start=10, summary=summary)
+    
+    def export_excel_resumable(self, db, filters, total, checkpoint, summary=None):
+        """
+        可断点续传的Excel导出
+        
+        xlsx 是整体写出的压缩包，无法在中断处续写；这里先把查询并格式化好的行按
+        EXCEL_CHUNK_ROWS 行一段写入检查点（gzip压缩的JSON Lines），全部完成后再按顺序
+        从分段生成 xlsx。中断后从第一个未完成的行段继续查询，已完成的行段不再重复读取。
+        
+        Args:
+            db: Database 实例
+            filters: 筛选条件字典
+            total: 记录总数
+            checkpoint: ExportCheckpoint 实例
+            summary: 可选，ReportSummary，各汇总表写为附加工作表
+        """
+        getters = [getter for _, getter in self.EXCEL_COLUMNS]
+        chunk_size = self.EXCEL_CHUNK_ROWS
+        part_count = (total + chunk_size - 1) // chunk_size
+        part_paths = [checkpoint.part_path(index, '.jsonl.gz') for index in range(part_count)]
+        
+        first = next((index for index in range(part_count) if not checkpoint.is_done(index)), part_count)
+        if first < part_count:
+            rows = db.iter_export_rows(filters, offset=first * chunk_size)
+            for index in range(first, part_count):
+                temp_path = part_paths[index] + '.tmp'
+                with gzip.open(temp_path, 'wt', compresslevel=1, encoding='utf-8') as f:
+                    for record in itertools.islice(rows, chunk_size):
+                        f.write(json.dumps([getter(record) for getter in getters], ensure_ascii=False))
+                        f.write('\n')
+                os.replace(temp_path, part_paths[index])
+                checkpoint.mark_done(index)
+                self.report_progress(10 + int((index + 1) / part_count * 40))
+        
+        def iter_values():
+            for part_path in part_paths:
+                with gzip.open(part_path, 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        yield json.loads(line)
+        
+        self._write_excel(iter_values(), total, progress_start=50, summary=summary)
+    
+    def _write_excel(self, values, total, progress_start, summary=None):
+        """
+        将已格式化的行写入xlsx文件，有汇总时每个汇总表写为一个附加工作表
+        
+        优先使用 xlsxwriter 的 constant_memory 模式；未安装时使用 openpyxl 的只写模式。
+        """
+        summary_tables = summary.tables() if summary is not None else []
+        # 创建导出目录
+        export_dir = os.path.dirname(self.file_path)
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+        
+        headers = [name for name, _ in self.EXCEL_COLUMNS]
+        status_col_idx = headers.index('执行状态')
+        
+        if xlsxwriter is not None:
+            workbook = xlsxwriter.Workbook(self.file_path, {'constant_memory': True})
+            worksheet = workbook.add_worksheet('记录')
+            worksheet.write_row(0, 0, headers)
+            
+            def write_row(row_idx, values):
+                # 文本直接调用 write_string，跳过 write_row 的逐格类型判断
+                for col_idx, value in enumerate(values):
+                    if isinstance(value, str):
+                        worksheet.write_string(row_idx, col_idx, value)
+                    else:
+                        worksheet.write(row_idx, col_idx, value)
+            
+            count = self._write_excel_rows(values, total, write_row, progress_start)
+            
+            # 为“执行状态”列添加条件格式
+            if count:
+                col_letter = chr(ord('A') + status_col_idx)
+                rng = f"{col_letter}2:{col_letter}{count + 1}"
+                for status, color in self.STATUS_COLORS.items():
+                    worksheet.conditional_format(rng, {
+                        'type': 'text', 'criteria': 'containing', 'value': status,
+                        'format': workbook.add_format({'bg_color': color})
+                    })
+            
+            for title, table in summary_tables:
+                summary_sheet = workbook.add_worksheet(title)
+                summary_sheet.write_row(0, 0, list(table.columns))
+                for row_idx, (_, row) in enumerate(table.iterrows(), 1):
+                    summary_sheet.write_row(row_idx, 0, ReportSummary.format_row(row))
+                summary_sheet.set_column(0, 0, 20)
+            workbook.close()
+        else:
+            # 回退到 openpyxl 只写模式
+            workbook = openpyxl.Workbook(write_only=True)
+            worksheet = workbook.create_sheet('记录')
+            worksheet.append(headers)
+            count = self._write_excel_rows(
+                values, total,
+                lambda row_idx, row_values: worksheet.append(row_values),
+                progress_start
+            )
+            
+            if count:
+                col_letter = chr(ord('A') + status_col_idx)
+                rng = f"{col_letter}2:{col_letter}{count + 1}"
+                for status, color in self.STATUS_COLORS.items():
+                    fill = PatternFill(start_color=color[1:], end_color=color[1:], fill_type='solid')
+                    worksheet.conditional_formatting.add(rng, FormulaRule(
+                        formula=[f'NOT(ISERROR(SEARCH("{status}",{col_letter}2)))'], fill=fill
+                    ))
+            
+            for title, table in summary_tables:
+                summary_sheet = workbook.create_sheet(title)
+                summary_sheet.append(list(table.columns))
+                for _, row in table.iterrows():
+                    summary_sheet.append(ReportSummary.format_row(row))
+            workbook.save(self.file_path)
+        
+        self.report_progress(100)
+    
+    def _write_excel_rows(self, values, total, write_row, progress_start):
+        """逐行写入数据并按百分比变化更新进度（progress_start 到 90），返回写入行数"""
+        count = 0
+        last_progress = -1
+        for row_values in values:
+            count += 1
+            write_row(count, row_values)
+            
+            # 更新进度（仅在百分比变化时发送信号）
+            progress = progress_start + int(min(count, total) / total * (90 - progress_start))
+            if progress != last_progress:
+                last_progress = progress
+                self.report_progress(progress)
+        return count
+
+
+# 分片PDF工作进程的消息队列与取消标志（由进程池初始化函数设置）
+_shard_queue = None
+_shard_cancel = None
+
+
+def _init_pdf_shard_worker(message_queue, cancel_event):
+    """进程池初始化：保存与主进程共享的消息队列与取消标志"""
+    global _shard_queue, _shard_cancel
+    _shard_queue = message_queue
+    _shard_cancel = cancel_event
+
+
+def _render_pdf_shard(db_path, shard):
+    """
+    在进程池中生成一个分片PDF，并在旁边写入分片信息（页数与状态统计）
+
+    Args:
+        db_path: 数据库文件路径
+        shard: 分片描述，见 ShardedPdfExporter.plan_shards
+    """
+    db = Database(db_path)
+    try:
+        records = list(db.iter_export_rows(shard['filters'], offset=shard['offset'], limit=shard['limit']))
+    finally:
+        db.close()
+    
+    temp_path = shard['path'] + '.tmp'
+    reporter = ReportExporter(
+        temp_path,
+        progress_callback=lambda value: _shard_queue.put((shard['index'], value)),
+        cancel_check=_shard_cancel.is_set
+    )
+    reporter.export_pdf(records, title=shard['title'])
+    os.replace(temp_path, shard['path'])
+    
+    info = {'pages': len(PdfReader(shard['path']).pages), 'stats': ReportExporter.status_stats(records)}
+    with open(shard['path'] + '.json', 'w', encoding='utf-8') as f:
+        json.dump(info, f, ensure_ascii=False)
+
+
+class ShardedPdfExporter(ReportExporter):
+    """
+    并行分片PDF报告
+    
+    按案例集拆分筛选结果（只有一个案例集时按记录数拆分），记录较多的案例集再按记录数细分，
+    每个分片在进程池中独立排版，耗时随CPU核数近似线性下降。全部分片完成后合并为一个
+    带目录页与书签的PDF，或打包为每个案例集一个PDF的zip文件。
+    已完成的分片记入检查点，中断后再次导出只生成剩余分片。
+    """
+    
+    # 导出类型 -> 输出方式
+    OUTPUTS = {
+        'pdf_parallel': 'merged',
+        'pdf_zip': 'zip',
+    }
+    
+    # 每个分片的最大记录数（约250页）
+    SHARD_RECORDS = 500
+    
+    # 未归入案例集的记录的显示名称
+    UNGROUPED_NAME = "未分组"
+    
+    def __init__(self, db_path, file_path, filters=None, output='merged', max_workers=None,
+                 progress_callback=None, cancel_check=None):
+        super().__init__(file_path, progress_callback, cancel_check)
+        self.db_path = db_path
+        self.filters = dict(filters or {})
+        self.output = output
+        self.max_workers = max_workers or os.cpu_count() or 1
+    
+    @staticmethod
+    def available():
+        """并行分片需要 pypdf 合并分片"""
+        return PdfWriter is not None
+    
+    def plan_shards(self, db):
+        """
+        拆分分片
+        
+        Returns:
+            list: 分片描述字典，包含 index、group（案例集）、title、filters、offset、limit、count
+        """
+        collections = db.get_export_collections(self.filters)
+        shards = []
+        for collection_name, count in collections:
+            group = collection_name or self.UNGROUPED_NAME
+            shard_filters = dict(self.filters, collection_name=collection_name)
+            parts = (count + self.SHARD_RECORDS - 1) // self.SHARD_RECORDS
+            for part in range(parts):
+                title = f"测试执行报告 - {group}"
+                if parts > 1:
+                    title += f"（{part + 1}/{parts}）"
+                shards.append({
+                    'index': len(shards),
+                    'group': group,
+                    'title': title,
+                    'filters': shard_filters,
+                    'offset': part * self.SHARD_RECORDS,
+                    'limit': self.SHARD_RECORDS,
+                    'count': min(self.SHARD_RECORDS, count - part * self.SHARD_RECORDS),
+                })
+        return shards
+    
+    def export(self, export_type):
+        """执行导出，返回输出文件路径"""
+        if not self.available():
+            raise RuntimeError("未安装 pypdf，无法并行生成分片PDF")
+        
+        db = Database(self.db_path)
+        try:
+            shards = self.plan_shards(db)
+            if not shards:
+                raise ValueError("没有符合条件的记录可导出")
+            fingerprint = db.get_export_fingerprint(self.filters)
+            summary = ReportSummary.from_db(db, self.filters) if self.output == 'merged' else None
+        finally:
+            db.close()
+        fingerprint['shards'] = [[shard['group'], shard['offset'], shard['count']] for shard in shards]
+        checkpoint = ExportCheckpoint(export_type, self.file_path, self.filters, fingerprint)
+        for shard in shards:
+            shard['path'] = checkpoint.part_path(shard['index'], '.pdf')
+        self.report_progress(10)
+        
+        self._render_shards(shards, checkpoint)
+        
+        export_dir = os.path.dirname(self.file_path)
+        if export_dir:
+            os.makedirs(export_dir, exist_ok=True)
+        infos = []
+        for shard in shards:
+            with open(shard['path'] + '.json', 'r', encoding='utf-8') as f:
+                infos.append(json.load(f))
+        if self.output == 'zip':
+            self._write_zip(shards, checkpoint)
+        else:
+            self._write_merged(shards, infos, checkpoint, summary)
+        checkpoint.clear()
+        self.report_progress(100)
+        return self.file_path
+    
+    def _render_shards(self, shards, checkpoint):
+        """在进程池中并行生成未完成的分片，汇总进度并响应取消"""
+        pending = [shard for shard in shards if not checkpoint.is_done(shard['index'])]
+        total_records = sum(shard['count'] for shard in shards)
+        shard_progress = {shard['index']: (0 if shard in pending else 100) for shard in shards}
+        if not pending:
+            return
+        
+        context = multiprocessing.get_context('spawn')
+        message_queue = context.Queue()
+        cancel_event = context.Event()
+        pool = ProcessPoolExecutor(
+            max_workers=min(self.max_workers, len(pending)), mp_context=context,
+            initializer=_init_pdf_shard_worker, initargs=(message_queue, cancel_event)
+        )
+        try:
+            futures = {pool.submit(_render_pdf_shard, self.db_path, shard): shard for shard in pending}
+            not_done = set(futures)
+            while not_done:
+                done, not_done = wait(not_done, timeout=0.2, return_when=FIRST_COMPLETED)
+                
+                while True:
+                    try:
+                        index, value = message_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    shard_progress[index] = value
+                
+                for future in done:
+                    shard = futures[future]
+                    future.result()  # 分片失败时抛出异常，终止整个导出
+                    shard_progress[shard['index']] = 100
+                    checkpoint.mark_done(shard['index'])
+                
+                # 进度按分片记录数加权
+                rendered = sum(shard_progress[shard['index']] / 100 * shard['count'] for shard in shards)
+                try:
+                    self.report_progress(10 + int(rendered / total_records * 80))
+                except ExportCancelled:
+                    cancel_event.set()
+                    raise
+        except BaseException:
+            cancel_event.set()
+            pool.shutdown(wait=True, cancel_futures=True)
+            raise
+        pool.shutdown(wait=True)
+    
+    def _group_shards(self, shards):
+        """按案例集分组，保持分片顺序"""
+        groups = []
+        for shard in shards:
+            if not groups or groups[-1][0] != shard['group']:
+                groups.append((shard['group'], []))
+            groups[-1][1].append(shard)
+        return groups
+    
+    def _write_merged(self, shards, infos, checkpoint, summary=None):
+        """合并为一个PDF：目录页（总体统计、汇总表与各案例集起始页码）+ 各分片，并添加书签"""
+        self.report_progress(90)
+        groups = self._group_shards(shards)
+        
+        # 目录页数可能影响页码，先按1页生成，页数不符时重新生成一次
+        toc_path = checkpoint.part_path(len(shards), '.toc.pdf')
+        toc_pages = 1
+        for _ in range(2):
+            start_pages = []
+            page = toc_pages
+            for group, group_shards in groups:
+                start_pages.append(page + 1)
+                page += sum(infos[shard['index']]['pages'] for shard in group_shards)
+            self._write_toc(toc_path, groups, infos, start_pages, summary)
+            actual_pages = len(PdfReader(toc_path).pages)
+            if actual_pages == toc_pages:
+                break
+            toc_pages = actual_pages
+        
+        writer = PdfWriter()
+        writer.append(toc_path)
+        for (group, group_shards), start_page in zip(groups, start_pages):
+            for shard in group_shards:
+                writer.append(shard['path'])
+            writer.add_outline_item(group, start_page - 1)
+        temp_path = self.file_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            writer.write(f)
+        writer.close()
+        os.replace(temp_path, self.file_path)
+    
+    def _write_toc(self, toc_path, groups, infos, start_pages, summary=None):
+        """生成目录页，有汇总时在目录后附加各维度汇总表"""
+        styles = self._pdf_styles()
+        
+        # 汇总各分片的状态统计
+        stats = {'total': 0, '通过': 0, '失败': 0, '阻塞': 0, '跳过': 0}
+        for info in infos:
+            for key in stats:
+                stats[key] += info['stats'][key]
+        stats['通过率'] = (stats['通过'] / stats['total'] * 100) if stats['total'] > 0 else 0
+        
+        toc_data = [["案例集", "记录数", "通过率", "起始页"]]
+        for (group, group_shards), start_page in zip(groups, start_pages):
+            total = sum(infos[shard['index']]['stats']['total'] for shard in group_shards)
+            passed = sum(infos[shard['index']]['stats']['通过'] for shard in group_shards)
+            rate = passed / total * 100 if total else 0
+            toc_data.append([Paragraph(group, styles["Normal"]), str(total), f"{rate:.2f}%", str(start_page)])
+        toc_table = Table(toc_data, colWidths=[260, 70, 70, 60], repeatRows=1)
+        toc_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('FONTNAME', (0, 0), (-1, -1), 'STSong-Light'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black)
+        ]))
+        
+        elements = [
+            Paragraph("测试执行报告", styles["Title"]),
+            Spacer(1, 20),
+            self._pdf_stats_table(stats),
+            Spacer(1, 20),
+            Paragraph("目录", styles["Heading2"]),
+            Spacer(1, 10),
+            toc_table,
+            Spacer(1, 20),
+        ]
+        if summary is not None:
+            elements.extend(self._pdf_summary_elements(summary, styles))
+        SimpleDocTemplate(toc_path, pagesize=A4).build(elements)
+    
+    def _write_zip(self, shards, checkpoint):
+        """打包为每个案例集一个PDF的zip文件（PDF已压缩，按存储方式写入）"""
+        self.report_progress(90)
+        temp_path = self.file_path + '.tmp'
+        used_names = set()
+        with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_STORED) as zf:
+            for group, group_shards in self._group_shards(shards):
+                # 文件名去掉路径分隔符等非法字符，重名时追加序号
+                base_name = ''.join('_' if ch in '\\/:*?"<>|' else ch for ch in group).strip() or self.UNGROUPED_NAME
+                name, suffix = base_name, 2
+                while name in used_names:
+                    name = f"{base_name}_{suffix}"
+                    suffix += 1
+                used_names.add(name)
+                
+                if len(group_shards) == 1:
+                    zf.write(group_shards[0]['path'], f"{name}.pdf")
+                    continue
+                # 同一案例集拆成多个分片时先合并
+                merged_path = checkpoint.part_path(group_shards[0]['index'], '.merged.pdf')
+                writer = PdfWriter()
+                for shard in group_shards:
+                    writer.append(shard['path'])
+                with open(merged_path, 'wb') as f:
+                    writer.write(f)
+                writer.close()
+                zf.write(merged_path, f"{name}.pdf")
+        os.replace(temp_path, self.file_path)
+
+
+# HTML报告类型 -> 是否内嵌图片
+HTML_TYPES = {
+    'html': False,
+    'html_single': True,
+}
+
+# 导出类型：PDF/Excel/HTML 报告、并行分片PDF、CSV/JSON Lines 数据文件、证据包、分析快照
+EXPORT_TYPES = (('pdf', 'excel') + tuple(HTML_TYPES) + tuple(ShardedPdfExporter.OUTPUTS)
+                + RecordExporter.FORMATS + ('bundle',) + tuple(AnalyticsSnapshot.FORMATS))
+
+
+def run_export(db_path, export_type, file_path, filters=None, compress=False,
+               progress_callback=None, cancel_check=None):
+    """
+    执行一次导出
+
+    Args:
+        db_path: 数据库文件路径（在调用方线程/进程内建立连接）
+        export_type: 导出类型，见 EXPORT_TYPES
+        file_path: 输出文件路径；分析快照为快照根目录
+        filters: 筛选条件字典，见 Database._export_query_parts
+        compress: CSV/JSON Lines 是否gzip压缩
+        progress_callback: 可选，进度回调，参数为百分比（0-100）
+        cancel_check: 可选，返回 True 表示用户已取消
+
+    PDF/Excel 报告导出会在 ExportCheckpoint.CHECKPOINT_DIR 中保存分段检查点，
+    取消或失败后以相同参数再次调用会从最后完成的分段继续。
+    单文件导出结果保存在 ExportCache 中，数据未变化时相同的导出直接复制缓存文件。
+    筛选条件中 since_last_export 为 True 时为增量导出，只导出该报告上次成功导出后新增或修改的记录。
+
+    Returns:
+        str: 导出结果路径；增量导出时自上次导出以来没有新增或修改的记录则为 None（不生成文件，水位不变）
+
+    Raises:
+        ExportCancelled: 用户取消
+        ValueError: 没有可导出的记录或导出类型不支持
+    """
+    # 变更计数在导出前读取：导出期间数据有变化时，缓存键对应的计数已过时，不会被再次命中；
+    # 增量导出的水位也记为该计数，导出期间变化的记录会在下一次增量导出中出现
+    db = Database(db_path)
+    try:
+        change_counter = db.get_change_counter()
+    finally:
+        db.close()
+    
+    # 增量导出：只导出该报告上次成功导出之后新增或修改的记录（首次为全部记录）
+    filters = ExportWatermark.resolve_filters(db_path, export_type, filters)
+    delta = 'since_change' in filters
+    if delta:
+        db = Database(db_path)
+        try:
+            unchanged = not db.count_export_rows(filters)
+        finally:
+            db.close()
+        if unchanged:
+            if progress_callback:
+                progress_callback(100)
+            return None
+    
+    cache = ExportCache() if export_type in ExportCache.CACHEABLE_TYPES else None
+    cache_key = None
+    if cache is not None and cache.enabled:
+        cache_key = ExportCache.make_key(db_path, export_type, filters, compress, change_counter)
+        if cache.get(cache_key, file_path):
+            if progress_callback:
+                progress_callback(100)
+            return file_path
+    
+    result = _run_export(db_path, export_type, file_path, filters, compress, progress_callback, cancel_check)
+    if cache_key:
+        try:
+            cache.put(cache_key, result)
+        except OSError as e:
+            print(f"保存导出缓存失败: {e}")
+    if delta:
+        ExportWatermark.set(db_path, export_type, filters, change_counter)
+    return result
+
+
+def _run_export(db_path, export_type, file_path, filters, compress, progress_callback, cancel_check):
+    """执行一次导出（不经过缓存），参数见 run_export"""
+    reporter = ReportExporter(file_path, progress_callback, cancel_check)
+    db = Database(db_path)
+    try:
+        # 并行分片PDF由进程池中的多个进程排版
+        if export_type in ShardedPdfExporter.OUTPUTS:
+            return ShardedPdfExporter(
+                db_path, file_path, filters, ShardedPdfExporter.OUTPUTS[export_type],
+                progress_callback=progress_callback, cancel_check=cancel_check
+            ).export(export_type)
+        
+        # 分析快照包含全部数据，不受筛选条件影响
+        if export_type in AnalyticsSnapshot.FORMATS:
+            return AnalyticsSnapshot.write(
+                db, export_type, file_path,
+                progress_callback=lambda done, total: reporter.report_progress(int(done / total * 100))
+            )
+        
+        # 先统计记录数，报告均从数据库游标流式读取
+        total = db.count_export_rows(filters)
+        if not total:
+            raise ValueError("没有符合条件的记录可导出")
+        
+        # 证据包：清单与图片流式写入zip
+        if export_type == "bundle":
+            EvidenceBundle.export(db, file_path, filters, progress_callback=reporter.report_progress)
+            return file_path
+        reporter.report_progress(10)
+        
+        if export_type in ("pdf", "excel"):
+            # 报告导出分段记入检查点，中断后再次导出同一报告时从最后完成的分段继续
+            fingerprint = db.get_export_fingerprint(filters)
+            fingerprint['chunk'] = (ReportExporter.PDF_CHUNK_RECORDS if export_type == "pdf"
+                                    else ReportExporter.EXCEL_CHUNK_ROWS)
+            checkpoint = ExportCheckpoint(export_type, file_path, filters, fingerprint)
+            # 多维汇总由一次分组查询得到，不再逐条统计导出记录
+            summary = ReportSummary.from_db(db, filters)
+            if export_type == "pdf":
+                reporter.export_pdf(db.iter_export_rows(filters), total, checkpoint, summary=summary)
+            elif total > ReportExporter.EXCEL_CHUNK_ROWS:
+                reporter.export_excel_resumable(db, filters, total, checkpoint, summary=summary)
+            else:
+                reporter.export_excel(db.iter_export_rows(filters), total, summary=summary)
+            checkpoint.clear()
+        elif export_type in HTML_TYPES:
+            reporter.export_html(db.iter_export_rows(filters), total, embed_images=HTML_TYPES[export_type])
+        elif export_type in RecordExporter.FORMATS:
+            RecordExporter.export(
+                db, export_type, file_path, filters, compress,
+                progress_callback=lambda count: reporter.report_progress(10 + int(min(count, total) / total * 90))
+            )
+        else:
+            raise ValueError(f"不支持的导出类型: {export_type}")
+        return file_path
+    finally:
+        db.close()
+
+
+def export_worker(job_id, export_type, file_path, db_path, filters, compress, message_queue, cancel_event):
+    """
+    导出工作进程入口：执行导出并通过队列回传消息
+
+    消息格式为 (job_id, 类型, 值)，类型为 'progress'（百分比）、'completed'（结果路径，增量导出没有变化时为 None）、
+    'cancelled' 或 'failed'（错误信息）。进度仅在百分比变化时发送。
+    """
+    last_progress = [-1]
+    
+    def on_progress(value):
+        if value != last_progress[0]:
+            last_progress[0] = value
+            message_queue.put((job_id, 'progress', value))
+    
+    terminated = [False]
+    
+    def on_terminate(signum, frame):
+        # 被强制结束时按取消处理：并行PDF导出借此通知分片进程停止并关闭进程池，
+        # 异常若被中途吞掉，下一次进度检查仍会取消
+        terminated[0] = True
+        raise ExportCancelled()
+    
+    signal.signal(signal.SIGTERM, on_terminate)
+    try:
+        result = run_export(db_path, export_type, file_path, filters, compress, progress_callback=on_progress,
+                            cancel_check=lambda: terminated[0] or cancel_event.is_set())
+        message_queue.put((job_id, 'completed', result))
+    except ExportCancelled:
+        # 删除未完成的输出文件
+        if export_type not in AnalyticsSnapshot.FORMATS and os.path.isfile(file_path):
+            os.remove(file_path)
+        message_queue.put((job_id, 'cancelled', None))
+    except Exception as e:
+        message_queue.put((job_id, 'failed', f"导出失败: {str(e)}"))
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="流式导出测试记录为CSV或JSON Lines")
+    parser.add_argument('output', help="输出文件路径（.csv/.jsonl，可加 .gz 后缀）")
+    parser.add_argument('--db', default='data/qa_test_logger.db', help="数据库文件路径")
+    parser.add_argument('--format', choices=RecordExporter.FORMATS, help="导出格式，默认按扩展名判断")
+    parser.add_argument('--gzip', action='store_true', help="gzip压缩输出")
+    parser.add_argument('--start', help="开始日期 YYYY-MM-DD")
+    parser.add_argument('--end', help="结束日期 YYYY-MM-DD（包含当天）")
+    parser.add_argument('--status', help="执行状态")
+    parser.add_argument('--case-id', help="用例ID")
+    parser.add_argument('--project', help="项目ID")
+    parser.add_argument('--collection', help="案例集名称")
+    parser.add_argument('--search', help="搜索关键字（中文匹配测试场景，否则匹配用例ID）")
+    parser.add_argument('--since-last-export', action='store_true',
+                        help="只导出上次以相同条件导出后新增或修改的记录")
+    args = parser.parse_args()
+
+    detected_format, detected_gzip = RecordExporter.detect_format(args.output)
+    export_format = args.format or detected_format
+    if export_format is None:
+        parser.error("无法从扩展名判断导出格式，请使用 --format 指定")
+
+    end_date = DateUtils.string_to_timestamp(args.end) if args.end else None
+    filters = {
+        'start_date': DateUtils.string_to_timestamp(args.start) if args.start else None,
+        # 与历史记录界面一致：结束日期包含当天
+        'end_date': end_date + 86400 if end_date else None,
+        'case_id': args.case_id,
+        'status': args.status,
+        'project_id': args.project,
+        'collection_name': args.collection,
+        'search_text': args.search
+    }
+
+    if args.since_last_export:
+        # 增量导出经过 run_export，成功后更新该报告的水位
+        filters[ExportWatermark.DELTA_KEY] = True
+        try:
+            result = run_export(args.db, export_format, args.output, filters, args.gzip or detected_gzip,
+                                progress_callback=lambda value: print(f"\r{value}%", end='', flush=True))
+        except ValueError as e:
+            print(e)
+            return
+        if result is None:
+            print("\n自上次导出以来没有新增或修改的记录，未生成文件")
+            return
+        print(f"\n导出完成: {args.output}")
+        return
+
+    db = Database(args.db)
+    try:
+        count = RecordExporter.export(
+            db, export_format, args.output, filters,
+            compress=args.gzip or detected_gzip,
+            progress_callback=lambda n: print(f"\r已导出 {n} 条记录", end='', flush=True)
+        )
+    finally:
+        db.close()
+    print(f"\n导出完成: {args.output}（{count} 条记录）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import threading
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from database import Database
+from batch_import import BatchCaseImporter, ImportCancelled
+
+
+class CaseImportWorker(QThread):
+    """
+    用例导入工作线程
+
+    在后台线程中使用独立的数据库连接，分两步执行：
+    plan 只比对内容摘要、给出新增/修改/未变化的预览，不写入数据库；
+    import 将批次写入同一个事务（只写新增和有变化的用例），写入完成后读回本次导入的用例。
+    取消时在下一批处理前停止，导入事务整体回滚，数据库保持导入前的状态。
+    """
+
+    # 信号
+    progress = pyqtSignal(int, int)   # 已处理行数, 总行数（未知时为0）
+    planned = pyqtSignal(dict)        # 导入预览
+    succeeded = pyqtSignal(dict)      # 导入结果
+    failed = pyqtSignal(str)          # 失败原因
+    cancelled = pyqtSignal()
+
+    def __init__(self, db_path, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.mode = 'import'
+        self.batches = None
+        self.collection_name = None
+        self.total = None
+        self._cancel_event = threading.Event()
+
+    def run_plan(self, batches, collection_name=None, total=None):
+        """开始比对，参数同 run_import，完成后发出 planned 信号"""
+        self.mode = 'plan'
+        self._start(batches, collection_name, total)
+
+    def run_import(self, batches, collection_name=None, total=None):
+        """
+        开始导入
+
+        Args:
+            batches: 可迭代对象，每个元素是一批测试用例数据（字典列表），在工作线程中迭代
+            collection_name: 可选，案例集名称，设置到每个用例
+            total: 可选，总行数；为 None 时由批次来源自行调用 report_progress 报告进度
+        """
+        self.mode = 'import'
+        self._start(batches, collection_name, total)
+
+    def _start(self, batches, collection_name, total):
+        self.batches = batches
+        self.collection_name = collection_name
+        self.total = total
+        self._cancel_event.clear()
+        self.start()
+
+    def cancel(self):
+        """请求取消导入"""
+        self._cancel_event.set()
+
+    def report_progress(self, done, total=None):
+        """报告进度（可在工作线程中调用，例如作为 ExcelParser 的进度回调）"""
+        self.progress.emit(done, total or 0)
+
+    def _prepared_batches(self, imported_ids):
+        """设置案例集名称并记录用例ID，每批写入前检查是否已请求取消"""
+        done = 0
+        for batch in self.batches:
+            if self._cancel_event.is_set():
+                raise ImportCancelled()
+            for case in batch:
+                # 为所有案例设置案例集名称
+                if self.collection_name:
+                    case['案例集名称'] = self.collection_name
+                if case.get('用例ID'):
+                    imported_ids.append(case['用例ID'])
+            yield batch
+            done += len(batch)
+            if self.total is not None:
+                self.report_progress(done, self.total)
+        if self._cancel_event.is_set():
+            raise ImportCancelled()
+
+    def run(self):
+        db = None
+        try:
+            db = Database(self.db_path)
+            imported_ids = []
+            if self.mode == 'plan':
+                self.planned.emit(db.plan_test_case_import(
+                    self._prepared_batches(imported_ids), self.collection_name
+                ))
+                return
+            result = db.import_test_case_batches(self._prepared_batches(imported_ids), self.collection_name)
+
+            # 一次查询读回本次导入的用例，供界面追加到表格
+            result['cases'] = db.get_test_cases_by_ids(imported_ids)
+            result['case_ids'] = imported_ids
+            result['collection_name'] = self.collection_name
+            self.succeeded.emit(result)
+        except ImportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            close = getattr(self.batches, 'close', None)
+            if close:
+                close()
+            if db is not None:
+                db.close()
+
+
+class BatchImportWorker(QThread):
+    """
+    批量导入工作线程：调用 BatchCaseImporter 在进程池中并行解析多个工作簿和工作表，
+    本线程作为唯一的写入方；取消时整体回滚
+    """
+
+    # 信号
+    progress = pyqtSignal(int, int)   # 已解析行数, 总行数
+    succeeded = pyqtSignal(list)      # 每个工作表的导入报告
+    failed = pyqtSignal(str)          # 失败原因
+    cancelled = pyqtSignal()
+
+    def __init__(self, db_path, sheets, parent=None):
+        super().__init__(parent)
+        self.db_path = db_path
+        self.sheets = sheets
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """请求取消导入"""
+        self._cancel_event.set()
+
+    def run(self):
+        importer = BatchCaseImporter(
+            self.db_path, [sheet['file_path'] for sheet in self.sheets],
+            progress_callback=self.progress.emit, cancel_check=self._cancel_event.is_set
+        )
+        try:
+            self.succeeded.emit(importer.run(self.sheets))
+        except ImportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 from PyQt6.QtWidgets import QApplication, QSplashScreen
 from PyQt6.QtGui import QIcon, QPixmap
 from PyQt6.QtCore import Qt, QTimer
@@ -49,4 +50,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 导出任务在子进程中执行，打包为可执行文件后需要此调用
+    multiprocessing.freeze_support()
     main()
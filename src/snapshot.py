@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分析快照：将用例、记录与图片表按批写入列式文件（Arrow IPC 或 Parquet）
+统计与数据分析直接内存映射最新快照做向量化聚合，不再访问正在使用的SQLite数据库
+
+用法:
+    python src/snapshot.py                     # 生成 Arrow IPC 快照
+    python src/snapshot.py --format parquet    # 生成 Parquet 快照（zstd压缩，适合交给分析同事）
+
+在 pandas 中读取:
+    pd.read_parquet('data/snapshots/<快照目录>/records.parquet')
+    pa.ipc.open_file(pa.memory_map('data/snapshots/<快照目录>/records.arrow')).read_pandas()
+"""
+
+import os
+import json
+import time
+import shutil
+import tempfile
+import argparse
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from database import Database
+
+
+class AnalyticsSnapshot:
+    """列式分析快照的生成与读取"""
+
+    SNAPSHOT_DIR = os.path.join('data', 'snapshots')
+
+    # 快照格式 -> 文件扩展名
+    FORMATS = {
+        'arrow': '.arrow',
+        'parquet': '.parquet',
+    }
+
+    # 每批从游标读取并写入的行数
+    BATCH_SIZE = 10000
+
+    # 保留的快照数量，生成新快照后删除更早的
+    KEEP_SNAPSHOTS = 3
+
+    INFO_FILE = 'info.json'
+
+    # 快照中的表：(表名, 查询语句, 列定义)
+    # records 表附带用例的案例集、项目ID与优先级，统计时无需再与 cases 连接
+    TABLES = [
+        ('cases', '''
+            SELECT case_id, scenario, test_steps, expected_result, priority,
+                   case_collection_name, project_id
+            FROM test_cases ORDER BY case_id
+        ''', [
+            ('case_id', 'string'), ('scenario', 'string'), ('test_steps', 'string'),
+            ('expected_result', 'string'), ('priority', 'string'),
+            ('case_collection_name', 'string'), ('project_id', 'string'),
+        ]),
+        ('records', '''
+            SELECT r.record_id, r.case_id, r.status, r.actual_result, r.notes, r.executor,
+                   r.timestamp, c.case_collection_name, c.project_id, c.priority
+            FROM test_records r
+            LEFT JOIN test_cases c ON c.case_id = r.case_id
+            ORDER BY r.record_id
+        ''', [
+            ('record_id', 'int64'), ('case_id', 'string'), ('status', 'string'),
+            ('actual_result', 'string'), ('notes', 'string'), ('executor', 'string'),
+            ('timestamp', 'int64'), ('case_collection_name', 'string'),
+            ('project_id', 'string'), ('priority', 'string'),
+        ]),
+        ('images', '''
+            SELECT image_id, record_id, image_path, order_index
+            FROM record_images ORDER BY record_id, order_index
+        ''', [
+            ('image_id', 'int64'), ('record_id', 'int64'),
+            ('image_path', 'string'), ('order_index', 'int64'),
+        ]),
+    ]
+
+    STATUSES = ['通过', '失败', '阻塞', '跳过']
+
+    @staticmethod
+    def available():
+        """当前环境是否安装了 pyarrow"""
+        return pa is not None
+
+    @staticmethod
+    def _schema(columns):
+        return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in columns])
+
+    @staticmethod
+    def _open_writer(file_path, schema, file_format):
+        if file_format == 'parquet':
+            return pq.ParquetWriter(file_path, schema, compression='zstd')
+        return ipc.new_file(file_path, schema)
+
+    @staticmethod
+    def write(db, file_format='arrow', snapshot_dir=None, batch_size=None, progress_callback=None):
+        """
+        生成一份完整快照：游标按批读取，每批转换为列式数据后立即写出，内存占用与表大小无关
+
+        快照先写入临时目录，全部完成后再重命名，读取方不会看到写了一半的快照。
+
+        Args:
+            db: Database 实例
+            file_format: 'arrow'（可零拷贝内存映射）或 'parquet'（压缩，体积小）
+            snapshot_dir: 快照根目录，默认 data/snapshots
+            batch_size: 每批行数，默认 BATCH_SIZE
+            progress_callback: 可选，进度回调，参数为 (已写入行数, 总行数)
+
+        Returns:
+            str: 新快照目录路径
+        """
+        if pa is None:
+            raise RuntimeError("未安装 pyarrow，无法生成分析快照")
+        if file_format not in AnalyticsSnapshot.FORMATS:
+            raise ValueError(f"不支持的快照格式: {file_format}")
+
+        snapshot_dir = snapshot_dir or AnalyticsSnapshot.SNAPSHOT_DIR
+        batch_size = batch_size or AnalyticsSnapshot.BATCH_SIZE
+        extension = AnalyticsSnapshot.FORMATS[file_format]
+        os.makedirs(snapshot_dir, exist_ok=True)
+
+        created_at = int(time.time())
+        name = time.strftime('snapshot_%Y%m%d_%H%M%S', time.localtime(created_at))
+        # 每个任务使用独立的临时目录，并发生成快照时互不干扰
+        temp_path = tempfile.mkdtemp(prefix=name + '.', suffix='.tmp', dir=snapshot_dir)
+        try:
+            row_counts = AnalyticsSnapshot._write_tables(db, temp_path, extension, file_format,
+                                                         batch_size, progress_callback)
+        except BaseException:
+            # 失败或被取消时清理未完成的快照
+            shutil.rmtree(temp_path, ignore_errors=True)
+            raise
+
+        info = {
+            'created_at': created_at,
+            'format': file_format,
+            'db_path': os.path.abspath(db.db_path),
+            'row_counts': row_counts,
+        }
+        with open(os.path.join(temp_path, AnalyticsSnapshot.INFO_FILE), 'w', encoding='utf-8') as f:
+            json.dump(info, f, ensure_ascii=False, indent=2)
+
+        final_path = AnalyticsSnapshot._publish(temp_path, snapshot_dir, name)
+        AnalyticsSnapshot.prune(snapshot_dir)
+        return final_path
+
+    @staticmethod
+    def _publish(temp_path, snapshot_dir, name):
+        """把临时目录重命名为正式快照目录，同一秒内已有同名快照时追加序号，不覆盖已有快照"""
+        suffix = 0
+        while True:
+            final_path = os.path.join(snapshot_dir, name if not suffix else f'{name}_{suffix}')
+            suffix += 1
+            if os.path.exists(final_path):
+                continue
+            try:
+                os.rename(temp_path, final_path)
+            except OSError:
+                # 检查之后被其他任务抢先占用了该名称
+                if os.path.exists(final_path):
+                    continue
+                shutil.rmtree(temp_path, ignore_errors=True)
+                raise
+            return final_path
+
+    @staticmethod
+    def _write_tables(db, temp_path, extension, file_format, batch_size, progress_callback):
+        """按批写出各表，返回各表行数"""
+        # 在同一个读事务中读取所有表，保证三张表彼此一致
+        cursor = db.conn.cursor()
+        own_transaction = not db.conn.in_transaction
+        if own_transaction:
+            cursor.execute('BEGIN')
+        try:
+            totals = {}
+            for table_name in ('test_cases', 'test_records', 'record_images'):
+                cursor.execute(f'SELECT COUNT(*) FROM {table_name}')
+                totals[table_name] = cursor.fetchone()[0]
+            total = sum(totals.values())
+
+            written = 0
+            row_counts = {}
+            for table, query, columns in AnalyticsSnapshot.TABLES:
+                schema = AnalyticsSnapshot._schema(columns)
+                writer = AnalyticsSnapshot._open_writer(
+                    os.path.join(temp_path, table + extension), schema, file_format
+                )
+                count = 0
+                try:
+                    cursor.execute(query)
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        arrays = [
+                            pa.array(values, type=field.type)
+                            for values, field in zip(zip(*rows), schema)
+                        ]
+                        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                        count += len(rows)
+                        written += len(rows)
+                        if progress_callback:
+                            progress_callback(written, total)
+                finally:
+                    writer.close()
+                row_counts[table] = count
+        finally:
+            if own_transaction:
+                cursor.execute('COMMIT')
+        return row_counts
+
+    @staticmethod
+    def list_snapshots(snapshot_dir=None):
+        """按时间从新到旧列出已完成的快照目录"""
+        snapshot_dir = snapshot_dir or AnalyticsSnapshot.SNAPSHOT_DIR
+        if not os.path.isdir(snapshot_dir):
+            return []
+        paths = [
+            os.path.join(snapshot_dir, name)
+            for name in os.listdir(snapshot_dir)
+            if name.startswith('snapshot_') and not name.endswith('.tmp')
+            and os.path.exists(os.path.join(snapshot_dir, name, AnalyticsSnapshot.INFO_FILE))
+        ]
+        return sorted(paths, reverse=True)
+
+    @staticmethod
+    def latest(snapshot_dir=None):
+        """最新快照目录，没有快照时返回 None"""
+        snapshots = AnalyticsSnapshot.list_snapshots(snapshot_dir)
+        return snapshots[0] if snapshots else None
+
+    @staticmethod
+    def prune(snapshot_dir=None, keep=None):
+        """删除超出保留数量的旧快照"""
+        keep = AnalyticsSnapshot.KEEP_SNAPSHOTS if keep is None else keep
+        for path in AnalyticsSnapshot.list_snapshots(snapshot_dir)[keep:]:
+            shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def read_info(snapshot_path):
+        """读取快照描述信息（生成时间、格式、各表行数）"""
+        with open(os.path.join(snapshot_path, AnalyticsSnapshot.INFO_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def read_table(snapshot_path, table, columns=None):
+        """
+        读取快照中的一张表
+
+        Arrow IPC 文件通过内存映射零拷贝读取，只有实际访问到的列会被换入内存；
+        Parquet 文件使用内存映射读取并解压所需的列。
+
+        Args:
+            snapshot_path: 快照目录
+            table: 'cases'、'records' 或 'images'
+            columns: 可选，只读取指定列
+
+        Returns:
+            pyarrow.Table
+        """
+        if pa is None:
+            raise RuntimeError("未安装 pyarrow，无法读取分析快照")
+        file_format = AnalyticsSnapshot.read_info(snapshot_path)['format']
+        file_path = os.path.join(snapshot_path, table + AnalyticsSnapshot.FORMATS[file_format])
+        if file_format == 'parquet':
+            return pq.read_table(file_path, columns=columns, memory_map=True)
+        data = ipc.open_file(pa.memory_map(file_path, 'r')).read_all()
+        return data.select(columns) if columns else data
+
+    @staticmethod
+    def get_statistics(snapshot_path=None, start_date=None, end_date=None):
+        """
+        基于快照计算测试统计信息，结果格式与 Database.get_statistics 一致
+
+        Args:
+            snapshot_path: 快照目录，默认使用最新快照
+            start_date: 可选，开始日期（时间戳）
+            end_date: 可选，结束日期（时间戳）
+
+        Returns:
+            dict: 包含统计信息的字典；没有可用快照时返回 None
+        """
+        snapshot_path = snapshot_path or AnalyticsSnapshot.latest()
+        if pa is None or not snapshot_path:
+            return None
+
+        records = AnalyticsSnapshot.read_table(snapshot_path, 'records', ['status', 'timestamp'])
+        mask = None
+        if start_date:
+            mask = pc.greater_equal(records['timestamp'], start_date)
+        if end_date:
+            end_mask = pc.less_equal(records['timestamp'], end_date)
+            mask = end_mask if mask is None else pc.and_(mask, end_mask)
+        statuses = records['status'] if mask is None else records.filter(mask)['status']
+
+        stats = {'total': len(statuses), '通过': 0, '失败': 0, '阻塞': 0, '跳过': 0}
+        for item in pc.value_counts(statuses).to_pylist():
+            if item['values'] in stats:
+                stats[item['values']] = item['counts']
+        stats['通过率'] = (stats['通过'] / stats['total'] * 100) if stats['total'] > 0 else 0
+        return stats
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="生成测试数据的列式分析快照")
+    parser.add_argument('--db', default='data/qa_test_logger.db', help="数据库文件路径")
+    parser.add_argument('--format', choices=list(AnalyticsSnapshot.FORMATS), default='arrow', help="快照格式")
+    parser.add_argument('--dir', default=AnalyticsSnapshot.SNAPSHOT_DIR, help="快照根目录")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    try:
+        path = AnalyticsSnapshot.write(
+            db, args.format, args.dir,
+            progress_callback=lambda done, total: print(f"\r已写入 {done}/{total} 行", end='', flush=True)
+        )
+    finally:
+        db.close()
+    print(f"\n快照已生成: {path}")
+
+
+if __name__ == "__main__":
+    main()
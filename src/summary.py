@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出汇总：按案例集、优先级、执行人与执行日期统计各状态记录数与通过率，并给出按日的通过率趋势
+数据库一次分组查询得到最细粒度的计数，各维度的汇总由 pandas 在该结果上向量化聚合，
+Excel 报告写为附加工作表，PDF 报告写为统计表
+"""
+
+import pandas as pd
+
+
+class ReportSummary:
+    """导出报告的多维汇总"""
+
+    STATUSES = ['通过', '失败', '阻塞', '跳过']
+
+    # 汇总维度：(列名, 显示名称, 空值显示)
+    DIMENSIONS = [
+        ('collection', '案例集', '未分组'),
+        ('priority', '优先级', '未设置'),
+        ('executor', '执行人', '未填写'),
+    ]
+
+    # 按日趋势的滚动窗口（天）
+    TREND_WINDOW = 7
+
+    def __init__(self, counts):
+        """
+        Args:
+            counts: Database.get_export_summary_counts 的结果
+        """
+        self.counts = pd.DataFrame(
+            counts, columns=['collection', 'priority', 'executor', 'day', 'status', 'total']
+        )
+
+    @staticmethod
+    def from_db(db, filters=None):
+        """按导出筛选条件生成汇总"""
+        return ReportSummary(db.get_export_summary_counts(filters))
+
+    def _status_table(self, column):
+        """按指定列分组的各状态记录数、总数与通过率"""
+        table = self.counts.pivot_table(
+            index=column, columns='status', values='total', aggfunc='sum', fill_value=0
+        ).reindex(columns=self.STATUSES, fill_value=0)
+        table.columns.name = None
+        table.insert(0, '总数', table.sum(axis=1))
+        table['通过率'] = (table['通过'] / table['总数'] * 100).round(2)
+        return table
+
+    def overall(self):
+        """总体统计，格式与 ReportExporter.status_stats 一致"""
+        by_status = self.counts.groupby('status')['total'].sum()
+        stats = {'total': int(by_status.sum())}
+        for status in self.STATUSES:
+            stats[status] = int(by_status.get(status, 0))
+        stats['通过率'] = (stats['通过'] / stats['total'] * 100) if stats['total'] > 0 else 0
+        return stats
+
+    def by_dimension(self, column):
+        """
+        按维度汇总，按总数降序
+
+        Returns:
+            DataFrame: 列为 [维度名称, 总数, 通过, 失败, 阻塞, 跳过, 通过率]
+        """
+        _, label, empty_label = next(d for d in self.DIMENSIONS if d[0] == column)
+        table = self._status_table(column).sort_values('总数', ascending=False)
+        table.index = [value or empty_label for value in table.index]
+        return table.rename_axis(label).reset_index()
+
+    def daily_trend(self):
+        """
+        按执行日期汇总的通过率趋势，按日期升序
+
+        Returns:
+            DataFrame: 列为 [日期, 总数, 通过, 失败, 阻塞, 跳过, 通过率, 近7日通过率, 累计通过率]
+        """
+        table = self._status_table('day').sort_index()
+        # 按自然日滚动：窗口为截至当天的 TREND_WINDOW 天（含没有记录的日期），而不是最近 TREND_WINDOW 个有记录的日期
+        daily = table[['通过', '总数']].set_axis(pd.to_datetime(table.index))
+        rolling = daily.rolling(f'{self.TREND_WINDOW}D').sum()
+        table[f'近{self.TREND_WINDOW}日通过率'] = (rolling['通过'] / rolling['总数'] * 100).round(2).to_numpy()
+        table['累计通过率'] = (table['通过'].cumsum() / table['总数'].cumsum() * 100).round(2)
+        return table.rename_axis('日期').reset_index()
+
+    def tables(self):
+        """
+        全部汇总表
+
+        Returns:
+            list: [(标题, DataFrame)]，依次为各维度汇总与按日趋势
+        """
+        if self.counts.empty:
+            return []
+        tables = [(f"按{label}", self.by_dimension(column)) for column, label, _ in self.DIMENSIONS]
+        tables.append(("按日趋势", self.daily_trend()))
+        return tables
+
+    @staticmethod
+    def format_row(values):
+        """转换为写入报告的单元格值：通过率保留两位小数并带百分号，其余转为Python原生类型"""
+        row = []
+        for name, value in values.items():
+            if '通过率' in name:
+                row.append(f"{value:.2f}%")
+            elif hasattr(value, 'item'):
+                row.append(value.item())
+            else:
+                row.append(value)
+        return row
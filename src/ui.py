@@ -1,8 +1,9 @@
 from PyQt6.QtWidgets import QMainWindow, QTabWidget, QMenu, QWidget, QTabBar, QMessageBox
 from PyQt6.QtCore import Qt, QUrl, pyqtSignal
-from PyQt6.QtGui import QDesktopServices, QAction
+from PyQt6.QtGui import QDesktopServices, QAction, QActionGroup
 
 from database import Database
+from utils import ImageUtils, SettingsUtils
 from ui_cases import TestCasesTab
 from ui_history import HistoryTab
 from PyQt6.QtGui import QIcon
@@ -60,6 +61,9 @@ class CustomTabWidget(QTabWidget):
         ticket_action.triggered.connect(self.open_ticket_tools)
         self.tools_menu.addAction(ticket_action)
         
+        # 添加图片存储格式子菜单
+        self.setup_image_format_menu()
+        
         # 添加分隔线
         self.tools_menu.addSeparator()
         
@@ -68,6 +72,26 @@ class CustomTabWidget(QTabWidget):
         about_action.triggered.connect(self.show_about)
         self.tools_menu.addAction(about_action)
     
+    def setup_image_format_menu(self):
+        """设置图片存储格式子菜单（仅列出当前环境支持的格式）"""
+        format_menu = self.tools_menu.addMenu("图片存储格式")
+        format_labels = {
+            'jpeg': "JPEG",
+            'webp': "WebP（有损）",
+            'webp_lossless': "WebP（无损）",
+            'avif': "AVIF",
+        }
+        current = ImageUtils.get_storage_format()
+        group = QActionGroup(self)
+        group.setExclusive(True)
+        for name in ImageUtils.available_storage_formats():
+            action = QAction(format_labels.get(name, name), self)
+            action.setCheckable(True)
+            action.setChecked(name == current)
+            action.triggered.connect(lambda checked, n=name: SettingsUtils.set_image_format(n))
+            group.addAction(action)
+            format_menu.addAction(action)
+    
     def add_tools_tab(self):
         """添加工具标签页"""
         placeholder_widget = QWidget()
@@ -184,6 +208,8 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """窗口关闭事件"""
+        # 结束仍在运行的导出进程
+        self.history_tab.export_manager.shutdown()
         # 关闭数据库连接
         self.db.close()
         event.accept()
\ No newline at end of file
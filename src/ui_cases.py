@@ -6,11 +6,15 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QColor, QBrush
+import os
 import requests
 import json
 
 from ui_execution import TestCaseExecutionWidget
 from excel_parser import ExcelParser
+from bundle import EvidenceBundle
+from import_jobs import CaseImportWorker, BatchImportWorker
+from batch_import import BatchCaseImporter
 from PyQt6.QtWidgets import QInputDialog, QPushButton
 from utils import SettingsUtils
 
@@ -60,6 +64,7 @@ class TestCasesTab(QWidget):
         super().__init__(parent)
         self.db = db
         self.collection_imported = None  # 案例集导入回调函数
+        self._import_worker = None  # 进行中的用例导入
         self.initUI()
         # 默认进入时不加载任何用例，保持左侧空白
     
@@ -75,11 +80,23 @@ class TestCasesTab(QWidget):
         self.import_button.clicked.connect(self.import_excel)
         button_layout.addWidget(self.import_button)
         
+        # 批量导入按钮
+        self.batch_import_button = QPushButton("批量导入")
+        self.batch_import_button.setToolTip("选择多个Excel文件，每个工作表导入为一个案例集")
+        self.batch_import_button.clicked.connect(self.import_batch)
+        button_layout.addWidget(self.batch_import_button)
+        
         # 接口获取案例按钮
         self.api_import_button = QPushButton("接口获取案例")
         self.api_import_button.clicked.connect(self.import_from_api)
         button_layout.addWidget(self.api_import_button)
         
+        # 导入证据包按钮
+        self.bundle_import_button = QPushButton("导入证据包")
+        self.bundle_import_button.setToolTip("导入其他电脑导出的证据包（用例、记录与截图）")
+        self.bundle_import_button.clicked.connect(self.import_bundle)
+        button_layout.addWidget(self.bundle_import_button)
+        
         # 项目ID选择下拉框
         self.project_label = QLabel("选择项目ID:")
         button_layout.addWidget(self.project_label)
@@ -238,85 +255,280 @@ class TestCasesTab(QWidget):
         """导入Excel文件"""
         # 打开文件对话框
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "选择Excel文件", "", "Excel文件 (*.xlsx *.xls)"
+            self, "选择Excel文件", "", "Excel或CSV文件 (*.xlsx *.xls *.csv *.tsv *.txt)"
         )
         
         if not file_path:
             return
         
-        try:
-            # 解析Excel文件
-            cases_data = ExcelParser.parse_excel(file_path)
-
-            # 检查导入的案例情况
-            existing = self.db.get_all_test_cases()
-            existing_ids = set([row['case_id'] for row in existing])
-            new_case_ids = [c.get('用例ID', '') for c in cases_data if c.get('用例ID')]
-            existing_case_ids = [cid for cid in new_case_ids if cid in existing_ids]
-            new_only_case_ids = [cid for cid in new_case_ids if cid not in existing_ids]
-            
-            collection_name = None
-            
-            # 如果有已存在的案例，获取其案例集名称
-            if existing_case_ids:
-                existing_case = self.db.get_test_case(existing_case_ids[0])
-                if existing_case and existing_case.get('case_collection_name'):
-                    collection_name = existing_case['case_collection_name']
-            
-            # 如果没有已存在的案例集名称，且有新案例，才询问用户
-            if not collection_name and new_only_case_ids:
+        if self._import_worker is not None:
+            QMessageBox.warning(self, "提示", "已有导入正在进行，请稍后再试")
+            return
+        
+        def make_batches():
+            return ExcelParser.iter_excel_batches(
+                file_path, progress_callback=lambda done, total: self._import_worker.report_progress(done, total)
+            )
+        
+        # 表头检查、已存在案例的集名称与新增用例都在工作线程的比对中得到，界面线程不读取文件；
+        # 总行数由解析器按工作表尺寸报告
+        self._start_case_import(make_batches, None, None, 'excel', ask_collection_name=True)
+    
+    def _check_import_case_ids(self, case_ids):
+        """
+        检查待导入的用例ID
+        
+        Returns:
+            tuple: (已存在用例的案例集名称或None, 数据库中不存在的用例ID列表)
+        """
+        # 一次查询得到已存在的用例及其案例集名称，不再读取整张用例表
+        existing = self.db.get_existing_case_collections(case_ids)
+        existing_case_ids = [cid for cid in case_ids if cid in existing]
+        new_only_case_ids = [cid for cid in case_ids if cid not in existing]
+        
+        # 如果有已存在的案例，获取其案例集名称
+        collection_name = existing[existing_case_ids[0]] if existing_case_ids else None
+        return collection_name or None, new_only_case_ids
+    
+    def _start_case_import(self, make_batches, collection_name, total, source, ask_collection_name=False):
+        """
+        在工作线程中比对并导入用例：先比对内容摘要并预览新增/修改/未变化的用例，确认后只写入有变化的用例
+        
+        Args:
+            make_batches: 每次调用返回一个新的可迭代对象，每个元素是一批测试用例数据
+            collection_name: 案例集名称；为 None 时使用比对时找到的已存在案例的集名称
+            total: 总行数；为 None 时由批次来源报告进度
+            source: 'excel' 或 'api'，用于结果提示
+            ask_collection_name: 为 True 时，没有已存在案例的集名称且有新增用例时询问用户
+        """
+        def on_planned(plan):
+            name = plan['collection_name']
+            if ask_collection_name and not name and plan['added']:
                 text, ok = QInputDialog.getText(self, "案例集名称", "请输入本次导入的案例集名称：")
                 if not ok:
                     return
-                collection_name = text.strip() or None
+                name = text.strip() or None
                 # 记录最近一次导入的集合名
-                SettingsUtils.set_last_collection_name(collection_name)
-            
-            # 为所有案例设置案例集名称
-            if collection_name:
-                for c in cases_data:
-                    c['案例集名称'] = collection_name
-            
-            # 导入数据库（传入collection_name以防Excel未写入对应列）
-            success_count, total_count = self.db.import_test_cases(cases_data, collection_name)
-            
-            # 仅将本次导入的用例追加到当前表格（不全量刷新）
-            imported_ids = [c.get('用例ID') for c in cases_data if c.get('用例ID')]
-            new_cases = []
-            for cid in imported_ids:
-                case = self.db.get_test_case(cid)
-                if case:
-                    new_cases.append(case)
-            self.add_cases_to_table(new_cases)
-            
-            # 如果导入了新的案例集，通知主窗口刷新历史记录界面的下拉框
-            if collection_name and self.collection_imported:
-                self.collection_imported()
-            
-            # 刷新项目ID和案例集下拉框
-            self.refresh_project_combo()
-            
-            # 自动切换到对应的项目ID和案例集
-            if collection_name and new_case_ids:
-                # 获取项目ID（取第一个案例ID的前12位）
-                project_id = new_case_ids[0][:12] if new_case_ids[0] else ''
-                if project_id:
-                    # 先切换项目ID
-                    project_index = self.project_combo.findText(project_id)
-                    if project_index >= 0:
-                        self.project_combo.setCurrentIndex(project_index)
-                    
-                    # 再刷新和切换案例集
-                    self.refresh_collection_combo(project_id)
-                    collection_index = self.collection_combo.findText(collection_name)
-                    if collection_index >= 0:
-                        self.collection_combo.setCurrentIndex(collection_index)
-            
+                SettingsUtils.set_last_collection_name(name)
+                if name and (plan['updated'] or plan['unchanged']):
+                    # 已存在的用例也会归入输入的案例集，按该名称重新比对
+                    self._start_case_import(make_batches, name, total, source)
+                    return
+            if plan['added'] or plan['updated']:
+                if not self._confirm_case_import(plan):
+                    return
+            # 没有变化时直接导入（不写入任何用例），仍将用例显示到表格
+            self._run_case_worker('import', make_batches(), name, total, source)
+        
+        self._run_case_worker('plan', make_batches(), collection_name, total, source, on_planned)
+    
+    def _confirm_case_import(self, plan):
+        """显示导入预览，返回是否继续导入"""
+        lines = [f"新增 {plan['added']} 条，修改 {plan['updated']} 条，未变化 {plan['unchanged']} 条"]
+        for kind, label in (('updated', '修改'), ('added', '新增')):
+            if plan[f'{kind}_ids']:
+                more = '…' if plan[kind] > len(plan[f'{kind}_ids']) else ''
+                lines.append(f"\n{label}的用例：{', '.join(plan[f'{kind}_ids'])}{more}")
+        lines.append("\n是否导入？未变化的用例不会改写。")
+        reply = QMessageBox.question(
+            self, "导入预览", '\n'.join(lines),
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        return reply == QMessageBox.StandardButton.Yes
+    
+    def _run_case_worker(self, mode, batches, collection_name, total, source, on_planned=None):
+        """启动比对（plan）或导入（import）工作线程，显示进度对话框，取消时回滚整个导入"""
+        action = "比对" if mode == 'plan' else "导入"
+        progress = QProgressDialog(f"正在{action}测试用例...", "取消", 0, total or 0, self)
+        progress.setWindowTitle("请稍候")
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.setMinimumDuration(0)
+        progress.setMinimumWidth(300)
+        
+        worker = CaseImportWorker(self.db.db_path, self)
+        self._import_worker = worker
+        
+        def on_progress(done, row_total):
+            # 总行数未知时显示忙碌状态
+            if row_total:
+                progress.setMaximum(row_total)
+                progress.setValue(min(done, row_total))
+                progress.setLabelText(f"正在{action}测试用例... {done}/{row_total} 行")
+            else:
+                progress.setLabelText(f"正在{action}测试用例... 已处理 {done} 行")
+        
+        def on_cancel():
+            progress.setLabelText(f"正在取消{action}...")
+            worker.cancel()
+        
+        def on_finished():
+            progress.close()
+            # 比对完成后可能已开始导入，只清除本线程
+            if self._import_worker is worker:
+                self._import_worker = None
+            worker.deleteLater()
+        
+        worker.progress.connect(on_progress)
+        if on_planned:
+            worker.planned.connect(on_planned)
+        worker.succeeded.connect(lambda result: self._on_case_import_succeeded(result, source))
+        worker.failed.connect(lambda message: QMessageBox.critical(
+            self, "错误", f"{'导入Excel' if source == 'excel' else '从接口获取案例'}失败: {message}"
+        ))
+        worker.cancelled.connect(lambda: QMessageBox.information(
+            self, "已取消", "导入已取消，数据库未做任何修改"
+        ))
+        worker.finished.connect(on_finished)
+        progress.canceled.connect(on_cancel)
+        
+        progress.show()
+        if mode == 'plan':
+            worker.run_plan(batches, collection_name, total)
+        else:
+            worker.run_import(batches, collection_name, total)
+    
+    def _on_case_import_succeeded(self, result, source):
+        """导入完成后更新表格与下拉框"""
+        collection_name = result['collection_name']
+        case_ids = result['case_ids']
+        success_count, total_count = result['success_count'], result['total_count']
+        
+        # 仅将本次导入的用例追加到当前表格（不全量刷新）
+        self.add_cases_to_table(result['cases'])
+        
+        # 如果导入了新的案例集，通知主窗口刷新历史记录界面的下拉框
+        if collection_name and self.collection_imported:
+            self.collection_imported()
+        
+        # 刷新项目ID和案例集下拉框
+        self.refresh_project_combo()
+        
+        # 自动切换到对应的项目ID和案例集
+        if collection_name and case_ids:
+            # 获取项目ID（取第一个案例ID的前12位）
+            project_id = case_ids[0][:12] if case_ids[0] else ''
+            if project_id:
+                # 先切换项目ID
+                project_index = self.project_combo.findText(project_id)
+                if project_index >= 0:
+                    self.project_combo.setCurrentIndex(project_index)
+                
+                # 再刷新和切换案例集
+                self.refresh_collection_combo(project_id)
+                collection_index = self.collection_combo.findText(collection_name)
+                if collection_index >= 0:
+                    self.collection_combo.setCurrentIndex(collection_index)
+        
+        detail = f"新增 {result['added']}，修改 {result['updated']}，未变化 {result['unchanged']}"
+        if source == 'api':
+            # 显示结果
+            QMessageBox.information(
+                self, "成功", 
+                f"从接口获取成功！\n\n已导入 {success_count}/{total_count} 条测试用例（{detail}）"
+            )
+            print(f"从接口导入成功：已导入 {success_count}/{total_count} 条测试用例（{detail}）")
+        else:
             # 打印结果
-            print(f"导入成功：已导入 {success_count}/{total_count} 条测试用例")
-            
-        except Exception as e:
-            QMessageBox.critical(self, "错误", f"导入Excel失败: {str(e)}")
+            print(f"导入成功：已导入 {success_count}/{total_count} 条测试用例（{detail}）")
+    
+    def import_batch(self):
+        """批量导入多个工作簿，每个工作表导入为一个案例集"""
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "选择Excel文件（可多选）", "", "Excel或CSV文件 (*.xlsx *.xls *.csv *.tsv *.txt)"
+        )
+        
+        if not file_paths:
+            return
+        
+        if self._import_worker is not None:
+            QMessageBox.warning(self, "提示", "已有导入正在进行，请稍后再试")
+            return
+        
+        # 列出各工作表及其案例集名称，确认后再导入
+        sheets = BatchCaseImporter(self.db.db_path, file_paths).plan_sheets()
+        lines = []
+        for sheet in sheets:
+            name = f"{os.path.basename(sheet['file_path'])} / {sheet['sheet_name'] or '-'}"
+            if sheet['error']:
+                lines.append(f"{name}：{sheet['error']}")
+            else:
+                rows = f"{sheet['rows']} 行" if sheet['rows'] is not None else "行数未知"
+                lines.append(f"{name} → {sheet['collection_name']}（{rows}）")
+        if all(sheet['error'] for sheet in sheets):
+            QMessageBox.critical(self, "错误", "没有可导入的工作表：\n\n" + '\n'.join(lines))
+            return
+        box = QMessageBox(QMessageBox.Icon.Question, "批量导入",
+                          f"共 {len(sheets)} 个工作表，每个工作表导入为一个案例集，是否开始导入？",
+                          QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, self)
+        box.setDetailedText('\n'.join(lines))
+        if box.exec() != QMessageBox.StandardButton.Yes:
+            return
+        
+        rows = [sheet['rows'] for sheet in sheets if not sheet['error']]
+        total = 0 if None in rows else sum(rows)
+        progress = QProgressDialog("正在批量导入测试用例...", "取消", 0, total, self)
+        progress.setWindowTitle("请稍候")
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.setMinimumDuration(0)
+        progress.setMinimumWidth(300)
+        
+        worker = BatchImportWorker(self.db.db_path, sheets, self)
+        self._import_worker = worker
+        
+        def on_progress(done, row_total):
+            # 总行数未知时显示忙碌状态
+            if row_total:
+                progress.setValue(min(done, row_total))
+                progress.setLabelText(f"正在批量导入测试用例... 已解析 {done}/{row_total} 行")
+            else:
+                progress.setLabelText(f"正在批量导入测试用例... 已解析 {done} 行")
+        
+        def on_cancel():
+            progress.setLabelText("正在取消导入...")
+            worker.cancel()
+        
+        def on_finished():
+            progress.close()
+            self._import_worker = None
+            worker.deleteLater()
+        
+        worker.progress.connect(on_progress)
+        worker.succeeded.connect(self._on_batch_import_succeeded)
+        worker.failed.connect(lambda message: QMessageBox.critical(self, "错误", f"批量导入失败: {message}"))
+        worker.cancelled.connect(lambda: QMessageBox.information(
+            self, "已取消", "导入已取消，数据库未做任何修改"
+        ))
+        worker.finished.connect(on_finished)
+        progress.canceled.connect(on_cancel)
+        
+        progress.show()
+        worker.start()
+    
+    def _on_batch_import_succeeded(self, report):
+        """批量导入完成：刷新下拉框并显示每个工作表的导入结果"""
+        if self.collection_imported:
+            self.collection_imported()
+        self.refresh_project_combo()
+        
+        lines = []
+        for sheet in report:
+            name = f"{os.path.basename(sheet['file_path'])} / {sheet['sheet_name'] or '-'}"
+            if sheet['error']:
+                lines.append(f"{name}：失败，{sheet['error']}")
+            else:
+                lines.append(f"{name} → {sheet['collection_name']}：新增 {sheet['added']}，"
+                             f"修改 {sheet['updated']}，未变化 {sheet['unchanged']}")
+        failed = sum(1 for sheet in report if sheet['error'])
+        box = QMessageBox(QMessageBox.Icon.Warning if failed else QMessageBox.Icon.Information, "批量导入完成",
+                          f"成功 {len(report) - failed} 个工作表，失败 {failed} 个工作表", 
+                          QMessageBox.StandardButton.Ok, self)
+        box.setDetailedText('\n'.join(lines))
+        box.exec()
+        print("批量导入完成：\n" + '\n'.join(lines))
     
     def on_case_selected(self, item):
         """处理用例选择事件"""
@@ -587,8 +799,63 @@ class TestCasesTab(QWidget):
             except Exception as e:
                 QMessageBox.critical(self, "错误", f"删除测试集失败: {str(e)}")
     
+    def import_bundle(self):
+        """导入证据包"""
+        # 打开文件对话框
+        file_path, _ = QFileDialog.getOpenFileName(
+            self, "选择证据包", "", "证据包 (*.zip)"
+        )
+        
+        if not file_path:
+            return
+        
+        # 选择用例ID冲突的处理方式
+        policies = list(EvidenceBundle.CONFLICT_POLICIES.items())
+        label, ok = QInputDialog.getItem(
+            self, "用例ID冲突", "包内用例ID与本地用例重复时：",
+            [name for _, name in policies], 0, False
+        )
+        if not ok:
+            return
+        conflict_policy = next(key for key, name in policies if name == label)
+        
+        # 显示导入进度
+        progress = QProgressDialog("正在导入证据包...", None, 0, 100, self)
+        progress.setWindowTitle("请稍候")
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(0)
+        progress.setMinimumWidth(300)
+        progress.show()
+        
+        try:
+            result = EvidenceBundle.import_bundle(
+                self.db, file_path, conflict_policy, progress_callback=progress.setValue
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "错误", f"导入证据包失败: {str(e)}")
+            return
+        finally:
+            progress.close()
+        
+        # 通知主窗口刷新历史记录界面的下拉框，并刷新项目ID和案例集下拉框
+        if self.collection_imported:
+            self.collection_imported()
+        self.refresh_project_combo()
+        
+        QMessageBox.information(
+            self, "导入完成",
+            f"用例：新增 {result['cases_added']}，覆盖 {result['cases_updated']}，"
+            f"保留本地 {result['cases_skipped']}，改名导入 {result['cases_renamed']}\n"
+            f"记录：新增 {result['records_added']}，跳过重复 {result['records_skipped']}\n"
+            f"图片：新增 {result['images_added']}，复用 {result['images_reused']}"
+        )
+    
     def import_from_api(self):
         """从接口获取案例"""
+        if self._import_worker is not None:
+            QMessageBox.warning(self, "提示", "已有导入正在进行，请稍后再试")
+            return
+        
         # 显示参数输入对话框
         dialog = ApiImportDialog(self)
         if dialog.exec() != QDialog.DialogCode.Accepted:
@@ -653,19 +920,8 @@ class TestCasesTab(QWidget):
                 converted_cases.append(converted_case)
             
             # 检查导入的案例情况
-            existing = self.db.get_all_test_cases()
-            existing_ids = set([row['case_id'] for row in existing])
             new_case_ids = [c.get('用例ID', '') for c in converted_cases if c.get('用例ID')]
-            existing_case_ids = [cid for cid in new_case_ids if cid in existing_ids]
-            new_only_case_ids = [cid for cid in new_case_ids if cid not in existing_ids]
-            
-            collection_name = None
-            
-            # 如果有已存在的案例，获取其案例集名称
-            if existing_case_ids:
-                existing_case = self.db.get_test_case(existing_case_ids[0])
-                if existing_case and existing_case.get('case_collection_name'):
-                    collection_name = existing_case['case_collection_name']
+            collection_name, new_only_case_ids = self._check_import_case_ids(new_case_ids)
             
             # 如果没有已存在的案例集名称，且有新案例，才询问用户
             if not collection_name and new_only_case_ids:
@@ -685,53 +941,11 @@ class TestCasesTab(QWidget):
                 # 记录最近一次导入的集合名
                 SettingsUtils.set_last_collection_name(collection_name)
             
-            # 为所有案例设置案例集名称
-            if collection_name:
-                for c in converted_cases:
-                    c['案例集名称'] = collection_name
-            
-            # 导入数据库
-            success_count, total_count = self.db.import_test_cases(converted_cases, collection_name)
-            
-            # 将本次导入的用例追加到当前表格
-            imported_ids = [c.get('用例ID') for c in converted_cases if c.get('用例ID')]
-            new_cases = []
-            for cid in imported_ids:
-                case = self.db.get_test_case(cid)
-                if case:
-                    new_cases.append(case)
-            self.add_cases_to_table(new_cases)
-            
-            # 如果导入了新的案例集，通知主窗口刷新历史记录界面的下拉框
-            if collection_name and self.collection_imported:
-                self.collection_imported()
-            
-            # 刷新项目ID和案例集下拉框
-            self.refresh_project_combo()
-            
-            # 自动切换到对应的项目ID和案例集
-            if collection_name and new_case_ids:
-                # 获取项目ID（取第一个案例ID的前12位）
-                project_id = new_case_ids[0][:12] if new_case_ids[0] else ''
-                if project_id:
-                    # 先切换项目ID
-                    project_index = self.project_combo.findText(project_id)
-                    if project_index >= 0:
-                        self.project_combo.setCurrentIndex(project_index)
-                    
-                    # 再刷新和切换案例集
-                    self.refresh_collection_combo(project_id)
-                    collection_index = self.collection_combo.findText(collection_name)
-                    if collection_index >= 0:
-                        self.collection_combo.setCurrentIndex(collection_index)
-            
-            # 显示结果
-            QMessageBox.information(
-                self, "成功", 
-                f"从接口获取成功！\n\n已导入 {success_count}/{total_count} 条测试用例"
-            )
-            
-            print(f"从接口导入成功：已导入 {success_count}/{total_count} 条测试用例")
+            # 后台导入数据库
+            progress.close()
+            batch_size = ExcelParser.BATCH_SIZE
+            batches = [converted_cases[i:i + batch_size] for i in range(0, len(converted_cases), batch_size)]
+            self._start_case_import(lambda: batches, collection_name, len(converted_cases), 'api')
             
         except requests.exceptions.RequestException as e:
             QMessageBox.critical(self, "网络错误", f"请求失败: {str(e)}")
@@ -1,14 +1,294 @@
 import os
+import math
+import threading
+from collections import OrderedDict
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, 
-    QListWidget, QListWidgetItem, QFrame, QDialog, QScrollArea
+    QListWidget, QListWidgetItem, QFrame, QDialog,
+    QGraphicsView, QGraphicsScene, QGraphicsItem
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QSize, QTimer
-from PyQt6.QtGui import QPixmap, QIcon
+from PyQt6.QtCore import Qt, pyqtSignal, QSize, QTimer, QRectF, QThread
+from PyQt6.QtGui import QPixmap, QIcon, QImage, QImageReader, QPainter
 
 from utils import ImageUtils
 
 
+_QT_IMAGE_FORMATS = None  # Qt支持读取的格式，首次使用时查询
+
+
+def _qt_image_formats():
+    """Qt图片插件支持读取的格式名称"""
+    global _QT_IMAGE_FORMATS
+    if _QT_IMAGE_FORMATS is None:
+        formats = {bytes(name).decode().lower() for name in QImageReader.supportedImageFormats()}
+        if 'jpg' in formats:
+            formats.add('jpeg')
+        _QT_IMAGE_FORMATS = formats
+    return _QT_IMAGE_FORMATS
+
+
+def load_qimage(image_path):
+    """
+    读取图片为QImage：用 ImageUtils.detect_format 按文件头识别格式（不依赖扩展名），
+    Qt支持的格式直接按该格式解码，Qt不支持的格式（如AVIF）交给Pillow解码
+    """
+    image_format = ImageUtils.detect_format(image_path)
+    if image_format is None or image_format in _qt_image_formats():
+        reader = QImageReader(image_path)
+        if image_format is not None:
+            reader.setFormat(image_format.encode())
+        else:
+            reader.setDecideFormatFromContent(True)
+        reader.setAutoTransform(True)
+        image = reader.read()
+        if not image.isNull():
+            return image
+    
+    try:
+        from PIL import Image as PILImage
+        with PILImage.open(image_path) as pil_image:
+            pil_image = pil_image.convert('RGBA')
+            data = pil_image.tobytes('raw', 'RGBA')
+            image = QImage(data, pil_image.width, pil_image.height,
+                           pil_image.width * 4, QImage.Format.Format_RGBA8888)
+            # 复制一份，脱离临时字节缓冲区
+            return image.copy()
+    except Exception as e:
+        print(f"读取图片失败: {e}")
+        return QImage()
+
+
+def load_pixmap(image_path):
+    """读取图片为QPixmap，格式识别规则同 load_qimage"""
+    return QPixmap.fromImage(load_qimage(image_path))
+
+
+class ImageTilePyramid:
+    """
+    多分辨率瓦片金字塔：逐级缩小一半，每级切成瓦片保存
+
+    切片完成后不再保留整张图片，内存占用约为解码后原图的 4/3。
+    只使用 QImage，可在工作线程中构建。
+    """
+    
+    TILE_SIZE = 256
+    
+    def __init__(self, image_path):
+        image = load_qimage(image_path)
+        if image.isNull():
+            raise ValueError(f"无法读取图片: {image_path}")
+        
+        # 统一像素格式，绘制时不再逐次转换
+        image = image.convertToFormat(QImage.Format.Format_ARGB32_Premultiplied)
+        self.width = image.width()
+        self.height = image.height()
+        
+        # 第0级为原图，之后每级宽高减半，直到能放进单个瓦片
+        self.level_sizes = []
+        self._tiles = []  # 每级一个字典：(col, row) -> QImage
+        self.nbytes = 0
+        while True:
+            self.level_sizes.append((image.width(), image.height()))
+            self._tiles.append(self._slice(image))
+            if max(image.width(), image.height()) <= self.TILE_SIZE:
+                break
+            # 先缩小再替换，上一级整图随即释放
+            image = image.scaled(
+                max(1, image.width() // 2), max(1, image.height() // 2),
+                Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            )
+    
+    def _slice(self, image):
+        """把一级图片切成瓦片"""
+        tiles = {}
+        tile = self.TILE_SIZE
+        for row in range(math.ceil(image.height() / tile)):
+            for col in range(math.ceil(image.width() / tile)):
+                x = col * tile
+                y = row * tile
+                piece = image.copy(x, y, min(tile, image.width() - x), min(tile, image.height() - y))
+                self.nbytes += piece.sizeInBytes()
+                tiles[(col, row)] = piece
+        return tiles
+    
+    def level_for_scale(self, scale):
+        """根据当前缩放比例选择分辨率刚好够用的层级"""
+        if scale <= 0:
+            return len(self.level_sizes) - 1
+        level = int(math.floor(math.log2(1.0 / scale))) if scale < 1 else 0
+        return max(0, min(level, len(self.level_sizes) - 1))
+    
+    def level_scale(self, level):
+        """返回层级图片相对原图的缩放比例 (sx, sy)"""
+        width, height = self.level_sizes[level]
+        return width / self.width, height / self.height
+    
+    def tile_range(self, level):
+        """返回层级的瓦片列数和行数"""
+        width, height = self.level_sizes[level]
+        return math.ceil(width / self.TILE_SIZE), math.ceil(height / self.TILE_SIZE)
+    
+    def tile(self, level, col, row):
+        """获取指定瓦片"""
+        return self._tiles[level][(col, row)]
+
+
+_pyramid_cache = OrderedDict()  # (路径, 修改时间) -> ImageTilePyramid，LRU顺序
+_pyramid_cache_lock = threading.Lock()
+_PYRAMID_CACHE_BYTES = 128 * 1024 * 1024  # 按瓦片字节数限制，最近使用的一个总是保留
+
+
+def get_image_pyramid(image_path):
+    """获取图片的瓦片金字塔，同一图片重复打开时复用缓存（可在工作线程中调用）"""
+    key = (os.path.abspath(image_path), os.path.getmtime(image_path))
+    with _pyramid_cache_lock:
+        pyramid = _pyramid_cache.get(key)
+        if pyramid is not None:
+            _pyramid_cache.move_to_end(key)
+            return pyramid
+    
+    pyramid = ImageTilePyramid(image_path)
+    with _pyramid_cache_lock:
+        _pyramid_cache[key] = pyramid
+        total = sum(cached.nbytes for cached in _pyramid_cache.values())
+        while total > _PYRAMID_CACHE_BYTES and len(_pyramid_cache) > 1:
+            _, evicted = _pyramid_cache.popitem(last=False)
+            total -= evicted.nbytes
+    return pyramid
+
+
+class ImagePyramidLoader(QThread):
+    """在后台线程中解码图片并构建瓦片金字塔，避免大图阻塞界面"""
+    
+    loaded = pyqtSignal(object)  # ImageTilePyramid
+    failed = pyqtSignal(str)     # 失败原因
+    
+    def __init__(self, image_path, parent=None):
+        super().__init__(parent)
+        self.image_path = image_path
+    
+    def run(self):
+        try:
+            self.loaded.emit(get_image_pyramid(self.image_path))
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+# 运行中的加载线程，对话框提前关闭时线程仍需保持引用直到结束
+_pyramid_loaders = set()
+
+
+class TiledImageItem(QGraphicsItem):
+    """只绘制可见区域瓦片的图片图元"""
+    
+    def __init__(self, pyramid, parent=None):
+        super().__init__(parent)
+        self.pyramid = pyramid
+        # 需要 exposedRect 才能只绘制可见瓦片
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption, True)
+    
+    def boundingRect(self):
+        return QRectF(0, 0, self.pyramid.width, self.pyramid.height)
+    
+    def paint(self, painter, option, widget=None):
+        pyramid = self.pyramid
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        level = pyramid.level_for_scale(lod)
+        sx, sy = pyramid.level_scale(level)
+        cols, rows = pyramid.tile_range(level)
+        tile = pyramid.TILE_SIZE
+        
+        # 将可见区域换算为该层级的瓦片索引范围
+        exposed = option.exposedRect.intersected(self.boundingRect())
+        col_start = max(0, int(exposed.left() * sx) // tile)
+        col_end = min(cols - 1, int(exposed.right() * sx) // tile)
+        row_start = max(0, int(exposed.top() * sy) // tile)
+        row_end = min(rows - 1, int(exposed.bottom() * sy) // tile)
+        
+        for row in range(row_start, row_end + 1):
+            for col in range(col_start, col_end + 1):
+                image = pyramid.tile(level, col, row)
+                target = QRectF(
+                    col * tile / sx, row * tile / sy,
+                    image.width() / sx, image.height() / sy
+                )
+                painter.drawImage(target, image, QRectF(image.rect()))
+
+
+class TiledImageView(QGraphicsView):
+    """支持滚轮缩放、拖拽平移的瓦片图片视图"""
+    
+    ZOOM_STEP = 1.25
+    MAX_ZOOM = 8.0
+    
+    def __init__(self, pyramid, parent=None):
+        super().__init__(parent)
+        self.pyramid = pyramid
+        self.setScene(QGraphicsScene(self))
+        self.image_item = TiledImageItem(pyramid)
+        self.scene().addItem(self.image_item)
+        self.scene().setSceneRect(self.image_item.boundingRect())
+        
+        self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorViewCenter)
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.SmartViewportUpdate)
+        self.setOptimizationFlag(QGraphicsView.OptimizationFlag.DontSavePainterState, True)
+        self._fitted = True
+    
+    def current_zoom(self):
+        """当前缩放比例（1.0为原始大小）"""
+        return self.transform().m11()
+    
+    def min_zoom(self):
+        """适应窗口时的缩放比例，不再继续缩小"""
+        viewport = self.viewport().rect()
+        if self.pyramid.width <= 0 or self.pyramid.height <= 0:
+            return 1.0
+        return min(1.0, viewport.width() / self.pyramid.width, viewport.height() / self.pyramid.height)
+    
+    def set_zoom(self, zoom):
+        """设置缩放比例"""
+        zoom = max(self.min_zoom(), min(zoom, self.MAX_ZOOM))
+        factor = zoom / self.current_zoom()
+        if abs(factor - 1.0) > 1e-6:
+            self.scale(factor, factor)
+        self._fitted = False
+    
+    def zoom_in(self):
+        self.set_zoom(self.current_zoom() * self.ZOOM_STEP)
+    
+    def zoom_out(self):
+        self.set_zoom(self.current_zoom() / self.ZOOM_STEP)
+    
+    def fit_to_window(self):
+        """缩放至完整显示图片（不放大小图）"""
+        self.resetTransform()
+        zoom = self.min_zoom()
+        self.scale(zoom, zoom)
+        self._fitted = True
+    
+    def actual_size(self):
+        """按原始大小显示"""
+        self.resetTransform()
+        self._fitted = False
+    
+    def wheelEvent(self, event):
+        """滚轮缩放"""
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.set_zoom(self.current_zoom() * (self.ZOOM_STEP ** steps))
+        event.accept()
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        # 处于适应窗口状态时随窗口大小调整
+        if self._fitted:
+            self.fit_to_window()
+
+
 class ImageViewerDialog(QDialog):
     """图片查看器对话框"""
     
@@ -22,32 +302,74 @@ class ImageViewerDialog(QDialog):
     
     def initUI(self):
         """初始化UI"""
-        layout = QVBoxLayout(self)
-        
-        # 创建滚动区域
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
-        scroll_area.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.layout = QVBoxLayout(self)
         
-        # 图片标签
-        self.image_label = QLabel()
+        # 大图在后台线程中构建瓦片金字塔，完成前显示提示
+        self.image_view = None
+        self.loader = None
+        self.image_label = QLabel("图片不存在")
         self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        
-        # 加载图片
+        self.layout.addWidget(self.image_label)
         if self.image_path and os.path.exists(self.image_path):
-            pixmap = QPixmap(self.image_path)
-            self.image_label.setPixmap(pixmap)
-            self.image_label.resize(pixmap.size())
-        else:
-            self.image_label.setText("图片不存在")
-        
-        scroll_area.setWidget(self.image_label)
-        layout.addWidget(scroll_area)
+            self.image_label.setText("正在加载图片…")
+            self.loader = ImagePyramidLoader(self.image_path)
+            self.loader.loaded.connect(self.on_pyramid_loaded)
+            self.loader.failed.connect(self.on_pyramid_failed)
+            self.loader.finished.connect(self._on_loader_finished)
+            _pyramid_loaders.add(self.loader)
+            self.loader.start()
         
         # 关闭按钮
         close_button = QPushButton("关闭")
         close_button.clicked.connect(self.accept)
-        layout.addWidget(close_button)
+        self.layout.addWidget(close_button)
+    
+    def on_pyramid_loaded(self, pyramid):
+        """金字塔构建完成：显示瓦片视图与缩放按钮"""
+        self.image_view = TiledImageView(pyramid)
+        self.image_label.hide()
+        self.layout.insertWidget(0, self.image_view)
+        
+        # 缩放按钮
+        zoom_layout = QHBoxLayout()
+        zoom_in_button = QPushButton("放大")
+        zoom_in_button.clicked.connect(self.image_view.zoom_in)
+        zoom_layout.addWidget(zoom_in_button)
+        zoom_out_button = QPushButton("缩小")
+        zoom_out_button.clicked.connect(self.image_view.zoom_out)
+        zoom_layout.addWidget(zoom_out_button)
+        fit_button = QPushButton("适应窗口")
+        fit_button.clicked.connect(self.image_view.fit_to_window)
+        zoom_layout.addWidget(fit_button)
+        actual_button = QPushButton("原始大小")
+        actual_button.clicked.connect(self.image_view.actual_size)
+        zoom_layout.addWidget(actual_button)
+        zoom_layout.addStretch()
+        zoom_layout.addWidget(QLabel(f"{pyramid.width} × {pyramid.height}"))
+        self.layout.insertLayout(1, zoom_layout)
+    
+    def on_pyramid_failed(self, error):
+        print(f"加载图片失败: {error}")
+        self.image_label.setText("图片加载失败")
+    
+    def _on_loader_finished(self):
+        loader = self.sender()
+        _pyramid_loaders.discard(loader)
+        loader.deleteLater()
+        if loader is self.loader:
+            self.loader = None
+    
+    def done(self, result):
+        # 对话框关闭时加载可能尚未完成，断开信号，线程结束后自行释放
+        loader = self.loader
+        if loader is not None:
+            loader.loaded.disconnect(self.on_pyramid_loaded)
+            loader.failed.disconnect(self.on_pyramid_failed)
+            loader.finished.disconnect(self._on_loader_finished)
+            loader.finished.connect(lambda: _pyramid_loaders.discard(loader))
+            loader.finished.connect(loader.deleteLater)
+            self.loader = None
+        super().done(result)
 
 
 class NotificationWidget(QFrame):
@@ -225,7 +547,7 @@ class ImageListWidget(QWidget):
         item.setData(Qt.ItemDataRole.UserRole, image_path)
         
         # 加载缩略图
-        pixmap = QPixmap(image_path)
+        pixmap = load_pixmap(image_path)
         pixmap = pixmap.scaled(
             100, 100,
             Qt.AspectRatioMode.KeepAspectRatio,
@@ -262,7 +584,7 @@ class ImageListWidget(QWidget):
         
         if image_path and os.path.exists(image_path):
             # 加载图片
-            pixmap = QPixmap(image_path)
+            pixmap = load_pixmap(image_path)
             
             # 缩放图片以适应标签大小
             pixmap = pixmap.scaled(
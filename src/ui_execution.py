@@ -7,7 +7,7 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import pyqtSignal, QTimer, Qt
 
 from ui_components import ImageListWidget
-from utils import ImageUtils
+from utils import ImageUtils, SettingsUtils
 
 class TestCaseExecutionWidget(QWidget):
     """测试用例执行组件"""
@@ -217,6 +217,10 @@ class TestCaseExecutionWidget(QWidget):
             QMessageBox.warning(self, "警告", "剪贴板中没有图片")
             return
         
+        # 检查近似重复
+        if not self.register_image(image_path):
+            return
+        
         # 添加到图片列表
         self.image_list.addImage(image_path)
         
@@ -231,19 +235,60 @@ class TestCaseExecutionWidget(QWidget):
         
         # 打开文件对话框
         file_paths, _ = QFileDialog.getOpenFileNames(
-            self, "选择图片", "", "图片文件 (*.png *.jpg *.jpeg *.bmp)"
+            self, "选择图片", "", "图片文件 (*.png *.jpg *.jpeg *.bmp *.webp *.avif)"
         )
         
         if not file_paths:
             return
         
-        # 保存图片
+        # 保存图片（近似重复被跳过的不计入）
+        added = 0
         for file_path in file_paths:
             image_path = ImageUtils.save_image_from_file(self.current_case['case_id'], file_path)
-            self.image_list.addImage(image_path)
+            if self.register_image(image_path):
+                self.image_list.addImage(image_path)
+                added += 1
         
         # 打印成功消息
-        print(f"已成功添加 {len(file_paths)} 张图片到测试记录")
+        print(f"已成功添加 {added} 张图片到测试记录")
+    
+    def register_image(self, image_path):
+        """
+        记录新图片的感知哈希，并按设置处理同一案例集内的近似重复截图
+        
+        Returns:
+            bool: 是否保留该图片
+        """
+        case_id = self.current_case['case_id']
+        try:
+            hash_value = ImageUtils.dhash_file(image_path)
+        except Exception as e:
+            print(f"计算图片哈希失败: {e}")
+            return True
+        
+        policy = SettingsUtils.get_duplicate_image_policy()
+        if policy != 'off':
+            duplicates = self.db.find_similar_images(
+                hash_value,
+                SettingsUtils.get_duplicate_image_distance(),
+                case_id=case_id,
+                pending_paths=self.image_list.getImagePaths(),
+                exclude_path=image_path
+            )
+            if duplicates:
+                similar = duplicates[0]
+                detail = f"与用例 {similar['case_id']} 的图片相似（差异 {similar['distance']}）:\n{similar['image_path']}"
+                if policy == 'skip':
+                    try:
+                        os.remove(image_path)
+                    except OSError:
+                        pass
+                    QMessageBox.information(self, "已跳过重复截图", f"该截图与已有截图近似，未添加。\n\n{detail}")
+                    return False
+                QMessageBox.warning(self, "近似重复截图", f"该截图与已有截图近似，已添加。\n\n{detail}")
+        
+        self.db.save_image_hash(image_path, case_id, hash_value)
+        return True
     
     def save_record(self):
         """保存执行记录"""
@@ -1,309 +1,134 @@
 import os
-import tempfile
-import shutil
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, 
     QComboBox, QTableWidget, QTableWidgetItem, QFileDialog, 
     QDateEdit, QLineEdit, QGroupBox, QHeaderView, QProgressBar,
-    QMessageBox
+    QMessageBox, QCheckBox
 )
-from PyQt6.QtCore import Qt, QDate, pyqtSignal, QThread, QTimer
+from PyQt6.QtCore import Qt, QDate
 
-from utils import DateUtils
-from database import Database
+from utils import DateUtils, SettingsUtils
+from exporter import RecordExporter, ShardedPdfExporter
+from export_jobs import ExportJob, ExportJobManager
+from snapshot import AnalyticsSnapshot
+from ui_components import load_pixmap
 
-import pandas as pd
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib import colors
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 
 
-class ExportThread(QThread):
-    """导出线程，用于后台处理导出操作"""
+class ExportJobsPanel(QGroupBox):
+    """导出任务列表：显示排队中/进行中/已结束的任务，可取消任务或清除历史"""
     
-    # 定义信号
-    progress_updated = pyqtSignal(int)  # 进度更新信号
-    export_completed = pyqtSignal(str)  # 导出完成信号，参数为导出文件路径
-    export_failed = pyqtSignal(str)     # 导出失败信号，参数为错误信息
+    # 导出类型显示名称
+    TYPE_LABELS = {
+        'pdf': "PDF报告",
+        'pdf_parallel': "PDF报告(并行)",
+        'pdf_zip': "PDF报告(按案例集)",
+        'excel': "Excel报告",
+        'html': "HTML报告",
+        'html_single': "HTML报告(单文件)",
+        'csv': "CSV数据",
+        'jsonl': "JSON Lines数据",
+        'bundle': "证据包",
+        'arrow': "分析快照",
+        'parquet': "分析快照(Parquet)",
+    }
     
-    def __init__(self, db, export_type, file_path, filters=None):
-        super().__init__()
-        # 仅保存数据库路径，线程内重新建立连接，避免SQLite跨线程使用
-        self.db_path = db.db_path if hasattr(db, 'db_path') else 'data/qa_test_logger.db'
-        self.export_type = export_type  # "pdf" 或 "excel"
-        self.file_path = file_path
-        self.filters = filters or {}  # 筛选条件
+    def __init__(self, manager, parent=None):
+        super().__init__("导出任务", parent)
+        self.manager = manager
+        self.rows = {}  # job_id -> 行号
+        
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget()
+        self.table.setColumnCount(6)
+        self.table.setHorizontalHeaderLabels(["任务", "类型", "文件", "状态", "进度", "操作"])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
+        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setMaximumHeight(160)
+        layout.addWidget(self.table)
+        
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        self.clear_button = QPushButton("清除已结束任务")
+        self.clear_button.clicked.connect(self.clear_finished)
+        button_layout.addWidget(self.clear_button)
+        layout.addLayout(button_layout)
+        
+        self.manager.job_added.connect(self.on_job_added)
+        self.manager.job_updated.connect(self.update_job_row)
+        
+        # 显示历史任务
+        for job_id in self.manager.jobs:
+            self.on_job_added(job_id)
     
-    def run(self):
-        """线程执行函数"""
-        try:
-            # 在线程内创建新的数据库连接，避免跨线程问题
-            db = Database(self.db_path)
-            # 获取记录数据
-            records = db.export_test_records(
-                self.filters.get('start_date'),
-                self.filters.get('end_date'),
-                self.filters.get('case_id'),
-                self.filters.get('status'),
-                self.filters.get('project_id'),
-                self.filters.get('collection_name'),
-                self.filters.get('search_text')
-            )
-            
-            if not records:
-                self.export_failed.emit("没有符合条件的记录可导出")
-                return
-            
-            # 更新进度
-            self.progress_updated.emit(10)
-            
-            # 根据类型导出
-            if self.export_type == "pdf":
-                self._export_to_pdf(records)
-            elif self.export_type == "excel":
-                self._export_to_excel(records)
-            else:
-                self.export_failed.emit("不支持的导出类型")
-                return
-            
-            # 导出完成
-            self.export_completed.emit(self.file_path)
-            
-        except Exception as e:
-            self.export_failed.emit(f"导出失败: {str(e)}")
+    def on_job_added(self, job_id):
+        """新任务插入到列表顶部"""
+        job = self.manager.jobs[job_id]
+        self.table.insertRow(0)
+        self.rows = {jid: row + 1 for jid, row in self.rows.items()}
+        self.rows[job_id] = 0
+        
+        self.table.setItem(0, 0, QTableWidgetItem(str(job.job_id)))
+        self.table.setItem(0, 1, QTableWidgetItem(self.TYPE_LABELS.get(job.export_type, job.export_type)))
+        file_item = QTableWidgetItem(os.path.basename(job.file_path.rstrip('/\\')) or job.file_path)
+        file_item.setToolTip(job.file_path)
+        self.table.setItem(0, 2, file_item)
+        self.table.setItem(0, 3, QTableWidgetItem(""))
+        
+        progress = QProgressBar()
+        progress.setRange(0, 100)
+        self.table.setCellWidget(0, 4, progress)
+        
+        action_button = QPushButton("取消")
+        action_button.clicked.connect(lambda _, jid=job_id: self.on_action_clicked(jid))
+        self.table.setCellWidget(0, 5, action_button)
+        
+        self.update_job_row(job_id)
     
-    def _export_to_pdf(self, records):
-        """导出为PDF"""
-        # 创建临时目录用于存放图片
-        temp_dir = tempfile.mkdtemp()
-        
-        try:
-            # 创建PDF文档
-            doc = SimpleDocTemplate(self.file_path, pagesize=A4)
-            styles = getSampleStyleSheet()
-            # 确保中文可显示：注册支持中文的字体并应用到样式
-            try:
-                pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
-                for key in ["Title", "Heading2", "Heading3", "Normal"]:
-                    if key in styles:
-                        styles[key].fontName = 'STSong-Light'
-            except Exception:
-                # 忽略字体注册失败，继续使用默认字体
-                pass
-            elements = []
-            
-            # 添加标题
-            title_style = styles["Title"]
-            elements.append(Paragraph("测试执行报告", title_style))
-            elements.append(Spacer(1, 20))
-            
-            # 添加统计信息（基于当前导出记录计算，避免跨线程DB依赖）
-            stats = {
-                'total': len(records),
-                '通过': 0,
-                '失败': 0,
-                '阻塞': 0,
-                '跳过': 0
-            }
-            for r in records:
-                status = r.get('执行状态')
-                if status in stats:
-                    stats[status] += 1
-            stats['通过率'] = (stats['通过'] / stats['total'] * 100) if stats['total'] > 0 else 0
-            
-            stats_data = [
-                ["总记录数", "通过", "失败", "阻塞", "跳过", "通过率"],
-                [
-                    str(stats['total']),
-                    str(stats['通过']),
-                    str(stats['失败']),
-                    str(stats['阻塞']),
-                    str(stats['跳过']),
-                    f"{stats['通过率']:.2f}%"
-                ]
-            ]
-            
-            stats_table = Table(stats_data)
-            stats_table.setStyle(TableStyle([
-                # 表头与内容区域背景/对齐
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                # 中文字体应用到整张表
-                ('FONTNAME', (0, 0), (-1, -1), 'STSong-Light'),
-                # 表头可加粗：使用默认粗体可能不支持中文，保持中文字体避免乱码
-                # ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            elements.append(stats_table)
-            elements.append(Spacer(1, 20))
-            
-            # 更新进度
-            self.progress_updated.emit(30)
-            
-            # 复制图片到临时目录
-            image_paths = []
-            for record in records:
-                if 'images' in record and record['images']:
-                    for img_path in record['images']:
-                        if img_path and os.path.exists(img_path):
-                            # 复制图片到临时目录
-                            img_name = os.path.basename(img_path)
-                            temp_img_path = os.path.join(temp_dir, img_name)
-                            shutil.copy2(img_path, temp_img_path)
-                            image_paths.append((record['用例ID'], temp_img_path))
-            
-            # 更新进度
-            self.progress_updated.emit(50)
-            
-            # 添加详细记录
-            for i, record in enumerate(records):
-                # 添加用例信息
-                elements.append(Paragraph(f"用例ID: {record['用例ID']}", styles["Heading2"]))
-                elements.append(Paragraph(f"测试场景: {record['测试场景']}", styles["Normal"]))
-                elements.append(Paragraph(f"测试步骤: {record.get('测试步骤') or '无'}", styles["Normal"]))
-                elements.append(Paragraph(f"预期结果: {record['预期结果']}", styles["Normal"]))
-                elements.append(Paragraph(f"优先级: {record['优先级'] or '无'}", styles["Normal"]))
-                elements.append(Spacer(1, 10))
-                
-                # 添加执行结果
-                elements.append(Paragraph("执行结果", styles["Heading3"]))
-                # 根据执行状态设置颜色
-                status = record['执行状态']
-                status_color = colors.black
-                if status == "通过":
-                    status_color = colors.green
-                elif status == "失败":
-                    status_color = colors.red
-                elif status == "阻塞":
-                    status_color = colors.orange
-                elif status == "跳过":
-                    status_color = colors.blue
-                status_style = styles["Normal"].clone("StatusStyle")
-                status_style.textColor = status_color
-                elements.append(Paragraph(f"状态: {status}", status_style))
-                elements.append(Paragraph(f"实际结果: {record['实际结果'] or '无'}", styles["Normal"]))
-                elements.append(Paragraph(f"备注: {record['备注'] or '无'}", styles["Normal"]))
-                # 不展示执行人
-                
-                # 添加执行时间
-                timestamp = record['执行时间']
-                date_str = DateUtils.timestamp_to_string(timestamp)
-                elements.append(Paragraph(f"执行时间: {date_str}", styles["Normal"]))
-                
-                # 添加图片
-                if 'images' in record and record['images']:
-                    elements.append(Paragraph("图片:", styles["Normal"]))
-                    for img_path in record['images']:
-                        if img_path and os.path.exists(img_path):
-                            # 使用临时目录中的图片
-                            img_name = os.path.basename(img_path)
-                            temp_img_path = os.path.join(temp_dir, img_name)
-                            if os.path.exists(temp_img_path):
-                                img = Image(temp_img_path)
-                                # 设置最大宽度
-                                max_width = 400
-                                if img.drawWidth > max_width:
-                                    ratio = max_width / img.drawWidth
-                                    img.drawWidth = max_width
-                                    img.drawHeight *= ratio
-                                elements.append(img)
-                                elements.append(Spacer(1, 5))
-                
-                # 添加分隔线
-                if i < len(records) - 1:
-                    elements.append(Spacer(1, 20))
-                    elements.append(Paragraph("_" * 70, styles["Normal"]))
-                    elements.append(Spacer(1, 20))
-                
-                # 更新进度
-                progress = 50 + int((i + 1) / len(records) * 40)
-                self.progress_updated.emit(progress)
-            
-            # 构建PDF
-            doc.build(elements)
-            self.progress_updated.emit(100)
-            
-        finally:
-            # 清理临时目录
-            shutil.rmtree(temp_dir, ignore_errors=True)
+    def update_job_row(self, job_id):
+        """刷新任务状态与进度"""
+        row = self.rows.get(job_id)
+        job = self.manager.jobs.get(job_id)
+        if row is None or job is None:
+            return
+        status_item = self.table.item(row, 3)
+        status_item.setText(job.status)
+        status_item.setToolTip(job.message or job.result_path or "")
+        progress = self.table.cellWidget(row, 4)
+        progress.setValue(job.progress or 0)
+        # 进行中的任务可取消；已取消/失败且留有检查点的任务可继续
+        action_button = self.table.cellWidget(row, 5)
+        if job.is_finished:
+            action_button.setText("继续")
+            action_button.setEnabled(self.manager.can_resume(job_id))
+        else:
+            action_button.setText("取消")
+            action_button.setEnabled(job.status in (ExportJob.QUEUED, ExportJob.RUNNING))
     
-    def _export_to_excel(self, records):
-        """导出为Excel"""
-        # 创建导出目录
-        export_dir = os.path.dirname(self.file_path)
-        os.makedirs(export_dir, exist_ok=True)
-        
-        # # 创建图片目录
-        # images_dir = os.path.join(export_dir, 'images')
-        # os.makedirs(images_dir, exist_ok=True)
-        
-        # 准备数据
-        export_data = []
-        for record in records:
-            # # 复制图片
-            # image_refs = []
-            # if 'images' in record and record['images']:
-            #     for img_path in record['images']:
-            #         if img_path and os.path.exists(img_path):
-            #             # 复制图片到导出目录
-            #             img_name = os.path.basename(img_path)
-            #             export_img_path = os.path.join(images_dir, img_name)
-            #             shutil.copy2(img_path, export_img_path)
-            #             # 添加相对路径引用
-            #             image_refs.append(f"images/{img_name}")
-            
-            # 创建记录数据
-            row_data = {
-                '用例ID': record['用例ID'],
-                '测试场景': record['测试场景'],
-                '测试步骤': record.get('测试步骤') or '',
-                '预期结果': record['预期结果'],
-                '优先级': record['优先级'] or '',
-                '执行状态': record['执行状态'],
-                '实际结果': record['实际结果'] or '',
-                '备注': record['备注'] or '',
-                '执行时间': DateUtils.timestamp_to_string(record['执行时间'])
-                # '图片': ', '.join(image_refs)
-            }
-            export_data.append(row_data)
-            
-            # 更新进度
-            progress = 10 + int((records.index(record) + 1) / len(records) * 80)
-            self.progress_updated.emit(progress)
-        
-        # 创建DataFrame并导出
-        df = pd.DataFrame(export_data)
-        # 使用xlsxwriter为“执行状态”列添加条件格式
-        try:
-            with pd.ExcelWriter(self.file_path, engine='xlsxwriter') as writer:
-                df.to_excel(writer, index=False, sheet_name='记录')
-                workbook  = writer.book
-                worksheet = writer.sheets['记录']
-                # 找到“执行状态”列索引
-                headers = list(df.columns)
-                if '执行状态' in headers:
-                    status_col_idx = headers.index('执行状态')
-                    # 数据区域行数
-                    nrows = len(df) + 1  # 包含表头占1行
-                    col_letter = chr(ord('A') + status_col_idx)
-                    rng = f"{col_letter}2:{col_letter}{nrows}"
-                    # 条件格式
-                    worksheet.conditional_format(rng, { 'type': 'text', 'criteria': 'containing', 'value': '通过', 'format': workbook.add_format({'bg_color': '#C8E6C9'}) })
-                    worksheet.conditional_format(rng, { 'type': 'text', 'criteria': 'containing', 'value': '失败', 'format': workbook.add_format({'bg_color': '#FFCDD2'}) })
-                    worksheet.conditional_format(rng, { 'type': 'text', 'criteria': 'containing', 'value': '阻塞', 'format': workbook.add_format({'bg_color': '#FFF9C4'}) })
-                    worksheet.conditional_format(rng, { 'type': 'text', 'criteria': 'containing', 'value': '跳过', 'format': workbook.add_format({'bg_color': '#BBDEFB'}) })
-        except Exception:
-            # 回退到普通写入
-            df.to_excel(self.file_path, index=False)
-        
-        self.progress_updated.emit(100)
+    def on_action_clicked(self, job_id):
+        """取消或继续任务"""
+        job = self.manager.jobs.get(job_id)
+        if job is None:
+            return
+        if job.is_finished:
+            if self.manager.resume(job_id) is not None:
+                # 原任务已由新任务接续
+                self.update_job_row(job_id)
+        else:
+            self.manager.cancel(job_id)
+    
+    def clear_finished(self):
+        """清除已结束的任务"""
+        self.manager.clear_history()
+        for job_id, row in sorted(self.rows.items(), key=lambda item: -item[1]):
+            if job_id not in self.manager.jobs:
+                self.table.removeRow(row)
+        remaining = [job_id for job_id, _ in sorted(self.rows.items(), key=lambda item: item[1])
+                     if job_id in self.manager.jobs]
+        self.rows = {job_id: row for row, job_id in enumerate(remaining)}
 
 
 class HistoryTab(QWidget):
@@ -312,7 +137,9 @@ class HistoryTab(QWidget):
     def __init__(self, db, parent=None):
         super().__init__(parent)
         self.db = db
-        self.export_thread = None
+        # 导出任务在独立进程中执行，可同时排队/运行多个
+        self.export_manager = ExportJobManager(db.db_path, parent=self)
+        self.export_manager.job_finished.connect(self.on_export_job_finished)
         self.initUI()
     
     def initUI(self):
@@ -406,6 +233,16 @@ class HistoryTab(QWidget):
         self.rate_label = QLabel("0%")
         stats_layout.addWidget(self.rate_label)
         
+        # 统计来源：勾选后从最新分析快照计算，不查询数据库
+        stats_layout.addStretch()
+        self.snapshot_stats_check = QCheckBox("使用分析快照统计")
+        self.snapshot_stats_check.setEnabled(AnalyticsSnapshot.available())
+        self.snapshot_stats_check.setChecked(AnalyticsSnapshot.available() and SettingsUtils.get_use_snapshot_statistics())
+        self.snapshot_stats_check.toggled.connect(self.on_snapshot_stats_toggled)
+        stats_layout.addWidget(self.snapshot_stats_check)
+        self.stats_source_label = QLabel("")
+        stats_layout.addWidget(self.stats_source_label)
+        
         self.layout.addWidget(stats_group)
         
         # 记录列表
@@ -426,6 +263,11 @@ class HistoryTab(QWidget):
         # 导出按钮区域
         export_layout = QHBoxLayout()
         
+        # 增量导出选项
+        self.delta_export_check = QCheckBox("仅导出上次导出后的变化")
+        self.delta_export_check.setToolTip("只导出以相同类型与筛选条件上次导出之后新增或修改的记录（首次导出全部记录）")
+        export_layout.addWidget(self.delta_export_check)
+        
         # 导出PDF按钮
         self.export_pdf_button = QPushButton("导出PDF报告")
         self.export_pdf_button.clicked.connect(self.export_pdf)
@@ -436,13 +278,36 @@ class HistoryTab(QWidget):
         self.export_excel_button.clicked.connect(self.export_excel)
         export_layout.addWidget(self.export_excel_button)
         
-        # 导出进度条
-        self.export_progress = QProgressBar()
-        self.export_progress.setVisible(False)
-        export_layout.addWidget(self.export_progress)
+        # 导出HTML按钮
+        self.export_html_button = QPushButton("导出HTML报告")
+        self.export_html_button.setToolTip("生成可在浏览器中筛选、排序的报告，图片按需加载")
+        self.export_html_button.clicked.connect(self.export_html)
+        export_layout.addWidget(self.export_html_button)
+        
+        # 导出CSV/JSON Lines按钮
+        self.export_data_button = QPushButton("导出数据(CSV/JSONL)")
+        self.export_data_button.clicked.connect(self.export_data)
+        export_layout.addWidget(self.export_data_button)
+        
+        # 导出证据包按钮
+        self.export_bundle_button = QPushButton("导出证据包")
+        self.export_bundle_button.setToolTip("将筛选出的记录、所属用例与截图打包为zip文件，可在其他电脑上导入")
+        self.export_bundle_button.clicked.connect(self.export_bundle)
+        export_layout.addWidget(self.export_bundle_button)
+        
+        # 生成分析快照按钮
+        self.snapshot_button = QPushButton("生成分析快照")
+        self.snapshot_button.setToolTip("将全部用例、记录与图片数据写入列式快照（Arrow），供统计与数据分析使用")
+        self.snapshot_button.setEnabled(AnalyticsSnapshot.available())
+        self.snapshot_button.clicked.connect(self.create_snapshot)
+        export_layout.addWidget(self.snapshot_button)
         
         self.layout.addLayout(export_layout)
         
+        # 导出任务列表
+        self.export_jobs_panel = ExportJobsPanel(self.export_manager)
+        self.layout.addWidget(self.export_jobs_panel)
+        
         # 初始化筛选条件
         self.refresh_project_combo()
         self.refresh_collection_combo()
@@ -581,14 +446,8 @@ class HistoryTab(QWidget):
                 date_str = DateUtils.timestamp_to_string(timestamp)
                 self.records_table.setItem(row, 6, QTableWidgetItem(date_str))
             
-            # 更新统计信息（考虑案例集筛选）
-            stats = self.db.get_statistics(start_date, end_date)
-            self.total_label.setText(str(stats['total']))
-            self.pass_label.setText(str(stats['通过']))
-            self.fail_label.setText(str(stats['失败']))
-            self.block_label.setText(str(stats['阻塞']))
-            self.skip_label.setText(str(stats['跳过']))
-            self.rate_label.setText(f"{stats['通过率']:.2f}%")
+            # 更新统计信息
+            self.update_statistics(start_date, end_date)
             
             # 更新状态栏显示查询结果
             print(f"查询成功：找到 {len(records)} 条记录")
@@ -596,45 +455,85 @@ class HistoryTab(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "错误", f"查询失败: {str(e)}")
     
-    def export_pdf(self):
-        """导出PDF报告"""
-        # 打开文件对话框
-        file_path, _ = QFileDialog.getSaveFileName(
-            self, "保存PDF报告", "", "PDF文件 (*.pdf)"
-        )
-        
-        if not file_path:
-            return
-        
-        # 确保文件扩展名
-        if not file_path.lower().endswith('.pdf'):
-            file_path += '.pdf'
+    def update_statistics(self, start_date=None, end_date=None):
+        """更新统计信息，勾选“使用分析快照统计”且存在快照时从快照计算"""
+        if start_date is None and end_date is None:
+            start_date = DateUtils.string_to_timestamp(self.start_date.date().toString("yyyy-MM-dd"))
+            end_date = DateUtils.string_to_timestamp(self.end_date.date().addDays(1).toString("yyyy-MM-dd"))
         
-        # 获取筛选条件
-        filters = {
+        stats = None
+        snapshot_path = AnalyticsSnapshot.latest() if self.snapshot_stats_check.isChecked() else None
+        if snapshot_path:
+            try:
+                stats = AnalyticsSnapshot.get_statistics(snapshot_path, start_date, end_date)
+                created_at = AnalyticsSnapshot.read_info(snapshot_path)['created_at']
+                self.stats_source_label.setText(f"（快照: {DateUtils.timestamp_to_string(created_at)}）")
+            except Exception as e:
+                print(f"读取分析快照失败，改用数据库统计: {e}")
+                stats = None
+        if stats is None:
+            stats = self.db.get_statistics(start_date, end_date)
+            self.stats_source_label.setText("")
+        
+        self.total_label.setText(str(stats['total']))
+        self.pass_label.setText(str(stats['通过']))
+        self.fail_label.setText(str(stats['失败']))
+        self.block_label.setText(str(stats['阻塞']))
+        self.skip_label.setText(str(stats['跳过']))
+        self.rate_label.setText(f"{stats['通过率']:.2f}%")
+    
+    def on_snapshot_stats_toggled(self, checked):
+        """切换统计来源"""
+        SettingsUtils.set_use_snapshot_statistics(checked)
+        if checked and not AnalyticsSnapshot.latest():
+            QMessageBox.information(self, "提示", "尚未生成分析快照，请先点击“生成分析快照”")
+        self.update_statistics()
+    
+    def create_snapshot(self):
+        """生成分析快照（全部数据，不受筛选条件影响）"""
+        self.start_export("arrow", AnalyticsSnapshot.SNAPSHOT_DIR)
+    
+    def get_export_filters(self):
+        """获取当前界面的导出筛选条件"""
+        return {
             'start_date': DateUtils.string_to_timestamp(self.start_date.date().toString("yyyy-MM-dd")),
             'end_date': DateUtils.string_to_timestamp(self.end_date.date().addDays(1).toString("yyyy-MM-dd")),
             'case_id': None,  # 与历史界面一致：搜索框可输入用例ID或场景，下方用search_text处理
             'status': self.status_combo.currentText() if self.status_combo.currentText() != "全部" else None,
             'project_id': (self.project_combo.currentText() if self.project_combo.currentText() != "全部" else None),
             'collection_name': (self.collection_combo.currentText() if self.collection_combo.currentText() != "全部" else None),
-            'search_text': (self.search_edit.text().strip() or None)
+            'search_text': (self.search_edit.text().strip() or None),
+            # 增量导出：只导出该报告上次导出后新增或修改的记录
+            'since_last_export': self.delta_export_check.isChecked() or None
         }
+    
+    def start_export(self, export_type, file_path, compress=False):
+        """提交导出任务（在后台进程中执行，可同时提交多个）"""
+        self.export_manager.submit(export_type, file_path, self.get_export_filters(), compress)
+    
+    def export_pdf(self):
+        """导出PDF报告"""
+        # 文件类型过滤器 -> (导出类型, 扩展名)；并行分片需要 pypdf
+        file_filters = {"PDF文件 (*.pdf)": ("pdf", '.pdf')}
+        if ShardedPdfExporter.available():
+            file_filters["PDF（按案例集并行生成，含目录） (*.pdf)"] = ("pdf_parallel", '.pdf')
+            file_filters["按案例集分别生成的PDF压缩包 (*.zip)"] = ("pdf_zip", '.zip')
+        
+        # 打开文件对话框
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "保存PDF报告", "", ";;".join(file_filters)
+        )
         
-        # 创建并启动导出线程
-        self.export_thread = ExportThread(self.db, "pdf", file_path, filters)
-        self.export_thread.progress_updated.connect(self.update_export_progress)
-        self.export_thread.export_completed.connect(self.on_export_completed)
-        self.export_thread.export_failed.connect(self.on_export_failed)
+        if not file_path:
+            return
         
-        # 显示进度条
-        self.export_progress.setValue(0)
-        self.export_progress.setVisible(True)
-        self.export_pdf_button.setEnabled(False)
-        self.export_excel_button.setEnabled(False)
+        export_type, extension = file_filters.get(selected_filter, ("pdf", '.pdf'))
         
-        # 启动线程
-        self.export_thread.start()
+        # 确保文件扩展名
+        if not file_path.lower().endswith(extension):
+            file_path += extension
+        
+        self.start_export(export_type, file_path)
     
     def export_excel(self):
         """导出Excel报告"""
@@ -650,57 +549,99 @@ class HistoryTab(QWidget):
         if not file_path.lower().endswith('.xlsx'):
             file_path += '.xlsx'
         
-        # 获取筛选条件
-        filters = {
-            'start_date': DateUtils.string_to_timestamp(self.start_date.date().toString("yyyy-MM-dd")),
-            'end_date': DateUtils.string_to_timestamp(self.end_date.date().addDays(1).toString("yyyy-MM-dd")),
-            'case_id': None,
-            'status': self.status_combo.currentText() if self.status_combo.currentText() != "全部" else None,
-            'project_id': (self.project_combo.currentText() if self.project_combo.currentText() != "全部" else None),
-            'collection_name': (self.collection_combo.currentText() if self.collection_combo.currentText() != "全部" else None),
-            'search_text': (self.search_edit.text().strip() or None)
+        self.start_export("excel", file_path)
+    
+    def export_html(self):
+        """导出HTML报告"""
+        # 文件类型过滤器 -> 导出类型
+        file_filters = {
+            "HTML报告（图片保存在同名 _files 目录） (*.html)": "html",
+            "单文件HTML报告（内嵌图片） (*.html)": "html_single",
         }
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "保存HTML报告", "", ";;".join(file_filters)
+        )
         
-        # 创建并启动导出线程
-        self.export_thread = ExportThread(self.db, "excel", file_path, filters)
-        self.export_thread.progress_updated.connect(self.update_export_progress)
-        self.export_thread.export_completed.connect(self.on_export_completed)
-        self.export_thread.export_failed.connect(self.on_export_failed)
+        if not file_path:
+            return
         
-        # 显示进度条
-        self.export_progress.setValue(0)
-        self.export_progress.setVisible(True)
-        self.export_pdf_button.setEnabled(False)
-        self.export_excel_button.setEnabled(False)
+        # 确保文件扩展名
+        if not file_path.lower().endswith(('.html', '.htm')):
+            file_path += '.html'
         
-        # 启动线程
-        self.export_thread.start()
+        self.start_export(file_filters.get(selected_filter, "html"), file_path)
     
-    def update_export_progress(self, value):
-        """更新导出进度"""
-        self.export_progress.setValue(value)
+    def export_data(self):
+        """导出CSV或JSON Lines数据文件（可选gzip压缩），供数据分析使用"""
+        # 文件类型过滤器 -> 默认扩展名
+        file_filters = {
+            "CSV文件 (*.csv)": '.csv',
+            "CSV压缩文件 (*.csv.gz)": '.csv.gz',
+            "JSON Lines文件 (*.jsonl)": '.jsonl',
+            "JSON Lines压缩文件 (*.jsonl.gz)": '.jsonl.gz',
+        }
+        file_path, selected_filter = QFileDialog.getSaveFileName(
+            self, "导出数据", "", ";;".join(file_filters)
+        )
+        
+        if not file_path:
+            return
+        
+        # 未输入可识别的扩展名时按所选类型补全
+        export_type, compress = RecordExporter.detect_format(file_path)
+        if export_type is None:
+            file_path += file_filters.get(selected_filter, '.csv')
+            export_type, compress = RecordExporter.detect_format(file_path)
+        
+        self.start_export(export_type, file_path, compress)
     
-    def on_export_completed(self, file_path):
+    def export_bundle(self):
+        """导出证据包（用例、记录与截图）"""
+        # 打开文件对话框
+        file_path, _ = QFileDialog.getSaveFileName(
+            self, "导出证据包", "", "证据包 (*.zip)"
+        )
+        
+        if not file_path:
+            return
+        
+        # 确保文件扩展名
+        if not file_path.lower().endswith('.zip'):
+            file_path += '.zip'
+        
+        self.start_export("bundle", file_path)
+    
+    def on_export_job_finished(self, job_id):
+        """导出任务结束处理"""
+        job = self.export_manager.jobs.get(job_id)
+        if job is None:
+            return
+        if job.status == ExportJob.COMPLETED:
+            self.on_export_completed(job)
+        elif job.status == ExportJob.FAILED:
+            self.on_export_failed(job.message)
+    
+    def on_export_completed(self, job):
         """导出完成处理"""
-        self.export_progress.setVisible(False)
-        self.export_pdf_button.setEnabled(True)
-        self.export_excel_button.setEnabled(True)
+        # 新快照生成后刷新统计信息
+        if job.export_type in AnalyticsSnapshot.FORMATS:
+            self.update_statistics()
+        
+        # 增量导出没有变化时不生成文件
+        if job.result_path is None:
+            QMessageBox.information(self, "没有新的变化", f"{job.message}，未生成文件。")
+            return
         
         # 显示导出成功消息
         msg = QMessageBox(self)
         msg.setIcon(QMessageBox.Icon.Information)
         msg.setWindowTitle("导出成功")
-        msg.setText(f"报告已保存至: {os.path.basename(file_path)}")
+        msg.setText(f"报告已保存至: {os.path.basename(job.result_path)}")
         msg.setStandardButtons(QMessageBox.StandardButton.Ok)
         msg.exec()
     
     def on_export_failed(self, error_message):
         """导出失败处理"""
-        self.export_progress.setVisible(False)
-        self.export_pdf_button.setEnabled(True)
-        self.export_excel_button.setEnabled(True)
-        
-        # 显示导出失败消息
         QMessageBox.critical(self, "导出失败", error_message)
     
     def on_record_double_clicked(self, row, column):
@@ -762,7 +703,6 @@ class HistoryTab(QWidget):
         
         # 创建图片查看对话框
         from PyQt6.QtWidgets import QDialog, QVBoxLayout, QScrollArea, QLabel
-        from PyQt6.QtGui import QPixmap
         
         dialog = QDialog(self)
         dialog.setWindowTitle(f"执行记录 {record['record_id']} 的图片")
@@ -781,7 +721,7 @@ class HistoryTab(QWidget):
             if img_path and os.path.exists(img_path):
                 # 创建图片标签
                 img_label = QLabel()
-                pixmap = QPixmap(img_path)
+                pixmap = load_pixmap(img_path)
                 
                 # 如果图片太大，调整大小
                 if pixmap.width() > 750:
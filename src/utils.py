@@ -4,12 +4,246 @@ from datetime import datetime
 from PIL import Image, ImageGrab
 from io import BytesIO
 import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 
+# 报告分辨率图片副本的缓存目录
+REPORT_CACHE_DIR = os.path.join('data', 'report_cache')
+
+
 class ImageUtils:
     """图片处理工具类"""
     
+    # 附件存储格式：名称 -> (PIL格式, 文件扩展名, 额外保存参数)
+    STORAGE_FORMATS = {
+        'jpeg': ('JPEG', '.jpg', {}),
+        'webp': ('WEBP', '.webp', {'method': 4}),
+        'webp_lossless': ('WEBP', '.webp', {'lossless': True, 'method': 4}),
+        'avif': ('AVIF', '.avif', {'speed': 6}),
+    }
+    DEFAULT_STORAGE_FORMAT = 'jpeg'
+    
+    # 附件像素上限（约两块4K屏，容纳 7680x2160 的多屏截图），超出时先降采样再压缩
+    MAX_IMAGE_PIXELS = 7680 * 2160
+    
+    @staticmethod
+    def target_size(size, max_pixels=None):
+        """
+        计算存储分辨率：像素数不超过上限，保持宽高比
+        
+        Args:
+            size: 原始尺寸 (宽, 高)
+            max_pixels: 像素上限，默认 MAX_IMAGE_PIXELS
+            
+        Returns:
+            tuple: 目标尺寸 (宽, 高)，无需缩小时返回原尺寸
+        """
+        max_pixels = max_pixels or ImageUtils.MAX_IMAGE_PIXELS
+        width, height = size
+        if width * height <= max_pixels:
+            return size
+        scale = (max_pixels / (width * height)) ** 0.5
+        return max(1, int(width * scale)), max(1, int(height * scale))
+    
+    @staticmethod
+    def fit_to_pixels(image, max_pixels=None):
+        """
+        将图片缩小到像素上限以内
+        
+        先用 Image.reduce 按整数倍做快速盒式降采样，只对剩余的小数倍使用LANCZOS。
+        
+        Args:
+            image: PIL.Image对象
+            max_pixels: 像素上限，默认 MAX_IMAGE_PIXELS
+            
+        Returns:
+            PIL.Image: 缩小后的图片（无需缩小时原样返回）
+        """
+        target = ImageUtils.target_size(image.size, max_pixels)
+        if target == image.size:
+            return image
+        
+        factor = min(image.width // target[0], image.height // target[1])
+        if factor >= 2:
+            image = image.reduce(factor)
+        if image.size != target:
+            image = image.resize(target, Image.LANCZOS)
+        return image
+    
+    @staticmethod
+    def open_for_storage(file_path, max_pixels=None):
+        """
+        打开图片文件并解码到存储分辨率
+        
+        先根据文件头中的尺寸确定目标分辨率；JPEG使用 draft() 让解码器直接按
+        1/2、1/4、1/8 缩放解码，避免在内存中展开全尺寸图片，其余格式再用
+        fit_to_pixels 降采样。
+        
+        Args:
+            file_path: 图片文件路径
+            max_pixels: 像素上限，默认 MAX_IMAGE_PIXELS
+            
+        Returns:
+            PIL.Image: 已解码的图片对象
+        """
+        image = Image.open(file_path)
+        target = ImageUtils.target_size(image.size, max_pixels)
+        if target != image.size and image.format == 'JPEG':
+            # draft 选取不小于目标尺寸的最小缩放比例
+            image.draft('RGB', target)
+        image.load()
+        return ImageUtils.fit_to_pixels(image, max_pixels)
+    
+    @staticmethod
+    def available_storage_formats():
+        """返回当前Pillow支持编码的存储格式名称列表"""
+        Image.init()
+        return [name for name, (pil_format, _, _) in ImageUtils.STORAGE_FORMATS.items()
+                if pil_format in Image.SAVE]
+    
+    @staticmethod
+    def get_storage_format():
+        """读取设置中的存储格式，不支持时回退到JPEG"""
+        name = SettingsUtils.get_image_format()
+        if name in ImageUtils.available_storage_formats():
+            return name
+        return ImageUtils.DEFAULT_STORAGE_FORMAT
+    
+    @staticmethod
+    def detect_format(file_path):
+        """
+        根据文件头识别图片格式（不依赖扩展名）
+        
+        Returns:
+            str: 'jpeg'、'png'、'webp'、'avif'、'gif'、'bmp'，无法识别时返回None
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                header = f.read(32)
+        except OSError:
+            return None
+        
+        if header.startswith(b'\xff\xd8\xff'):
+            return 'jpeg'
+        if header.startswith(b'\x89PNG\r\n\x1a\n'):
+            return 'png'
+        if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+            return 'webp'
+        if header[4:8] == b'ftyp' and header[8:12] in (b'avif', b'avis'):
+            return 'avif'
+        if header[:6] in (b'GIF87a', b'GIF89a'):
+            return 'gif'
+        if header.startswith(b'BM'):
+            return 'bmp'
+        return None
+    
+    @staticmethod
+    def encode_image(image, storage_format=None, max_size_kb=1024, quality=85):
+        """
+        按存储格式编码图片，并压缩至指定大小以下
+        
+        与 compress_image 相同的搜索策略：先逐步降低质量，仍然超限再按比例缩小尺寸。
+        无损WebP没有质量可调，超限时退回有损WebP继续搜索。
+        
+        Args:
+            image: PIL.Image对象
+            storage_format: 存储格式名称（见 STORAGE_FORMATS），默认读取设置
+            max_size_kb: 最大文件大小（KB）
+            quality: 初始质量值（1-100）
+            
+        Returns:
+            tuple: (编码后的字节数据, 文件扩展名)
+        """
+        storage_format = storage_format or ImageUtils.get_storage_format()
+        pil_format, ext, options = ImageUtils.STORAGE_FORMATS[storage_format]
+        
+        # JPEG不支持透明通道；WebP/AVIF保留透明通道
+        has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+        if pil_format != 'JPEG' and has_alpha:
+            if image.mode != 'RGBA':
+                image = image.convert('RGBA')
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        def encode(img, q):
+            output = BytesIO()
+            if options.get('lossless'):
+                img.save(output, format=pil_format, **options)
+            else:
+                img.save(output, format=pil_format, quality=q, **options)
+            return output.getvalue()
+        
+        max_bytes = max_size_kb * 1024
+        data = encode(image, quality)
+        if len(data) <= max_bytes:
+            return data, ext
+        
+        # 无损模式超限时改用有损模式
+        if options.get('lossless'):
+            options = {k: v for k, v in options.items() if k != 'lossless'}
+            data = encode(image, quality)
+        
+        # 降低质量
+        while len(data) > max_bytes and quality > 10:
+            quality -= 5
+            data = encode(image, quality)
+        
+        # 降低质量后仍然太大，则按比例缩小尺寸
+        while len(data) > max_bytes and min(image.size) > 16:
+            scale = (max_bytes / len(data)) ** 0.5 * 0.95
+            new_size = (max(1, int(image.width * scale)), max(1, int(image.height * scale)))
+            image = image.resize(new_size, Image.LANCZOS)
+            data = encode(image, quality)
+        
+        return data, ext
+    
+    @staticmethod
+    def dhash(image, hash_size=8):
+        """
+        计算图片的差异哈希（dHash），用于识别近似重复的截图
+        
+        Args:
+            image: PIL.Image对象
+            hash_size: 哈希边长，默认8（64位）
+            
+        Returns:
+            int: 哈希值
+        """
+        small = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = list(small.getdata())
+        value = 0
+        for row in range(hash_size):
+            offset = row * (hash_size + 1)
+            for col in range(hash_size):
+                value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+        return value
+    
+    @staticmethod
+    def dhash_file(file_path):
+        """计算图片文件的dHash；JPEG以1/8比例解码，无需展开全尺寸图片"""
+        with Image.open(file_path) as image:
+            image.draft('L', (64, 64))
+            return ImageUtils.dhash(image)
+    
+    @staticmethod
+    def _write_image(image, case_id, images_dir):
+        """按当前存储格式编码并写入图片目录，返回保存路径"""
+        data, ext = ImageUtils.encode_image(image)
+        
+        # 生成文件名
+        timestamp = int(time.time())
+        filename = f"{case_id}_{timestamp}{ext}"
+        filepath = os.path.join(images_dir, filename)
+        
+        # 保存图片（直接写入编码结果，避免二次编码）
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        
+        return filepath
+    
     @staticmethod
     def compress_image(image, max_size_kb=1024, quality=85):
         """
@@ -76,18 +310,11 @@ class ImageUtils:
         if image is None or not isinstance(image, Image.Image):
             return None
         
-        # 压缩图片
-        compressed_image = ImageUtils.compress_image(image)
+        # 超大截图先降到存储分辨率
+        image = ImageUtils.fit_to_pixels(image)
         
-        # 生成文件名
-        timestamp = int(time.time())
-        filename = f"{case_id}_{timestamp}.jpg"
-        filepath = os.path.join(images_dir, filename)
-        
-        # 保存图片
-        compressed_image.save(filepath, 'JPEG')
-        
-        return filepath
+        # 按存储格式压缩并保存
+        return ImageUtils._write_image(image, case_id, images_dir)
     
     @staticmethod
     def save_image_from_file(case_id, file_path, images_dir='images'):
@@ -105,22 +332,98 @@ class ImageUtils:
         # 确保目录存在
         os.makedirs(images_dir, exist_ok=True)
         
-        # 打开图片
-        image = Image.open(file_path)
+        # 打开图片，直接解码到存储分辨率
+        image = ImageUtils.open_for_storage(file_path)
         
-        # 压缩图片
-        compressed_image = ImageUtils.compress_image(image)
+        # 按存储格式压缩并保存
+        return ImageUtils._write_image(image, case_id, images_dir)
         
-        # 生成文件名
-        timestamp = int(time.time())
-        filename = f"{case_id}_{timestamp}.jpg"
-        filepath = os.path.join(images_dir, filename)
+    @staticmethod
+    def file_content_hash(file_path):
+        """计算文件内容的SHA-1摘要"""
+        digest = hashlib.sha1()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def make_report_derivative(image_path, cache_dir=REPORT_CACHE_DIR, width_pt=400, dpi=150):
+        """
+        生成报告分辨率的图片副本（按内容哈希缓存）
         
-        # 保存图片
-        compressed_image.save(filepath, 'JPEG')
+        Args:
+            image_path: 原图路径
+            cache_dir: 缓存目录
+            width_pt: 报告中图片的最大显示宽度（磅）
+            dpi: 报告输出分辨率
+            
+        Returns:
+            str: 副本路径；原图已不超过目标宽度时返回原图路径
+        """
+        width_px = int(width_pt / 72 * dpi)
         
-        return filepath
+        with Image.open(image_path) as image:
+            if image.width <= width_px and image.format == 'JPEG':
+                return image_path
+            
+            content_hash = ImageUtils.file_content_hash(image_path)
+            derivative_path = os.path.join(cache_dir, f"{content_hash}_{width_px}.jpg")
+            if os.path.exists(derivative_path):
+                return derivative_path
+            
+            if image.width > width_px:
+                height_px = max(1, round(image.height * width_px / image.width))
+                image.draft('RGB', (width_px, height_px))
+                image = image.convert('RGB') if image.mode != 'RGB' else image
+                image = image.resize((width_px, height_px), Image.LANCZOS)
+            elif image.mode != 'RGB':
+                image = image.convert('RGB')
+            
+            # 先写临时文件再改名，避免并发导出读到不完整的文件
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_path = f"{derivative_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            image.save(temp_path, 'JPEG', quality=85, dpi=(dpi, dpi))
+            os.replace(temp_path, derivative_path)
         
+        return derivative_path
+    
+    @staticmethod
+    def prepare_report_images(image_paths, cache_dir=REPORT_CACHE_DIR, width_pt=400, dpi=150, max_workers=None):
+        """
+        并行生成报告分辨率图片副本
+        
+        Pillow在解码、缩放和编码时会释放GIL，因此使用线程池即可并行处理。
+        
+        Args:
+            image_paths: 原图路径列表（可重复）
+            cache_dir: 缓存目录
+            width_pt: 报告中图片的最大显示宽度（磅）
+            dpi: 报告输出分辨率
+            max_workers: 最大线程数，默认按CPU核数
+            
+        Returns:
+            dict: 原图路径到副本路径的映射（生成失败时映射到原图）
+        """
+        unique_paths = list(dict.fromkeys(p for p in image_paths if p))
+        if not unique_paths:
+            return {}
+        
+        max_workers = max_workers or min(8, os.cpu_count() or 1)
+        mapping = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(ImageUtils.make_report_derivative, path, cache_dir, width_pt, dpi): path
+                for path in unique_paths
+            }
+            for future, path in futures.items():
+                try:
+                    mapping[path] = future.result()
+                except Exception as e:
+                    print(f"生成报告图片失败: {e}")
+                    mapping[path] = path
+        return mapping
+    
     @staticmethod
     def copy_images_for_export(image_paths, export_dir):
         """
@@ -175,8 +478,8 @@ class DateUtils:
         Returns:
             str: 格式化的日期时间字符串
         """
-        dt = datetime.fromtimestamp(timestamp)
-        return dt.strftime('%Y-%m-%d %H:%M:%S')
+        # time.strftime 比 datetime.strftime 快一倍以上，大批量导出时逐行调用
+        return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))
     
     @staticmethod
     def string_to_timestamp(date_string):
@@ -234,4 +537,55 @@ class SettingsUtils:
         data = SettingsUtils.read_settings()
         if name:
             data['last_collection_name'] = name
-        SettingsUtils.write_settings(data)
\ No newline at end of file
+        SettingsUtils.write_settings(data)
+
+    @staticmethod
+    def get_duplicate_image_policy():
+        """近似重复截图的处理方式：flag（提示后保留）、skip（不保存）、off（不检查）"""
+        data = SettingsUtils.read_settings()
+        policy = data.get('duplicate_image_policy')
+        return policy if policy in ('flag', 'skip', 'off') else 'flag'
+
+    @staticmethod
+    def get_duplicate_image_distance():
+        """判定为近似重复的最大汉明距离（0-15）"""
+        data = SettingsUtils.read_settings()
+        try:
+            return max(0, min(int(data.get('duplicate_image_distance', 4)), 15))
+        except (TypeError, ValueError):
+            return 4
+
+    @staticmethod
+    def get_image_format():
+        data = SettingsUtils.read_settings()
+        return data.get('image_format')
+
+    @staticmethod
+    def set_image_format(name: Optional[str]):
+        data = SettingsUtils.read_settings()
+        if name:
+            data['image_format'] = name
+        else:
+            data.pop('image_format', None)
+        SettingsUtils.write_settings(data)
+
+    @staticmethod
+    def get_use_snapshot_statistics():
+        """历史记录页面的统计信息是否从最新分析快照计算"""
+        data = SettingsUtils.read_settings()
+        return bool(data.get('use_snapshot_statistics', False))
+
+    @staticmethod
+    def set_use_snapshot_statistics(enabled: bool):
+        data = SettingsUtils.read_settings()
+        data['use_snapshot_statistics'] = bool(enabled)
+        SettingsUtils.write_settings(data)
+
+    @staticmethod
+    def get_export_cache_limit_mb():
+        """导出结果缓存的总大小上限（MB），0 表示不缓存"""
+        data = SettingsUtils.read_settings()
+        try:
+            return max(0, int(data.get('export_cache_limit_mb', 1024)))
+        except (TypeError, ValueError):
+            return 1024